@@ -0,0 +1,124 @@
+"""
+Lobby event fan-out: send_json per recipient vs broadcast(), and the
+join-vs-sendmsg cutoff behind send_buffers().
+
+Part 1 sends one room_update and one game_start to N recipients over
+socketpairs, ROUNDS times (best of REPEATS), once with a send_json call per
+recipient (encoding the event N times) and once with broadcast() (encoding it
+once). The recipients are raw sockets, then SocketSession outboxes like the
+threaded lobby uses.
+
+Part 2 writes batches of encoded messages one way and then the other: joined
+and sendall'ed, or gathered with sendmsg. SCATTER_MIN in protocol.py is where
+sendmsg starts to win.
+
+    python bench/bench_broadcast.py [N ...]
+"""
+import resource
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from server.common.protocol import IOV_MAX, broadcast, send_json
+from server.lobby.outbox import SocketSession
+
+SIZES = (2, 10, 100, 1000)
+ROUNDS = 100
+REPEATS = 3
+PLAYERS = [f"player{i}" for i in range(4)]
+EVENTS = (
+    {"cmd": "room_update", "room_id": 17, "players": PLAYERS},
+    {"cmd": "game_start", "room_id": 17, "game_id": 3, "game_host": "140.113.17.11", "game_port": 20017,
+     "game_version": "1.2.0", "game_name": "Arena 大亂鬥", "host_name": "player0"},
+)
+BATCHES = (
+    ("4 x 60 B events", [b"x" * 60] * 4, 20000),
+    ("64 x 60 B events", [b"x" * 60] * 64, 5000),
+    ("2 x 28 KB listings", [b"x" * 28000] * 2, 5000),
+    ("8 x 28 KB listings", [b"x" * 28000] * 8, 2000),
+    ("1 MB + 3 x 60 B", [b"x" * (1 << 20), b"y" * 60, b"z" * 60, b"w" * 60], 300),
+)
+
+
+def per_round_us(fn) -> float:
+    best = None
+    for _ in range(REPEATS):
+        t = time.perf_counter()
+        for _ in range(ROUNDS):
+            fn()
+        elapsed = (time.perf_counter() - t) / ROUNDS * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def fan_out(n: int) -> str:
+    pairs = [socket.socketpair() for _ in range(n)]
+    for a, _ in pairs:
+        # room for every round, so nobody has to drain the other end
+        a.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+    raw = [a for a, _ in pairs]
+    sessions = [SocketSession(a, i) for i, (a, _) in enumerate(pairs)]
+    cells = []
+    try:
+        for label, targets in (("raw", raw), ("session", sessions)):
+            for evt in EVENTS:
+                per_recipient = per_round_us(lambda: [send_json(s, evt) for s in targets])
+                once = per_round_us(lambda: broadcast(targets, evt))
+                cells.append(f"{label} {evt['cmd']} {per_recipient:7.0f} -> {once:6.0f}")
+                # let the session writers catch up before the next measurement
+                time.sleep(0.2)
+    finally:
+        for s in sessions:
+            s.close()
+        for _, b in pairs:
+            b.close()
+    return " | ".join(cells)
+
+
+def write_batches(buffers, gather: bool, n: int) -> float:
+    a, b = socket.socketpair()
+    a.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 22)
+
+    def drain():
+        while b.recv(1 << 20):
+            pass
+
+    threading.Thread(target=drain, daemon=True).start()
+    t = time.perf_counter()
+    for _ in range(n):
+        if not gather:
+            a.sendall(b"".join(buffers))
+            continue
+        views = [memoryview(x) for x in buffers]
+        i = 0
+        while i < len(views):
+            sent = a.sendmsg(views[i:i + IOV_MAX])
+            while i < len(views) and sent >= len(views[i]):
+                sent -= len(views[i])
+                i += 1
+            if sent:
+                views[i] = views[i][sent:]
+    elapsed = (time.perf_counter() - t) / n * 1e6
+    a.close()
+    return elapsed
+
+
+def main() -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    print(f"fan-out, us per event, send_json per recipient -> broadcast (best of {REPEATS} x {ROUNDS} rounds)")
+    for n in sizes:
+        print(f"N={n:<5d} {fan_out(n)}")
+    print("\nwriting one batch, us")
+    for label, buffers, n in BATCHES:
+        print(f"{label:20s} join+sendall {write_batches(buffers, False, n):7.1f}   "
+              f"sendmsg {write_batches(buffers, True, n):7.1f}")
+
+
+if __name__ == "__main__":
+    main()
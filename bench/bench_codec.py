@@ -0,0 +1,84 @@
+"""
+Lobby wire formats: JSON lines vs length-prefixed binary frames.
+
+Encodes and decodes a room_update event and a 100-game list_games reply both
+ways, through the same encode_message/recv_message calls the lobby uses.
+list_games is timed twice: as a plain dict, and with the listing pre-encoded
+in a RawJSON the way the catalog caches it. Binary decode is timed with the
+pure-Python unpacker and, when the msgpack package is installed, with it.
+Both framings must decode to the same dict.
+
+    python bench/bench_codec.py
+"""
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import server.common.protocol as protocol
+from server.common.protocol import RawJSON, encode_message, recv_message
+
+GAMES = [{
+    "game_id": i,
+    "game_name": f"Game {i} 大亂鬥",
+    "game_description": "A two to four player arena game with power ups and a ranked mode.",
+    "max_players": 4,
+    "latest_version": f"1.2.{i}",
+    "latest_version_id": 1000 + i,
+    "developer_name": f"dev{i % 7}",
+    "avg_score": 4.25,
+    "rating_count": 17,
+} for i in range(100)]
+LIST_GAMES = {"ok": True, "cmd": "list_games", "games": GAMES, "catalog_version": 1729230000123, "req_id": 42}
+LIST_GAMES_CACHED = dict(LIST_GAMES, games=RawJSON(json.dumps(GAMES, ensure_ascii=False).encode("utf-8")))
+ROOM_UPDATE = {"cmd": "room_update", "room_id": 17, "players": ["alice", "bob", "carol"]}
+
+CASES = (
+    ("room_update", ROOM_UPDATE, 100000),
+    ("list_games", LIST_GAMES, 1000),
+    ("list_games cached", LIST_GAMES_CACHED, 20000),
+)
+
+
+def per_call_us(fn, n: int) -> float:
+    t = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t) / n * 1e6
+
+
+def decode_us(data: bytes, framing: str, n: int) -> float:
+    return per_call_us(lambda: recv_message(io.BytesIO(data), framing), n)
+
+
+def main() -> None:
+    msgpack = protocol.msgpack
+    # warm the RawJSON's packed form, as the first list_games reply would
+    LIST_GAMES_CACHED["games"].packed()
+    print(f"msgpack extension: {'installed' if msgpack is not None else 'not installed'}")
+    for name, msg, n in CASES:
+        line = encode_message(msg, "json")
+        frame = encode_message(msg, "binary")
+        protocol.msgpack = None
+        same = recv_message(io.BytesIO(line), "json") == recv_message(io.BytesIO(frame), "binary")
+        if not same:
+            raise SystemExit(f"{name}: the two framings decode differently")
+
+        enc_json = per_call_us(lambda: encode_message(msg, "json"), n)
+        enc_bin = per_call_us(lambda: encode_message(msg, "binary"), n)
+        dec_json = decode_us(line, "json", n)
+        dec_pure = decode_us(frame, "binary", n)
+        decoded = f"decode json {dec_json:7.1f} us  binary {dec_pure:7.1f} us"
+        if msgpack is not None:
+            protocol.msgpack = msgpack
+            decoded += f" ({decode_us(frame, 'binary', n):.1f} us msgpack)"
+        protocol.msgpack = msgpack
+        print(f"{name:18s} {len(line):6d} B json  {len(frame):6d} B binary | "
+              f"encode json {enc_json:7.1f} us  binary {enc_bin:7.1f} us | {decoded}")
+
+
+if __name__ == "__main__":
+    main()
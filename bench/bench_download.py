@@ -0,0 +1,119 @@
+"""
+File server downloads: the old 64 KiB read/sendall loop vs send_file().
+
+Serves one SIZE_MIB file from a child process and pulls it over loopback with
+1, 10 and 100 concurrent downloads, first with the read/sendall loop the
+download branch used to run, then with dev_server.send_file (sendfile(2), or
+sendall from an mmap where the OS has no sendfile). Reports throughput and the
+server process's CPU seconds per GB sent.
+
+    python bench/bench_download.py [size_mib]
+"""
+import os
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+SIZE_MIB = 64
+CONCURRENCY = (1, 10, 100)
+CHUNK = 64 * 1024
+
+
+def serve(mode: str, path: str) -> None:
+    from server.dev.dev_server import send_file
+
+    size = os.path.getsize(path)
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(256)
+    print(srv.getsockname()[1], flush=True)
+
+    def handle(conn):
+        with conn, open(path, "rb") as f:
+            cmd = conn.makefile("rb").readline().strip()
+            if cmd == b"cpu":
+                t = os.times()
+                conn.sendall(f"{t.user + t.system}\n".encode())
+                return
+            conn.sendall(struct.pack(">Q", size))
+            if mode == "sendfile":
+                send_file(conn, f, 0, size)
+                return
+            while True:
+                chunk = f.read(CHUNK)
+                if not chunk:
+                    break
+                conn.sendall(chunk)
+
+    while True:
+        conn, _ = srv.accept()
+        threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+def ask(port: int, cmd: bytes) -> socket.socket:
+    s = socket.create_connection(("127.0.0.1", port))
+    s.sendall(cmd + b"\n")
+    return s
+
+
+def server_cpu(port: int) -> float:
+    with ask(port, b"cpu") as s:
+        return float(s.makefile("rb").readline())
+
+
+def download(port: int, done: list) -> None:
+    with ask(port, b"get") as s:
+        f = s.makefile("rb")
+        size = struct.unpack(">Q", f.read(8))[0]
+        buf = memoryview(bytearray(1 << 20))
+        left = size
+        while left:
+            n = f.readinto(buf[:min(len(buf), left)])
+            if not n:
+                raise RuntimeError("short download")
+            left -= n
+        done.append(size)
+
+
+def main() -> None:
+    size_mib = int(sys.argv[1]) if len(sys.argv) > 1 else SIZE_MIB
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "game.zip")
+        with open(path, "wb") as f:
+            for _ in range(size_mib):
+                f.write(os.urandom(1 << 20))
+        for mode in ("loop", "sendfile"):
+            proc = subprocess.Popen([sys.executable, __file__, "--serve", mode, path], stdout=subprocess.PIPE)
+            try:
+                port = int(proc.stdout.readline())
+                for conc in CONCURRENCY:
+                    done = []
+                    cpu0 = server_cpu(port)
+                    t = time.perf_counter()
+                    threads = [threading.Thread(target=download, args=(port, done)) for _ in range(conc)]
+                    for th in threads:
+                        th.start()
+                    for th in threads:
+                        th.join()
+                    elapsed = time.perf_counter() - t
+                    gb = sum(done) / 1e9
+                    cpu = server_cpu(port) - cpu0
+                    print(f"{mode:8s} x{conc:<3d} {gb * 8 / elapsed:6.1f} Gbit/s  server CPU {cpu / gb:5.2f} s/GB"
+                          f"  ({len(done)}/{conc} complete)")
+            finally:
+                proc.kill()
+                proc.wait()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--serve"]:
+        serve(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,88 @@
+"""
+start_game launch latency: cold `python -m server.server` vs a warm pool hand-off.
+
+For each game under test_game/ this launches RUNS game servers the way
+handle_start_game does (cwd = the version dir, --host/--port/--room-id) and
+times launch -> the server accepting a TCP connection. "cold" is the plain
+Popen the pool falls back to; "warm" is GameServerPool.launch with an idle
+worker that had WARM_SETTLE seconds to import the game, as it has in the
+lobby between room creation and start (the refill is not timed).
+
+    python bench/bench_game_start.py [runs]
+"""
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from server.lobby.game_pool import GameServerPool
+
+RUNS = 20
+ACCEPT_TIMEOUT = 10.0
+WARM_SETTLE = 0.5
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_accepting(port: int) -> None:
+    deadline = time.monotonic() + ACCEPT_TIMEOUT
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"nothing accepted on port {port}")
+            time.sleep(0.001)
+
+
+def run(pool: GameServerPool, game_dir: Path, warm: bool, runs: int) -> list:
+    samples = []
+    for room_id in range(runs):
+        if warm:
+            pool.warm(game_dir)
+            time.sleep(WARM_SETTLE)
+        port = free_port()
+        argv = ["--host", "127.0.0.1", "--port", str(port), "--room-id", str(room_id)]
+        t = time.perf_counter()
+        if warm:
+            proc = pool.launch(game_dir, argv)
+        else:
+            proc = subprocess.Popen([sys.executable, "-m", "server.server"] + argv, cwd=game_dir,
+                                    stdout=subprocess.DEVNULL)
+        wait_accepting(port)
+        samples.append((time.perf_counter() - t) * 1000)
+        proc.kill()
+        proc.wait()
+    return samples
+
+
+def describe(samples: list) -> str:
+    p90 = sorted(samples)[int(len(samples) * 0.9) - 1]
+    return f"median {statistics.median(samples):6.1f} ms  p90 {p90:6.1f} ms"
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+    pool = GameServerPool(min_idle=1, max_idle=2, idle_timeout=60)
+    try:
+        for game_dir in sorted(p for p in (ROOT / "test_game").iterdir() if (p / "server" / "server.py").is_file()):
+            cold = run(pool, game_dir, False, runs)
+            warm = run(pool, game_dir, True, runs)
+            print(f"{game_dir.name:12s} cold {describe(cold)} | warm {describe(warm)}")
+        print(f"pool: {pool.counts()}")
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
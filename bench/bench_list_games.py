@@ -0,0 +1,117 @@
+"""
+list_games: one query per game (the old loop) vs a single statement.
+
+Seeds a throwaway database with N games of VERSIONS versions each, then times
+the 1+N form (get_all_games, then get_latest_gamelog_for_game per game), the
+same listing as one ROW_NUMBER() OVER (PARTITION BY game_id ...) window query,
+and list_games_with_latest_version() (correlated lookup on idx_gamelog_latest).
+All use the reused per-thread connection. The three results are checked to be
+the same before anything is timed.
+
+    python bench/bench_list_games.py [N ...]
+"""
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import server.db as db
+from server.db.games_repo import get_all_games
+from server.db.gamelog_repo import get_latest_gamelog_for_game, list_games_with_latest_version
+
+SIZES = (100, 1000, 5000)
+VERSIONS = 3
+RUNS = 15
+
+
+def seed(n: int) -> None:
+    db.init_db()
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO developers(username, password_hash) VALUES('dev', 'x')")
+        conn.executemany(
+            "INSERT INTO games(developer_id, game_name, game_description, max_players) VALUES(1, ?, ?, 4)",
+            [(f"Game {i}", "A two to four player arena game.") for i in range(n)],
+        )
+        conn.executemany(
+            "INSERT INTO gamelog(game_id, game_version, upload_path, is_active, uploaded_at) "
+            "VALUES(?, ?, ?, ?, datetime('now', ?))",
+            [(g, f"1.0.{v}", f"game_store/{g}/1.0.{v}.zip", 0 if g % 10 == 0 and v == VERSIONS - 1 else 1,
+              f"-{VERSIONS - v} minutes")
+             for g in range(1, n + 1) for v in range(VERSIONS)],
+        )
+
+
+WINDOW_SQL = """
+    SELECT
+        g.id AS game_id,
+        g.game_name,
+        g.game_description,
+        g.max_players,
+        l.game_version AS latest_version,
+        l.id AS latest_version_id,
+        l.upload_path
+    FROM games g
+    LEFT JOIN (
+        SELECT id, game_id, game_version, upload_path,
+               ROW_NUMBER() OVER (PARTITION BY game_id ORDER BY uploaded_at DESC, id DESC) AS rn
+        FROM gamelog
+        WHERE is_active = 1
+    ) l ON l.game_id = g.id AND l.rn = 1
+    WHERE g.game_status = 'active'
+    ORDER BY g.id
+"""
+
+
+def window():
+    with db.get_connection() as conn:
+        return [dict(row) for row in conn.execute(WINDOW_SQL)]
+
+
+def one_plus_n():
+    result = []
+    for g in get_all_games():
+        latest = get_latest_gamelog_for_game(g["id"])
+        result.append({
+            "game_id": g["id"],
+            "game_name": g["game_name"],
+            "game_description": g["game_description"],
+            "max_players": g["max_players"],
+            "latest_version": latest["game_version"] if latest else None,
+            "latest_version_id": latest["id"] if latest else None,
+            "upload_path": latest["upload_path"] if latest else None,
+        })
+    return result
+
+
+def timed(fn) -> float:
+    samples = []
+    for _ in range(RUNS):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db.close_connection()
+            db.DB_PATH = Path(tmp) / "store.db"
+            seed(n)
+            expected = list_games_with_latest_version()
+            if one_plus_n() != expected or window() != expected:
+                raise SystemExit(f"{n} games: the listings differ")
+            before = timed(one_plus_n)
+            windowed = timed(window)
+            after = timed(list_games_with_latest_version)
+            print(f"{n:5d} games: 1+N queries {before:7.2f} ms | ROW_NUMBER window {windowed:6.2f} ms | "
+                  f"correlated seek {after:6.2f} ms")
+            db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
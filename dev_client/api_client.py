@@ -2,36 +2,92 @@ from __future__ import annotations
 
 import socket
 import json
+import hashlib
+import os
+import random
+import struct
 import threading
-import queue
+import time
+import zipfile
+import heapq
 import itertools
+from concurrent.futures import Future, InvalidStateError
 
 
 from typing import Dict, Any, Callable, Optional, List
 from pathlib import Path
 
+from .common.protocol import DEFAULT_FRAMING, FRAMINGS, encode_message, recv_message
+
 LOBBY_HOST = None
 LOBBY_PORT = None
 FILE_HOST = None
 FILE_PORT = None
 
+# how often a BUSY file server is asked again (after its retry_after)
+BUSY_RETRIES = 10
+# how often (s) the file server is asked whether an upload is extracted, and for how long
+PROCESS_POLL = 0.5
+PROCESS_TIMEOUT = 600.0
+# how long a lobby request waits for its reply before failing with TimeoutError (s)
+REQUEST_TIMEOUT = 15.0
+# requests allowed in flight at once; past that request() fails instead of queueing
+MAX_PENDING = 1000
+# lobby connect + handshake timeout (s), and the backoff between reconnect attempts
+CONNECT_TIMEOUT = 10.0
+RECONNECT_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
 BASE_DIR = Path(__file__).resolve().parent
 PLAYERS_DIR = BASE_DIR / "players"
 
+def _settle(fut: Future, result=None, error: Optional[BaseException] = None) -> None:
+    # the reply, a timeout and a cancel can race; whichever comes first wins
+    try:
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+    except InvalidStateError:
+        pass
+
+
 class LobbyClient:
 
-    def __init__(self, host: str = LOBBY_HOST, port: int = LOBBY_PORT) -> None:
+    def __init__(self, host: str = LOBBY_HOST, port: int = LOBBY_PORT, framing: str = DEFAULT_FRAMING,
+                 auto_reconnect: bool = True) -> None:
         self.host = host
         self.port = port
         self.sock: Optional[socket.socket] = None
         self.file = None
-        self._recv_lock = threading.Lock()
+        # framing we ask for in hello; self.framing is what the server agreed to
+        self.preferred_framing = framing
+        self.framing = "json"
+        self._send_lock = threading.Lock()
 
         self._running = False
         self._listener_thread: Optional[threading.Thread] = None
-
-        self._pending: Dict[int, "queue.Queue[Dict[str, Any]]"] = {}
+        # connected: requests can go out; _closed: close() was called, stay down
+        self.connected = False
+        self._closed = False
+        # when the connection drops, reconnect and log back in with the
+        # resume_token from our last login; on_event gets "connection_lost"
+        # and then "reconnected" (with "resumed")
+        self.auto_reconnect = auto_reconnect
+        self.resume_token: Optional[str] = None
+        self._reconnecting = False
+        # topics to subscribe to again after a reconnect
+        self._topics: set = set()
+        # connected, _pending and _reconnecting change together under this lock
+        self._state_lock = threading.Lock()
+
+        # req_id -> Future of each request still waiting for its reply
+        self._pending: Dict[int, Future] = {}
         self._id_counter = itertools.count(1)
+        # (deadline, req_id, cmd) of the requests with a timeout, soonest first
+        self._deadlines: List[tuple] = []
+        self._deadline_cond = threading.Condition()
+        self._deadline_thread: Optional[threading.Thread] = None
 
         self.on_event: Optional[Callable[[Dict[str, Any]], None]] = None
 
@@ -40,18 +96,60 @@ class LobbyClient:
     def connect(self) -> None:
         if self.sock is not None:
             return  
-        sock = socket.create_connection((self.host, self.port))
+        self._closed = False
+        self._open()
+        self._start_threads()
+
+    def _open(self) -> bool:
+        """
+        Connect, agree on a framing and, if we hold a resume token, log back
+        in with it. Returns whether the session was resumed.
+        """
+        sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
         self.sock = sock
-        self.file = sock.makefile("r", encoding="utf-8")
+        self.file = sock.makefile("rb")
+        try:
+            self.framing = "json"
+            self.framing = self._hello()
+            resumed = self._resume()
+            # handshake done; from here the listener blocks until the lobby says something
+            sock.settimeout(None)
+        except Exception:
+            self._drop_socket()
+            raise
+        return resumed
 
+    def _start_threads(self) -> None:
+        with self._state_lock:
+            self.connected = True
         self._running = True
         self._listener_thread = threading.Thread(
-            target=self._listen_loop, daemon=True
+            target=self._listen_loop, args=(self.sock,), daemon=True
         )
         self._listener_thread.start()
+        if self._deadline_thread is None or not self._deadline_thread.is_alive():
+            self._deadline_thread = threading.Thread(
+                target=self._deadline_loop, daemon=True
+            )
+            self._deadline_thread.start()
 
     def close(self) -> None:
+        self._closed = True
         self._running = False
+        with self._deadline_cond:
+            self._deadline_cond.notify()
+        self._drop_socket()
+        self._fail_pending(ConnectionError("LobbyClient closed"))
+
+    def _drop_socket(self) -> None:
+        if self.sock is not None:
+            try:
+                # wakes a listener blocked in recv first; closing the file
+                # waits for that read, and closing the socket alone does not end it
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
         if self.file is not None:
             try:
                 self.file.close()
@@ -66,49 +164,226 @@ class LobbyClient:
                 pass
             self.sock = None
 
-    def _listen_loop(self):
+    def _listen_loop(self, sock):
+        err = ConnectionError("server closed connection")
         try:
             while self._running:
                 msg = self.recv()
+                if msg.get("ok") and msg.get("resume_token"):
+                    # a login (or resume) reply; this is what we reconnect with
+                    self.resume_token = msg["resume_token"]
                 req_id = msg.get("req_id")
-                if isinstance(req_id, int) and req_id in self._pending:
-                    q = self._pending[req_id]
-                    q.put(msg)
+                if isinstance(req_id, int):
+                    # a reply; one nobody waits for any more (timed out, cancelled) is dropped
+                    fut = self._pending.pop(req_id, None)
+                    if fut is not None:
+                        _settle(fut, result=msg)
                     continue
 
-                if self.on_event is not None:
-                    self.on_event(msg)
-        except Exception:
-            pass
+                if msg.get("cmd") == "force_logout":
+                    # logged in elsewhere; resuming would only kick that session out in turn
+                    self.resume_token = None
+                self._emit(msg)
+        except Exception as e:
+            if not isinstance(e, ConnectionError):
+                e = ConnectionError(f"lost connection to lobby: {e}")
+            err = e
+        self._connection_lost(sock, err)
+
+    def _emit(self, evt: Dict[str, Any]) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(evt)
+        except Exception as e:
+            print(f"[!] on_event failed for {evt.get('cmd')}: {e}")
+
+    def _fail_pending(self, err: Exception) -> None:
+        # no reply is coming for anything in flight; wake every waiter now
+        with self._state_lock:
+            self.connected = False
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for fut in pending:
+            _settle(fut, error=err)
+
+    def _connection_lost(self, sock, err: Exception) -> None:
+        if sock is not self.sock:
+            return  # close() or a newer connection already took over
+        self._fail_pending(err)
+        if self._closed:
+            return
+        self._drop_socket()
+        self._emit({"cmd": "connection_lost", "message": str(err)})
+        if not self.auto_reconnect:
+            return
+        with self._state_lock:
+            if self._reconnecting:
+                return
+            self._reconnecting = True
+        threading.Thread(target=self._reconnect_loop, daemon=True).start()
+
+    def _reconnect_loop(self) -> None:
+        attempt = 0
+        try:
+            while not self._closed:
+                # backoff with jitter, so a restarted lobby is not hit by every client at once
+                delay = min(RECONNECT_DELAY * 2 ** attempt, RECONNECT_MAX_DELAY)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                attempt += 1
+                if self._closed:
+                    return
+                try:
+                    resumed = self._open()
+                except (OSError, RuntimeError, ValueError) as e:
+                    print(f"[!] reconnect attempt {attempt} failed: {e}")
+                    continue
+                if self._closed:
+                    self._drop_socket()
+                    return
+                self._start_threads()
+                print(f"[*] reconnected to lobby after {attempt} attempt(s), session {'resumed' if resumed else 'not resumed'}")
+                self._emit({"cmd": "reconnected", "resumed": resumed})
+                if resumed and self._topics:
+                    self.request({"cmd": "subscribe", "topics": sorted(self._topics)})
+                return
+        finally:
+            with self._state_lock:
+                self._reconnecting = False
+
+    def _resume(self) -> bool:
+        # like _hello, before the listener starts; a refused token is dropped (log in again)
+        if not self.resume_token:
+            return False
+        self.sock.sendall(encode_message({"cmd": "resume_session", "token": self.resume_token}, self.framing))
+        resp = recv_message(self.file, self.framing)
+        if resp is None:
+            raise RuntimeError("server closed connection")
+        if resp.get("ok"):
+            self.resume_token = resp.get("resume_token", self.resume_token)
+            return True
+        self.resume_token = None
+        return False
+
+    def _hello(self) -> str:
+        # before the listener starts, so the reply can be read here directly;
+        # a lobby that does not know hello answers UNKNOWN_CMD and we keep JSON lines
+        offered = [self.preferred_framing] + [f for f in FRAMINGS if f != self.preferred_framing]
+        self.sock.sendall(encode_message({"cmd": "hello", "framing": offered}))
+        resp = recv_message(self.file)
+        if resp is None:
+            raise RuntimeError("server closed connection")
+        if resp.get("ok") and resp.get("framing") in FRAMINGS:
+            return resp["framing"]
+        return "json"
+
+    def _deadline_loop(self) -> None:
+        while True:
+            expired = []
+            with self._deadline_cond:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    expired.append(heapq.heappop(self._deadlines))
+                if not expired:
+                    wait = self._deadlines[0][0] - now if self._deadlines else None
+                    self._deadline_cond.wait(wait)
+                    continue
+            for _, req_id, cmd in expired:
+                fut = self._pending.pop(req_id, None)
+                if fut is not None:
+                    _settle(fut, error=TimeoutError(f"no reply to {cmd} (req_id {req_id})"))
 
     def send(self, obj: Dict[str, Any]) -> None:
         if self.sock is None:
             raise RuntimeError("LobbyClient not connected. Call connect() first.")
-        data = json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n"
-        self.sock.sendall(data)
+        data = encode_message(obj, self.framing)
+        # requests may come from several threads at once; keep their bytes apart
+        with self._send_lock:
+            self.sock.sendall(data)
     
     def recv(self) -> Dict[str, Any]:
         if self.file is None:
             raise RuntimeError("LobbyClient not connected. Call connect() first.")
-        line = self.file.readline()
-        if not line:
+        msg = recv_message(self.file, self.framing)
+        if msg is None:
             raise RuntimeError("server closed connection")
-        print(line)
-        return json.loads(line)
+        return msg
     
-    def send_request(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+    def request(self, obj: Dict[str, Any], timeout: Optional[float] = REQUEST_TIMEOUT) -> Future:
+        """
+        Send a request without waiting for the reply. Returns a Future that the
+        listener thread resolves with the response (matched on req_id), or that
+        fails with TimeoutError after timeout seconds (None: no limit). Up to
+        MAX_PENDING requests can be in flight at once; the lobby answers them
+        in order. asyncio code can await it with asyncio.wrap_future().
+
+        Fails at once (ConnectionError) while not connected, and every request
+        in flight fails the moment the connection drops. Cancelling the future
+        forgets the request; its reply is dropped when it comes.
+        """
         req_id = next(self._id_counter)
         obj = dict(obj)  # shallow copy
         obj["req_id"] = req_id
 
-        q: "queue.Queue[Dict[str, Any]]" = queue.Queue()
-        self._pending[req_id] = q
-
-        self.send(obj)
-        resp = q.get()  # blocking
+        fut: Future = Future()
+        with self._state_lock:
+            if not self.connected:
+                error = ConnectionError("not connected to the lobby" + (" (reconnecting)" if self._reconnecting else ""))
+            elif len(self._pending) >= MAX_PENDING:
+                error = RuntimeError(f"too many lobby requests in flight ({MAX_PENDING})")
+            else:
+                error = None
+                self._pending[req_id] = fut
+        if error is not None:
+            _settle(fut, error=error)
+            return fut
+        fut.add_done_callback(lambda f: self._pending.pop(req_id, None))
+        if timeout is not None:
+            with self._deadline_cond:
+                heapq.heappush(self._deadlines, (time.monotonic() + timeout, req_id, obj.get("cmd")))
+                self._deadline_cond.notify()
+        try:
+            self.send(obj)
+        except Exception as e:
+            self._pending.pop(req_id, None)
+            _settle(fut, error=e)
+        return fut
+
+    def send_request(self, obj: Dict[str, Any], timeout: Optional[float] = REQUEST_TIMEOUT) -> Dict[str, Any]:
+        # blocking form of request(); from Tk callbacks use call() instead
+        return self.request(obj, timeout).result()
+
+    def call(self, widget, obj: Dict[str, Any],
+             on_done: Callable[[Dict[str, Any]], None],
+             on_error: Optional[Callable[[Exception], None]] = None,
+             timeout: Optional[float] = REQUEST_TIMEOUT) -> Future:
+        """
+        request() for Tk code: returns at once, and on_done(resp) or
+        on_error(exc) later runs on the Tk main loop via widget.after(), so
+        mainloop never waits on the network. Without on_error, failures are
+        only printed. A cancelled future calls neither.
+        """
+        fut = self.request(obj, timeout)
+
+        def deliver(f: Future) -> None:
+            if f.cancelled():
+                return
+            err = f.exception()
+            try:
+                if err is None:
+                    widget.after(0, on_done, f.result())
+                elif on_error is not None:
+                    widget.after(0, on_error, err)
+                else:
+                    print(f"[!] {obj.get('cmd')} failed: {err}")
+            except Exception:
+                # the window is gone (destroyed, or the main loop ended)
+                pass
 
-        self._pending.pop(req_id, None)
-        return resp
+        fut.add_done_callback(deliver)
+        return fut
 
     def register_developer(self, username, password, display_name=None):
         req = {
@@ -125,6 +400,21 @@ class LobbyClient:
             "password": password,
         }
         return self.send_request(req)
+
+    def publish_version(self, version_id):
+        req = {
+            "cmd": "developer_publish_version",
+            "version_id": version_id,
+        }
+        return self.send_request(req)
+
+    def call_publish_version(self, widget, version_id,
+                             on_done: Callable[[Dict[str, Any]], None],
+                             on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        return self.call(widget, {
+            "cmd": "developer_publish_version",
+            "version_id": version_id,
+        }, on_done, on_error)
     
     def check_upload_version_valid(self, upload_version: str, latest_version: str):
         pu, pl = parse_ver(upload_version), parse_ver(latest_version)
@@ -194,27 +484,81 @@ def get_user_games(username: str) -> List[Dict[str, Any]]:
     games.sort(key=lambda g :g["game_id"])
     return games
 
+def _open_file_request(header: Dict[str, Any]):
+    """
+    Connect to the file server and send header; returns (sock, reader, reply).
+    A BUSY reply is retried after the server's retry_after (plus some jitter),
+    up to BUSY_RETRIES times.
+    """
+    attempt = 0
+    while True:
+        sock = socket.create_connection((FILE_HOST, FILE_PORT))
+        f = sock.makefile("rb")
+        try:
+            sock.sendall((json.dumps(header) + "\n").encode("utf-8"))
+            line = f.readline()
+            if not line:
+                raise RuntimeError("no ack from file server")
+            reply = json.loads(line.decode("utf-8"))
+        except Exception:
+            f.close()
+            sock.close()
+            raise
+        if reply.get("error") != "BUSY" or attempt >= BUSY_RETRIES:
+            return sock, f, reply
+        f.close()
+        sock.close()
+        attempt += 1
+        time.sleep(float(reply.get("retry_after", 1)) * (1 + random.random() * 0.5))
+
+
+def wait_until_processed(upload_path: str, on_state: Optional[Callable[[str], None]] = None,
+                         timeout: float = PROCESS_TIMEOUT) -> Dict[str, Any]:
+    """
+    Poll the file server's status for an upload until its extraction job is
+    done; returns the final status. Raises RuntimeError if the job failed (a
+    zip that does not extract) or did not finish within timeout seconds.
+    on_state(state) is called whenever the state changes.
+    """
+    deadline = time.monotonic() + timeout
+    last = None
+    while True:
+        sock, f, status = _open_file_request({"action": "status", "upload_path": upload_path})
+        f.close()
+        sock.close()
+        if not status.get("ok"):
+            raise RuntimeError(f"file server refused: {status}")
+        state = status.get("state")
+        if state != last and on_state:
+            on_state(state)
+        last = state
+        if state == "done":
+            return status
+        if state == "failed":
+            raise RuntimeError(f"server could not process the upload: {status.get('message')}")
+        if state == "unknown" or time.monotonic() > deadline:
+            raise RuntimeError(f"upload not processed by the file server (state {state})")
+        time.sleep(PROCESS_POLL)
+
+
 def upload_file_to_server(zip_path: Path, upload_path: str, version: str):
     zip_path = Path(zip_path)
     file_size = zip_path.stat().st_size
+    h = hashlib.sha256()
+    with zip_path.open("rb") as rf:
+        for chunk in iter(lambda: rf.read(1024 * 1024), b""):
+            h.update(chunk)
 
     header = {
         "upload_path": upload_path,
         "file_size": file_size,
+        "sha256": h.hexdigest(),
         "version": version
     }
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-        sock.connect((FILE_HOST, FILE_PORT))
-        f = sock.makefile("rb")
-
-        sock.sendall((json.dumps(header) + "\n").encode("utf-8"))
-        
+    sock, f, ack = _open_file_request(header)
+    with sock, f:
         # recv ack
-        line = f.readline()
-        if not line:
-            raise RuntimeError("no ack from file server")
-        ack = json.loads(line.decode("utf-8"))
         if not ack.get("ok"):
             raise RuntimeError(f"file server refused: {ack}")
         
@@ -235,6 +579,143 @@ def upload_file_to_server(zip_path: Path, upload_path: str, version: str):
         
         return resp
     
+class _UploadStream:
+    """
+    Write-only file object ZipFile writes the archive into: the bytes go to the
+    file server in length-prefixed frames as they are produced, and are hashed
+    on the way, so no zip is ever written to disk.
+    """
+
+    FRAME_SIZE = 256 * 1024
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self._buf = bytearray()
+
+    def write(self, data) -> int:
+        self._buf += data
+        self.hash.update(data)
+        self.size += len(data)
+        if len(self._buf) >= self.FRAME_SIZE:
+            self._send_frame()
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def _send_frame(self) -> None:
+        if self._buf:
+            self.sock.sendall(struct.pack(">I", len(self._buf)))
+            self.sock.sendall(self._buf)
+            self._buf = bytearray()
+
+    def finish(self) -> None:
+        """Send what is left, the empty end frame, and the size/sha256 trailer."""
+        self._send_frame()
+        self.sock.sendall(struct.pack(">I", 0))
+        trailer = {"size": self.size, "sha256": self.hash.hexdigest()}
+        self.sock.sendall((json.dumps(trailer) + "\n").encode("utf-8"))
+
+
+def _source_entries(src: Path):
+    """(path, name in the zip) for a folder's dirs and files, or a single file."""
+    if src.is_file():
+        return [(src, src.name)]
+    return [(p, p.relative_to(src).as_posix()) for p in sorted(src.rglob("*"))]
+
+
+def upload_folder_to_server(src: Path, upload_path: str, version: str,
+                            progress: Optional[Callable[[int, int], None]] = None):
+    """
+    Zip src (a folder, or a single file) straight onto the file server socket.
+    progress(done, total) is called with source bytes compressed so far; it
+    runs on the calling thread.
+    """
+    src = Path(src)
+    entries = _source_entries(src)
+    total = sum(p.stat().st_size for p, _ in entries if p.is_file())
+
+    header = {
+        "upload_path": upload_path,
+        "version": version,
+        "stream": True,
+    }
+
+    sock, f, ack = _open_file_request(header)
+    with sock, f:
+        # recv ack
+        if not ack.get("ok"):
+            raise RuntimeError(f"file server refused: {ack}")
+
+        out = _UploadStream(sock)
+        done = 0
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as z:
+            for path, arcname in entries:
+                if path.is_dir():
+                    z.write(path, arcname)
+                    continue
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with path.open("rb") as rf, z.open(info, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as zf:
+                    while True:
+                        chunk = rf.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        zf.write(chunk)
+                        done += len(chunk)
+                        if progress:
+                            progress(done, total)
+        out.finish()
+
+        # recv success
+        line2 = f.readline()
+        if not line2:
+            raise RuntimeError("no final response from file server")
+        resp = json.loads(line2.decode("utf-8"))
+        if not resp.get("ok"):
+            raise RuntimeError(f"upload failed: {resp}")
+        resp["bytes"] = out.size
+        resp["sha256"] = out.hash.hexdigest()
+        return resp
+
+
+def upload_in_background(widget, src: Path, upload_path: str, version: str,
+                         on_progress: Callable[[int, int], None],
+                         on_done: Callable[[Dict[str, Any]], None],
+                         on_error: Callable[[Exception], None],
+                         on_stage: Optional[Callable[[str], None]] = None) -> threading.Thread:
+    """
+    Run upload_folder_to_server on a worker thread, then wait until the file
+    server has extracted the version (wait_until_processed), so on_done means
+    it can be published. The callbacks are handed to the Tk main loop with
+    widget.after(), progress at most once per percent; on_stage gets the
+    server's processing state while we wait.
+    """
+    last = [-1]
+
+    def progress(done: int, total: int) -> None:
+        pct = done * 100 // total if total else 100
+        if pct != last[0]:
+            last[0] = pct
+            widget.after(0, on_progress, done, total)
+
+    def run() -> None:
+        try:
+            result = upload_folder_to_server(src, upload_path, version, progress)
+            stage = (lambda state: widget.after(0, on_stage, state)) if on_stage else None
+            result["processing"] = wait_until_processed(upload_path, stage)
+        except Exception as e:
+            widget.after(0, on_error, e)
+            return
+        widget.after(0, on_done, result)
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return t
+
+
 def parse_ver(v: str) -> tuple[int,...]:
     parts = (v or "0").split(".")
     nums = []
@@ -250,13 +731,4 @@ def cmp_ver(a: str, b: str) -> int:
     n = max(len(pa), len(pb))
     pa += (0,) * (n - len(pa))
     pb += (0,) * (n - len(pb))
-    return (pa > pb) - (pa < pb) 
-
-
-
-
-
-
-
-
-    
+    return (pa > pb) - (pa < pb)
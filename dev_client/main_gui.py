@@ -102,8 +102,17 @@ class PlayerClientApp(tk.Tk):
             tk.messagebox.showinfo("Force logout", msg.get("message", "You were logged out."))
             self.show_frame("MainMenuFrame")
         elif cmd == "server_shutdown":
-            messagebox.showinfo("Server", msg.get("message", "Server shutting down"))
-            self.destroy()
+            # the client reconnects by itself once the lobby is back
+            self.set_status(msg.get("message", "Server shutting down") + ", waiting for it to come back...")
+        elif cmd == "connection_lost":
+            self.set_status("Connection to lobby lost, reconnecting...")
+        elif cmd == "reconnected":
+            if msg.get("resumed") or not self.get_current_user():
+                self.set_status("Reconnected to lobby.")
+            else:
+                self.set_current_user(None)
+                self.show_frame("MainMenuFrame")
+                self.set_status("Reconnected to lobby, please log in again.")
 
         else:
             print("[event]", msg)
@@ -67,12 +67,13 @@ class RegisterFrame(tk.Frame):
             messagebox.showwarning("Input error", "Username and password are required.")
             return
 
-        try:
-            resp = self.client.register_developer(username, password, display_name)
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+        self.client.call(self, {
+            "cmd": "developer_register",
+            "username": username,
+            "password": password,
+        }, self._on_registered, lambda e: messagebox.showerror("Network error", str(e)))
 
+    def _on_registered(self, resp: dict):
         if resp.get("ok"):
             msg = resp.get("message", "Register success.")
             self.controller.set_status(f"Register OK: {msg}")
@@ -153,12 +154,13 @@ class LoginFrame(tk.Frame):
             messagebox.showwarning("Input error", "Username and password are required.")
             return
 
-        try:
-            resp = self.client.login_developer(username, password)
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+        self.client.call(self, {
+            "cmd": "developer_login",
+            "username": username,
+            "password": password,
+        }, lambda resp: self._on_login(resp, username), lambda e: messagebox.showerror("Network error", str(e)))
 
+    def _on_login(self, resp: dict, username: str):
         if resp.get("ok"):
             msg = resp.get("message", "Login success.")
             self.controller.set_status(f"Login OK: {msg}")
@@ -1,9 +1,7 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from pathlib import Path
-import shutil
-import zipfile
-from ..api_client import upload_file_to_server
+from ..api_client import upload_in_background
 
 
 class CreateGameFrame(tk.Frame):
@@ -47,10 +45,11 @@ class CreateGameFrame(tk.Frame):
         btn_frame = tk.Frame(self, bg=self.controller.bg_color)
         btn_frame.pack(pady=5)
 
-        tk.Button(
+        self.btn_create = tk.Button(
             btn_frame, text="Create", width=12, bg="gray30", fg=self.controller.fg_color,
             command=self.on_create
-        ).pack(pady=5)
+        )
+        self.btn_create.pack(pady=5)
 
         tk.Button(
             btn_frame, text="Back", width=12, bg="gray30", fg=self.controller.fg_color,
@@ -88,6 +87,11 @@ class CreateGameFrame(tk.Frame):
             messagebox.showwarning("Input error", "Please select a folder to upload.")
             return
 
+        src = Path(src_path)
+        if not src.exists():
+            messagebox.showwarning("Input error", f"{src} does not exist.")
+            return
+
         max_players = None
         if max_players_str:
             try:
@@ -102,74 +106,81 @@ class CreateGameFrame(tk.Frame):
             "game_description": desc,
             "max_players": max_players,
         }
+        # create game -> create version -> upload -> publish, each step answered on the Tk loop
+        self.btn_create.config(state=tk.DISABLED)
+        self.controller.lobby_client.call(
+            self, req, lambda resp: self._on_game_created(resp, name, version, changelog, src),
+            lambda e: self._step_failed("Network error", str(e)))
 
-        try:
-            resp = self.controller.lobby_client.send_request(req)
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+    def _step_failed(self, title: str, msg: str):
+        self.btn_create.config(state=tk.NORMAL)
+        messagebox.showerror(title, msg)
 
+    def _on_game_created(self, resp: dict, name, version, changelog, src):
         if not resp.get("ok"):
             msg = resp.get("message", "Failed to create game.")
-            messagebox.showerror("Create game failed", f"{msg}\n(code: {resp.get('error')})")
+            self._step_failed("Create game failed", f"{msg}\n(code: {resp.get('error')})")
             self.controller.set_status(f"Create game FAIL: {msg}")
             return
 
         game_id = resp.get("game_id")
         self.controller.set_status(f"Game created: {name} (id={game_id})")
-        dev = self.controller.get_current_user()
-
-        # prepare workspace
-        workspace = Path("dev_client/dev_workspace") / dev / f"{game_id}_{name}" / f"v{version}"
-        workspace.mkdir(parents=True, exist_ok=True)
-
-        src = Path(src_path)
-        if src.is_dir():
-            shutil.copytree(src, workspace, dirs_exist_ok=True)
-        else:
-            shutil.copy2(src, workspace)
-
-        zip_path = workspace.with_suffix(".zip")
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as z:
-            for file in workspace.rglob("*"):
-                rel_path = file.relative_to(workspace)
-                z.write(file, rel_path)
 
         # create version metadata
-        try:
-            ver_resp = self.controller.lobby_client.send_request({
-                "cmd": "developer_create_version",
-                "game_id": game_id,
-                "game_version": version,
-                "changelog": changelog,
-            })
-        except Exception as e:
-            messagebox.showerror("Network error", f"Create version failed: {e}")
-            return
-
+        self.controller.lobby_client.call(self, {
+            "cmd": "developer_create_version",
+            "game_id": game_id,
+            "game_version": version,
+            "changelog": changelog,
+        }, lambda ver_resp: self._on_version_created(ver_resp, game_id, name, version, src),
+            lambda e: self._step_failed("Network error", f"Create version failed: {e}"))
+
+    def _on_version_created(self, ver_resp: dict, game_id, name, version, src):
         if not ver_resp.get("ok"):
             msg = ver_resp.get("message", "Failed to create version.")
-            messagebox.showerror("Create version failed", f"{msg}\n(code: {ver_resp.get('error')})")
+            self._step_failed("Create version failed", f"{msg}\n(code: {ver_resp.get('error')})")
             return
 
         upload_path = ver_resp.get("upload_path")
         if not upload_path:
-            messagebox.showerror("Upload failed", "Server did not return upload_path")
+            self._step_failed("Upload failed", "Server did not return upload_path")
             return
 
-        try:
-            result = upload_file_to_server(zip_path, upload_path, version)
-        except Exception as e:
-            messagebox.showerror("File upload failed", str(e))
-            self.controller.set_status("File upload failed")
-            return
+        # zipped straight onto the file server socket, off the Tk thread
+        self.controller.set_status(f"Uploading {name} v{version}...")
+        upload_in_background(
+            self, src, upload_path, version,
+            on_progress=lambda done, total: self.controller.set_status(
+                f"Uploading {name} v{version}: {done * 100 // total if total else 100}% "
+                f"({done // 1024} / {total // 1024} KiB)"),
+            on_done=lambda result: self._upload_done(game_id, ver_resp.get("version_id"), name, version, upload_path, result),
+            on_error=self._upload_failed,
+            on_stage=lambda state: self.controller.set_status(f"Server is processing {name} v{version}: {state}"),
+        )
 
+    def _upload_done(self, game_id, version_id, name, version, upload_path, result):
+        # players only see the version once the lobby has published it
+        self.controller.lobby_client.call_publish_version(
+            self, version_id, lambda pub: self._on_published(pub, game_id, name, version, upload_path, result),
+            lambda e: self._step_failed("Publish failed", str(e)))
+
+    def _on_published(self, pub: dict, game_id, name, version, upload_path, result):
+        self.btn_create.config(state=tk.NORMAL)
+        if not pub.get("ok"):
+            messagebox.showerror("Publish failed", f"{pub.get('message')}\n(code: {pub.get('error')})")
+            self.controller.set_status(f"{name} v{version} uploaded but not published")
+            return
         messagebox.showinfo(
             "Game created & uploaded",
             f"Game created.\nID: {game_id}\nName: {name}\n"
-            f"Version: {version}\nZip: {zip_path}\nServer: {result.get('stored_path', upload_path)}"
+            f"Version: {version}\nZip: {result.get('bytes')} bytes\nServer: {result.get('stored_path', upload_path)}"
         )
 
         self.controller.set_status(f"Uploaded {name} v{version}")
         # 建完之後回到 DevHome
         self.controller.show_frame("DeveloperHomeFrame")
+
+    def _upload_failed(self, e):
+        self.btn_create.config(state=tk.NORMAL)
+        messagebox.showerror("File upload failed", str(e))
+        self.controller.set_status("File upload failed")
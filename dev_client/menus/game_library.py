@@ -48,13 +48,14 @@ class GameLibraryFrame(tk.Frame):
             self.listbox.delete(0, tk.END)
             return
 
-        local_games = {g["game_id"]: g for g in get_user_games(username)}
+        self.controller.lobby_client.call(
+            self, {"cmd": "developer_list_games"},
+            lambda resp: self._on_games(username, resp),
+            lambda e: messagebox.showerror("Network error", str(e)),
+        )
 
-        try:
-            resp = self.controller.lobby_client.send_request({"cmd": "developer_list_games"})
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+    def _on_games(self, username: str, resp: dict):
+        local_games = {g["game_id"]: g for g in get_user_games(username)}
 
         if not resp.get("ok"):
             msg = resp.get("message", "Failed to list games.")
@@ -100,15 +101,12 @@ class GameLibraryFrame(tk.Frame):
         name = g.get("game_name")
         if not messagebox.askyesno("Delete game", f"Delete {name} (ID {gid}) from store?"):
             return
-        try:
-            resp = self.controller.lobby_client.send_request({
-                "cmd": "developer_delete_game",
-                "game_id": gid,
-            })
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
-        
+        self.controller.lobby_client.call(self, {
+            "cmd": "developer_delete_game",
+            "game_id": gid,
+        }, lambda resp: self._on_deleted(resp, gid, name), lambda e: messagebox.showerror("Network error", str(e)))
+
+    def _on_deleted(self, resp: dict, gid, name):
         if not resp.get("ok"):
             messagebox.showerror("Delete failed", resp.get("message", "Failed to delete"))
             return
@@ -1,9 +1,7 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from pathlib import Path
-from ..api_client import upload_file_to_server
-import shutil
-import zipfile
+from ..api_client import upload_in_background
 
 
 class DevUploadFrame(tk.Frame):
@@ -41,7 +39,8 @@ class DevUploadFrame(tk.Frame):
         btn_frame = tk.Frame(self, bg=self.controller.bg_color)
         btn_frame.pack(pady=10)
 
-        tk.Button(btn_frame, text="Upload", width=12, bg="gray30", fg=self.controller.fg_color, command=self.upload).grid(row=0, column=0, padx=5)
+        self.btn_upload = tk.Button(btn_frame, text="Upload", width=12, bg="gray30", fg=self.controller.fg_color, command=self.upload)
+        self.btn_upload.grid(row=0, column=0, padx=5)
         tk.Button(btn_frame, text="Back", width=12, bg="gray30", fg=self.controller.fg_color,
                   command=lambda: controller.show_frame("GameLibraryFrame")).grid(row=0, column=1, padx=5)
 
@@ -50,12 +49,11 @@ class DevUploadFrame(tk.Frame):
 
 
     def on_show(self):
-        try:
-            resp = self.controller.lobby_client.send_request({"cmd": "developer_list_games",})
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+        self.controller.lobby_client.call(
+            self, {"cmd": "developer_list_games",}, self._on_dev_games,
+            lambda e: messagebox.showerror("Network error", str(e)))
 
+    def _on_dev_games(self, resp: dict):
         if not resp.get("ok"):
             messagebox.showerror("Error", resp.get("message"))
             return
@@ -100,7 +98,11 @@ class DevUploadFrame(tk.Frame):
             messagebox.showerror("Error", "Invalid game selection.")
             return
 
-        game = next(g for g in self.dev_games if g["game_id"]  ==  game_id)
+        game = next((g for g in self.dev_games if g["game_id"]  ==  game_id), None)
+        if game is None:
+            # developer_list_games has not answered yet
+            messagebox.showwarning("Upload", "The game list is still loading, try again in a moment.")
+            return
         game_name = game.get("game_name")
         game_version = game.get("latest_version")
 
@@ -113,55 +115,69 @@ class DevUploadFrame(tk.Frame):
             return
         # game_name = next(g["game_name"] for g in self.dev_games if g["game_id"] == game_id)
 
-        dev = self.controller.get_current_user()
-        workspace = Path("dev_client/dev_workspace") / dev / f"{game_id}_{game_name}" / f"v{version}"
-        workspace.mkdir(parents=True, exist_ok=True)
-
         src = Path(src_path)
-        if src.is_dir():
-            shutil.copytree(src, workspace, dirs_exist_ok=True)
-        else:
-            shutil.copy2(src, workspace)
+        if not src.exists():
+            messagebox.showerror("Upload Failed", f"{src} does not exist")
+            return
 
-        zip_path = workspace.with_suffix(".zip")
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as z:
-            for file in workspace.rglob("*"):
-                rel_path = file.relative_to(workspace)
-                z.write(file, rel_path)
+        self.btn_upload.config(state=tk.DISABLED)
+        self.controller.lobby_client.call(self, {
+            "cmd": "developer_create_version",
+            "game_id": game_id,
+            "game_version": version,
+            "changelog": changelog,
+        }, lambda resp: self._on_version_created(resp, version, src),
+            lambda e: self._step_failed("Network error", str(e)))
 
-        try:
-            resp = self.controller.lobby_client.send_request({
-                "cmd": "developer_create_version",
-                "game_id": game_id,
-                "game_version": version,
-                "changelog": changelog,
-            })
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+    def _step_failed(self, title: str, msg: str):
+        self.btn_upload.config(state=tk.NORMAL)
+        messagebox.showerror(title, msg)
 
+    def _on_version_created(self, resp: dict, version, src):
         if not resp.get("ok"):
-            messagebox.showerror("Upload Failed", resp.get("message"))
+            self._step_failed("Upload Failed", resp.get("message"))
             return
 
         upload_path = resp.get("upload_path")
         if not upload_path:
-            messagebox.showerror("Upload Failed", "server did not return upload_path")
+            self._step_failed("Upload Failed", "server did not return upload_path")
             return
         
-        try:
-            result = upload_file_to_server(zip_path, upload_path, version)
-        except Exception as e:
-            messagebox.showerror("File Upload Failed". str(e))
-            self.controller.set_status(f"File upload")
+        # zipped straight onto the file server socket, off the Tk thread
+        self.controller.set_status(f"Uploading version {version}...")
+        upload_in_background(
+            self, src, upload_path, version,
+            on_progress=lambda done, total: self.controller.set_status(
+                f"Uploading version {version}: {done * 100 // total if total else 100}% "
+                f"({done // 1024} / {total // 1024} KiB)"),
+            on_done=lambda result: self._upload_done(resp.get("version_id"), version, upload_path, result),
+            on_error=self._upload_failed,
+            on_stage=lambda state: self.controller.set_status(f"Server is processing version {version}: {state}"),
+        )
+
+    def _upload_done(self, version_id, version, upload_path, result):
+        # players only see the version once the lobby has published it
+        self.controller.lobby_client.call_publish_version(
+            self, version_id, lambda pub: self._on_published(pub, version, upload_path, result),
+            lambda e: self._step_failed("Publish Failed", str(e)))
+
+    def _on_published(self, pub: dict, version, upload_path, result):
+        self.btn_upload.config(state=tk.NORMAL)
+        if not pub.get("ok"):
+            messagebox.showerror("Publish Failed", pub.get("message"))
+            self.controller.set_status(f"Version {version} uploaded but not published")
             return
-        
         messagebox.showinfo(
             "Upload Done",
             f"Metadata + file upload success.\n"
-            f"Zip: {zip_path}\n"
+            f"Zip: {result.get('bytes')} bytes, sha256 {result.get('sha256', '')[:12]}\n"
             f"Server: {result.get('stored_path', upload_path)}"
         )
 
         self.controller.set_status(f"Uploaded version {version}")
         self.controller.show_frame("DeveloperHomeFrame")
+
+    def _upload_failed(self, e):
+        self.btn_upload.config(state=tk.NORMAL)
+        messagebox.showerror("File Upload Failed", str(e))
+        self.controller.set_status("File upload failed")
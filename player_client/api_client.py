@@ -2,13 +2,21 @@ from __future__ import annotations
 
 import socket
 import json
+import hashlib
+import os
+import random
+import shutil
+import time
 import threading
-import queue
+import heapq
 import itertools
+from concurrent.futures import Future, InvalidStateError
 
 
 from typing import Dict, Any, Callable, Optional, List
 from pathlib import Path
+
+from .common.protocol import DEFAULT_FRAMING, FRAMINGS, encode_message, recv_message
 from tkinter import messagebox
 
 LOBBY_HOST = None
@@ -19,40 +27,172 @@ FILE_PORT = None
 BASE_DIR = Path(__file__).resolve().parent
 PLAYERS_DIR = BASE_DIR / "players"
 
+# file server downloads: socket timeout (s) and how often a dropped one is resumed
+DOWNLOAD_TIMEOUT = 30.0
+DOWNLOAD_RETRIES = 5
+# how often a BUSY file server is asked again (after its retry_after)
+BUSY_RETRIES = 10
+# how long a lobby request waits for its reply before failing with TimeoutError (s)
+REQUEST_TIMEOUT = 15.0
+# requests allowed in flight at once; past that request() fails instead of queueing
+MAX_PENDING = 1000
+# lobby connect + handshake timeout (s), and the backoff between reconnect attempts
+CONNECT_TIMEOUT = 10.0
+RECONNECT_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
+class CatalogMirror:
+    """
+    Local copy of the store listing, kept in sync with list_games_delta so a
+    refresh only transfers the games that changed since our catalog_version.
+    """
+
+    def __init__(self) -> None:
+        self.version: Optional[int] = None
+        self._games: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def apply(self, delta: Dict[str, Any]) -> None:
+        with self._lock:
+            if delta.get("full"):
+                self._games = {}
+            for g in delta.get("added", []) + delta.get("changed", []):
+                self._games[g["game_id"]] = g
+            for game_id in delta.get("removed", []):
+                self._games.pop(game_id, None)
+            self.version = delta.get("catalog_version")
+
+    def apply_event(self, evt: Dict[str, Any]) -> bool:
+        """
+        Apply a pushed catalog_delta. Returns False if it does not follow our
+        version (we missed something), in which case the caller should sync.
+        """
+        if evt.get("full") or evt.get("since") == self.version:
+            self.apply(evt)
+            return True
+        # already synced past this event
+        return self.version is not None and evt.get("catalog_version", 0) <= self.version
+
+    def games(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._games[gid] for gid in sorted(self._games)]
+
+    def get(self, game_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._games.get(game_id)
+
+
+def _settle(fut: Future, result=None, error: Optional[BaseException] = None) -> None:
+    # the reply, a timeout and a cancel can race; whichever comes first wins
+    try:
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+    except InvalidStateError:
+        pass
+
+
 class LobbyClient:
 
-    def __init__(self, host: str = LOBBY_HOST, port: int = LOBBY_PORT) -> None:
+    def __init__(self, host: str = LOBBY_HOST, port: int = LOBBY_PORT, framing: str = DEFAULT_FRAMING,
+                 auto_reconnect: bool = True) -> None:
         self.host = host
         self.port = port
         self.sock: Optional[socket.socket] = None
         self.file = None
-        self._recv_lock = threading.Lock()
+        # framing we ask for in hello; self.framing is what the server agreed to
+        self.preferred_framing = framing
+        self.framing = "json"
+        self._send_lock = threading.Lock()
 
         self._running = False
         self._listener_thread: Optional[threading.Thread] = None
-
-        self._pending: Dict[int, "queue.Queue[Dict[str, Any]]"] = {}
+        # connected: requests can go out; _closed: close() was called, stay down
+        self.connected = False
+        self._closed = False
+        # when the connection drops, reconnect and log back in with the
+        # resume_token from our last login; on_event gets "connection_lost"
+        # and then "reconnected" (with "resumed")
+        self.auto_reconnect = auto_reconnect
+        self.resume_token: Optional[str] = None
+        self._reconnecting = False
+        # topics to subscribe to again after a reconnect
+        self._topics: set = set()
+        # connected, _pending and _reconnecting change together under this lock
+        self._state_lock = threading.Lock()
+
+        # req_id -> Future of each request still waiting for its reply
+        self._pending: Dict[int, Future] = {}
         self._id_counter = itertools.count(1)
+        # (deadline, req_id, cmd) of the requests with a timeout, soonest first
+        self._deadlines: List[tuple] = []
+        self._deadline_cond = threading.Condition()
+        self._deadline_thread: Optional[threading.Thread] = None
 
         self.on_event: Optional[Callable[[Dict[str, Any]], None]] = None
 
+        self.catalog = CatalogMirror()
+
         self.connect()  
 
     def connect(self) -> None:
         if self.sock is not None:
             return  
-        sock = socket.create_connection((self.host, self.port))
+        self._closed = False
+        self._open()
+        self._start_threads()
+
+    def _open(self) -> bool:
+        """
+        Connect, agree on a framing and, if we hold a resume token, log back
+        in with it. Returns whether the session was resumed.
+        """
+        sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
         self.sock = sock
-        self.file = sock.makefile("r", encoding="utf-8")
+        self.file = sock.makefile("rb")
+        try:
+            self.framing = "json"
+            self.framing = self._hello()
+            resumed = self._resume()
+            # handshake done; from here the listener blocks until the lobby says something
+            sock.settimeout(None)
+        except Exception:
+            self._drop_socket()
+            raise
+        return resumed
 
+    def _start_threads(self) -> None:
+        with self._state_lock:
+            self.connected = True
         self._running = True
         self._listener_thread = threading.Thread(
-            target=self._listen_loop, daemon=True
+            target=self._listen_loop, args=(self.sock,), daemon=True
         )
         self._listener_thread.start()
+        if self._deadline_thread is None or not self._deadline_thread.is_alive():
+            self._deadline_thread = threading.Thread(
+                target=self._deadline_loop, daemon=True
+            )
+            self._deadline_thread.start()
 
     def close(self) -> None:
+        self._closed = True
         self._running = False
+        with self._deadline_cond:
+            self._deadline_cond.notify()
+        self._drop_socket()
+        self._fail_pending(ConnectionError("LobbyClient closed"))
+
+    def _drop_socket(self) -> None:
+        if self.sock is not None:
+            try:
+                # wakes a listener blocked in recv first; closing the file
+                # waits for that read, and closing the socket alone does not end it
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
         if self.file is not None:
             try:
                 self.file.close()
@@ -67,49 +207,226 @@ class LobbyClient:
                 pass
             self.sock = None
 
-    def _listen_loop(self):
+    def _listen_loop(self, sock):
+        err = ConnectionError("server closed connection")
         try:
             while self._running:
                 msg = self.recv()
+                if msg.get("ok") and msg.get("resume_token"):
+                    # a login (or resume) reply; this is what we reconnect with
+                    self.resume_token = msg["resume_token"]
                 req_id = msg.get("req_id")
-                if isinstance(req_id, int) and req_id in self._pending:
-                    q = self._pending[req_id]
-                    q.put(msg)
+                if isinstance(req_id, int):
+                    # a reply; one nobody waits for any more (timed out, cancelled) is dropped
+                    fut = self._pending.pop(req_id, None)
+                    if fut is not None:
+                        _settle(fut, result=msg)
                     continue
 
-                if self.on_event is not None:
-                    self.on_event(msg)
-        except Exception:
-            pass
+                if msg.get("cmd") == "force_logout":
+                    # logged in elsewhere; resuming would only kick that session out in turn
+                    self.resume_token = None
+                self._emit(msg)
+        except Exception as e:
+            if not isinstance(e, ConnectionError):
+                e = ConnectionError(f"lost connection to lobby: {e}")
+            err = e
+        self._connection_lost(sock, err)
+
+    def _emit(self, evt: Dict[str, Any]) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(evt)
+        except Exception as e:
+            print(f"[!] on_event failed for {evt.get('cmd')}: {e}")
+
+    def _fail_pending(self, err: Exception) -> None:
+        # no reply is coming for anything in flight; wake every waiter now
+        with self._state_lock:
+            self.connected = False
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for fut in pending:
+            _settle(fut, error=err)
+
+    def _connection_lost(self, sock, err: Exception) -> None:
+        if sock is not self.sock:
+            return  # close() or a newer connection already took over
+        self._fail_pending(err)
+        if self._closed:
+            return
+        self._drop_socket()
+        self._emit({"cmd": "connection_lost", "message": str(err)})
+        if not self.auto_reconnect:
+            return
+        with self._state_lock:
+            if self._reconnecting:
+                return
+            self._reconnecting = True
+        threading.Thread(target=self._reconnect_loop, daemon=True).start()
+
+    def _reconnect_loop(self) -> None:
+        attempt = 0
+        try:
+            while not self._closed:
+                # backoff with jitter, so a restarted lobby is not hit by every client at once
+                delay = min(RECONNECT_DELAY * 2 ** attempt, RECONNECT_MAX_DELAY)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                attempt += 1
+                if self._closed:
+                    return
+                try:
+                    resumed = self._open()
+                except (OSError, RuntimeError, ValueError) as e:
+                    print(f"[!] reconnect attempt {attempt} failed: {e}")
+                    continue
+                if self._closed:
+                    self._drop_socket()
+                    return
+                self._start_threads()
+                print(f"[*] reconnected to lobby after {attempt} attempt(s), session {'resumed' if resumed else 'not resumed'}")
+                self._emit({"cmd": "reconnected", "resumed": resumed})
+                if resumed and self._topics:
+                    self.request({"cmd": "subscribe", "topics": sorted(self._topics)})
+                return
+        finally:
+            with self._state_lock:
+                self._reconnecting = False
+
+    def _resume(self) -> bool:
+        # like _hello, before the listener starts; a refused token is dropped (log in again)
+        if not self.resume_token:
+            return False
+        self.sock.sendall(encode_message({"cmd": "resume_session", "token": self.resume_token}, self.framing))
+        resp = recv_message(self.file, self.framing)
+        if resp is None:
+            raise RuntimeError("server closed connection")
+        if resp.get("ok"):
+            self.resume_token = resp.get("resume_token", self.resume_token)
+            return True
+        self.resume_token = None
+        return False
+
+    def _hello(self) -> str:
+        # before the listener starts, so the reply can be read here directly;
+        # a lobby that does not know hello answers UNKNOWN_CMD and we keep JSON lines
+        offered = [self.preferred_framing] + [f for f in FRAMINGS if f != self.preferred_framing]
+        self.sock.sendall(encode_message({"cmd": "hello", "framing": offered}))
+        resp = recv_message(self.file)
+        if resp is None:
+            raise RuntimeError("server closed connection")
+        if resp.get("ok") and resp.get("framing") in FRAMINGS:
+            return resp["framing"]
+        return "json"
+
+    def _deadline_loop(self) -> None:
+        while True:
+            expired = []
+            with self._deadline_cond:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    expired.append(heapq.heappop(self._deadlines))
+                if not expired:
+                    wait = self._deadlines[0][0] - now if self._deadlines else None
+                    self._deadline_cond.wait(wait)
+                    continue
+            for _, req_id, cmd in expired:
+                fut = self._pending.pop(req_id, None)
+                if fut is not None:
+                    _settle(fut, error=TimeoutError(f"no reply to {cmd} (req_id {req_id})"))
 
     def send(self, obj: Dict[str, Any]) -> None:
         if self.sock is None:
             raise RuntimeError("LobbyClient not connected. Call connect() first.")
-        data = json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n"
-        self.sock.sendall(data)
+        data = encode_message(obj, self.framing)
+        # requests may come from several threads at once; keep their bytes apart
+        with self._send_lock:
+            self.sock.sendall(data)
     
     def recv(self) -> Dict[str, Any]:
         if self.file is None:
             raise RuntimeError("LobbyClient not connected. Call connect() first.")
-        line = self.file.readline()
-        if not line:
+        msg = recv_message(self.file, self.framing)
+        if msg is None:
             raise RuntimeError("server closed connection")
-        print(line)
-        return json.loads(line)
+        return msg
     
-    def send_request(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+    def request(self, obj: Dict[str, Any], timeout: Optional[float] = REQUEST_TIMEOUT) -> Future:
+        """
+        Send a request without waiting for the reply. Returns a Future that the
+        listener thread resolves with the response (matched on req_id), or that
+        fails with TimeoutError after timeout seconds (None: no limit). Up to
+        MAX_PENDING requests can be in flight at once; the lobby answers them
+        in order. asyncio code can await it with asyncio.wrap_future().
+
+        Fails at once (ConnectionError) while not connected, and every request
+        in flight fails the moment the connection drops. Cancelling the future
+        forgets the request; its reply is dropped when it comes.
+        """
         req_id = next(self._id_counter)
         obj = dict(obj)  # shallow copy
         obj["req_id"] = req_id
 
-        q: "queue.Queue[Dict[str, Any]]" = queue.Queue()
-        self._pending[req_id] = q
-
-        self.send(obj)
-        resp = q.get()  # blocking
+        fut: Future = Future()
+        with self._state_lock:
+            if not self.connected:
+                error = ConnectionError("not connected to the lobby" + (" (reconnecting)" if self._reconnecting else ""))
+            elif len(self._pending) >= MAX_PENDING:
+                error = RuntimeError(f"too many lobby requests in flight ({MAX_PENDING})")
+            else:
+                error = None
+                self._pending[req_id] = fut
+        if error is not None:
+            _settle(fut, error=error)
+            return fut
+        fut.add_done_callback(lambda f: self._pending.pop(req_id, None))
+        if timeout is not None:
+            with self._deadline_cond:
+                heapq.heappush(self._deadlines, (time.monotonic() + timeout, req_id, obj.get("cmd")))
+                self._deadline_cond.notify()
+        try:
+            self.send(obj)
+        except Exception as e:
+            self._pending.pop(req_id, None)
+            _settle(fut, error=e)
+        return fut
+
+    def send_request(self, obj: Dict[str, Any], timeout: Optional[float] = REQUEST_TIMEOUT) -> Dict[str, Any]:
+        # blocking form of request(); from Tk callbacks use call() instead
+        return self.request(obj, timeout).result()
+
+    def call(self, widget, obj: Dict[str, Any],
+             on_done: Callable[[Dict[str, Any]], None],
+             on_error: Optional[Callable[[Exception], None]] = None,
+             timeout: Optional[float] = REQUEST_TIMEOUT) -> Future:
+        """
+        request() for Tk code: returns at once, and on_done(resp) or
+        on_error(exc) later runs on the Tk main loop via widget.after(), so
+        mainloop never waits on the network. Without on_error, failures are
+        only printed. A cancelled future calls neither.
+        """
+        fut = self.request(obj, timeout)
+
+        def deliver(f: Future) -> None:
+            if f.cancelled():
+                return
+            err = f.exception()
+            try:
+                if err is None:
+                    widget.after(0, on_done, f.result())
+                elif on_error is not None:
+                    widget.after(0, on_error, err)
+                else:
+                    print(f"[!] {obj.get('cmd')} failed: {err}")
+            except Exception:
+                # the window is gone (destroyed, or the main loop ended)
+                pass
 
-        self._pending.pop(req_id, None)
-        return resp
+        fut.add_done_callback(deliver)
+        return fut
 
     def register_player(self, username, password, display_name=None):
         req = {
@@ -142,20 +459,72 @@ class LobbyClient:
         })
     
     
+    def subscribe(self, *topics: str) -> Dict[str, Any]:
+        resp = self.send_request({"cmd": "subscribe", "topics": list(topics)})
+        if resp.get("ok"):
+            self._topics.update(topics)
+        return resp
+
+    def unsubscribe(self, *topics: str) -> Dict[str, Any]:
+        self._topics.difference_update(topics)
+        return self.send_request({"cmd": "unsubscribe", "topics": list(topics)})
+
+    def call_subscribe(self, widget, topics: List[str],
+                       on_done: Callable[[Dict[str, Any]], None],
+                       on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        # remembered up front, so an unsubscribe sent before the reply still wins
+        self._topics.update(topics)
+
+        def done(resp: Dict[str, Any]) -> None:
+            if not resp.get("ok"):
+                self._topics.difference_update(topics)
+            on_done(resp)
+
+        return self.call(widget, {"cmd": "subscribe", "topics": list(topics)}, done, on_error)
+
+    def call_unsubscribe(self, widget, topics: List[str]) -> Future:
+        self._topics.difference_update(topics)
+        return self.call(widget, {"cmd": "unsubscribe", "topics": list(topics)},
+                         lambda resp: None, lambda e: None)
+
+    def sync_catalog(self) -> Dict[str, Any]:
+        """Bring self.catalog up to date; returns the server response."""
+        resp = self.send_request({
+            "cmd": "list_games_delta",
+            "since": self.catalog.version,
+        })
+        if resp.get("ok"):
+            self.catalog.apply(resp)
+        return resp
+
+    def call_sync_catalog(self, widget,
+                          on_done: Callable[[Dict[str, Any]], None],
+                          on_error: Optional[Callable[[Exception], None]] = None) -> Future:
+        """sync_catalog() through call(); the catalog is updated on the Tk loop before on_done."""
+        def done(resp: Dict[str, Any]) -> None:
+            if resp.get("ok"):
+                self.catalog.apply(resp)
+            on_done(resp)
+
+        return self.call(widget, {"cmd": "list_games_delta", "since": self.catalog.version}, done, on_error)
+
     def check_vlocal_higher_vstore(self, username: str, store_game_id: int):
         try:
-            resp = self.send_request({"cmd": "list_games"})
+            resp = self.sync_catalog()
         except Exception as e:
             messagebox.showerror("Network error", str(e))
             return
         if not resp.get("ok"):
             return
-        
-        games = resp.get("games", [])
-        latest_ver = next(
-            (g.get("latest_version") for g in games if g.get("game_id") == store_game_id),
-            None,
-        )
+        return self.compare_installed(username, store_game_id)
+
+    def compare_installed(self, username: str, store_game_id: int):
+        """
+        The installed version against the catalog mirror, no network:
+        1 up to date, 0 outdated, -1 not installed, -2 not on the store.
+        """
+        game = self.catalog.get(store_game_id)
+        latest_ver = game.get("latest_version") if game else None
         if latest_ver is None:
             return -2 
 
@@ -221,45 +590,257 @@ def get_user_games(username: str) -> List[Dict[str, Any]]:
     games.sort(key=lambda g :g["game_id"])
     return games
 
-def download_file_from_server(download_path: str, dest: Path):
-    header = {
-        "action": "download",
-        "download_path": download_path
-    }
+def _open_file_request(header: Dict[str, Any]):
+    """
+    Connect to the file server and send header; returns (sock, reader, reply).
+    A BUSY reply is retried after the server's retry_after (plus some jitter,
+    so a crowd of clients does not come back at once), up to BUSY_RETRIES times.
+    """
     if not FILE_HOST or FILE_PORT is None:
         raise RuntimeError("FILE_HOST/FILE_PORT not configured; call load_connection_info() first")
-    
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-        sock.connect((FILE_HOST, FILE_PORT))
+    attempt = 0
+    while True:
+        sock = socket.create_connection((FILE_HOST, FILE_PORT), timeout=DOWNLOAD_TIMEOUT)
         f = sock.makefile("rb")
-
-        sock.sendall((json.dumps(header) + "\n").encode("utf-8"))
-
-        line = f.readline()
-        if not line:
-            raise RuntimeError("no ack from file server")
-        ack = json.loads(line.decode("utf-8"))
+        try:
+            sock.sendall((json.dumps(header) + "\n").encode("utf-8"))
+            line = f.readline()
+            if not line:
+                raise ConnectionError("no reply from file server")
+            reply = json.loads(line.decode("utf-8"))
+        except Exception:
+            f.close()
+            sock.close()
+            raise
+        if reply.get("error") != "BUSY" or attempt >= BUSY_RETRIES:
+            return sock, f, reply
+        f.close()
+        sock.close()
+        attempt += 1
+        time.sleep(float(reply.get("retry_after", 1)) * (1 + random.random() * 0.5))
+
+
+def _download_range(download_path: str, part: Path, offset: int) -> Dict[str, Any]:
+    """Append download_path from byte offset to the end onto part; returns the server's ack."""
+    header = {
+        "action": "download",
+        "download_path": download_path,
+        "offset": offset,
+    }
+    sock, f, ack = _open_file_request(header)
+    with sock, f:
         if not ack.get("ok"):
-            raise RuntimeError(f"file server refused: {ack}")
-        
-        file_size = int (ack["file_size"])
+            return ack
 
-        remaining = file_size
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        with dest.open("wb") as out:
+        remaining = int(ack.get("length", ack["file_size"]))
+        with part.open("ab") as out:
             while remaining > 0:
                 chunk = f.read(min(65536, remaining))
                 if not chunk:
-                    raise RuntimeError("connection closed mid-file")
+                    raise ConnectionError("connection closed mid-file")
                 out.write(chunk)
                 remaining -= len(chunk)
-        return {
-            "ok": True,
-            "stored_path": str(dest),
-            "bytes": file_size
-        }
+        return ack
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as rf:
+        while True:
+            chunk = rf.read(1024 * 1024)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def download_file_from_server(download_path: str, dest: Path, retries: int = DOWNLOAD_RETRIES):
+    """
+    Download into dest + ".part", resuming from whatever an earlier attempt
+    left there, and only move it to dest once its sha256 matches the file
+    server's. Connection errors are retried (from where they stopped) up to
+    `retries` times.
+    """
+    if not FILE_HOST or FILE_PORT is None:
+        raise RuntimeError("FILE_HOST/FILE_PORT not configured; call load_connection_info() first")
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(dest.name + ".part")
+    # the hash the .part was started against; if the file changed on the server, start over
+    part_meta = dest.with_name(dest.name + ".part.json")
+    expected = None
+    if part.exists() and part_meta.exists():
+        try:
+            expected = json.loads(part_meta.read_text(encoding="utf-8")).get("sha256")
+        except (OSError, ValueError):
+            expected = None
+    if expected is None and part.exists():
+        part.unlink()
+
+    attempt = 0
+    resumed_from = part.stat().st_size if part.exists() else 0
+    while True:
+        offset = part.stat().st_size if part.exists() else 0
+        try:
+            ack = _download_range(download_path, part, offset)
+        except (OSError, ValueError) as e:
+            attempt += 1
+            if attempt > retries:
+                raise RuntimeError(f"download failed after {retries} retries: {e}")
+            time.sleep(min(2 ** attempt * 0.5, 5.0))
+            continue
+
+        if not ack.get("ok"):
+            if ack.get("error") == "BAD_RANGE" and offset > 0 and attempt < retries:
+                # .part is longer than the file now is; start over
+                attempt += 1
+                part.unlink()
+                part_meta.unlink(missing_ok=True)
+                expected = None
+                continue
+            raise RuntimeError(f"file server refused: {ack}")
+
+        sha = ack.get("sha256")
+        if expected is None:
+            expected = sha
+            part_meta.write_text(json.dumps({"sha256": sha}), encoding="utf-8")
+        elif sha != expected:
+            # a different file than the one we resumed; throw away what we have
+            attempt += 1
+            if attempt > retries:
+                raise RuntimeError(f"{download_path} keeps changing on the server")
+            part.unlink(missing_ok=True)
+            part_meta.unlink(missing_ok=True)
+            expected = None
+            continue
+
+        if part.stat().st_size != int(ack["file_size"]):
+            raise RuntimeError(f"short download of {download_path}")
+        break
+
+    actual = _file_sha256(part)
+    if expected and actual != expected:
+        part.unlink(missing_ok=True)
+        part_meta.unlink(missing_ok=True)
+        raise RuntimeError(f"checksum mismatch for {download_path}: got {actual}, expected {expected}")
+
+    os.replace(part, dest)
+    part_meta.unlink(missing_ok=True)
+    return {
+        "ok": True,
+        "stored_path": str(dest),
+        "bytes": dest.stat().st_size,
+        "resumed_from": resumed_from,
+        "sha256": actual,
+    }
 
         
+def fetch_manifest(download_path: str) -> Dict[str, Any]:
+    """The file server's list of files (path, size, sha256) in a stored version zip."""
+    header = {"action": "manifest", "download_path": download_path}
+    sock, f, resp = _open_file_request(header)
+    with sock, f:
+        if not resp.get("ok"):
+            raise RuntimeError(f"file server refused: {resp}")
+        return resp
+
+
+def _download_members(download_path: str, paths: List[str], root: Path) -> int:
+    """Fetch the given files of a version zip into root over one connection; returns bytes received."""
+    header = {"action": "download_files", "download_path": download_path, "paths": paths}
+    received = 0
+    sock, f, ack = _open_file_request(header)
+    with sock, f:
+        if not ack.get("ok"):
+            raise RuntimeError(f"file server refused: {ack}")
+
+        for _ in paths:
+            entry = json.loads(f.readline().decode("utf-8"))
+            target = _inside(root, entry["path"])
+            target.parent.mkdir(parents=True, exist_ok=True)
+            h = hashlib.sha256()
+            remaining = int(entry["file_size"])
+            with target.open("wb") as out:
+                while remaining > 0:
+                    chunk = f.read(min(65536, remaining))
+                    if not chunk:
+                        raise RuntimeError("connection closed mid-file")
+                    h.update(chunk)
+                    out.write(chunk)
+                    remaining -= len(chunk)
+            if h.hexdigest() != entry["sha256"]:
+                raise RuntimeError(f"checksum mismatch for {entry['path']}")
+            received += int(entry["file_size"])
+    return received
+
+
+def _inside(root: Path, rel: str) -> Path:
+    target = (root / rel).resolve()
+    if not target.is_relative_to(root.resolve()):
+        raise RuntimeError(f"bad path in manifest: {rel}")
+    return target
+
+
+def update_game_files(download_path: str, old_dir: Path, new_dir: Path, skip=("server/",)) -> Dict[str, Any]:
+    """
+    Build new_dir for the version at download_path from an installed old_dir:
+    files whose size and sha256 match the server's manifest are hardlinked (or
+    copied) from old_dir, and only the rest are downloaded. Files under the
+    `skip` prefixes are left out. new_dir is assembled in a staging dir and
+    only renamed into place once complete.
+    """
+    manifest = fetch_manifest(download_path)
+    staging = new_dir.with_name(new_dir.name + ".partial")
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    missing = []
+    reused = 0
+    total = 0
+    try:
+        for entry in manifest["files"]:
+            rel = entry["path"]
+            if rel.startswith(tuple(skip)):
+                continue
+            total += int(entry["size"])
+            target = _inside(staging, rel)
+            old = _inside(old_dir, rel)
+            if old.is_file() and old.stat().st_size == entry["size"] and _file_sha256(old) == entry["sha256"]:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(old, target)
+                except OSError:
+                    shutil.copy2(old, target)
+                reused += 1
+            else:
+                missing.append(rel)
+
+        received = _download_members(download_path, missing, staging) if missing else 0
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if new_dir.exists():
+        shutil.rmtree(new_dir)
+    os.replace(staging, new_dir)
+    return {
+        "ok": True,
+        "stored_path": str(new_dir),
+        "reused": reused,
+        "fetched": len(missing),
+        "bytes": received,
+        "total_bytes": total,
+    }
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    """Write JSON next to path and rename it over path, so readers never see half a file."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
 def parse_ver(v: str) -> tuple[int,...]:
     parts = (v or "0").split(".")
     nums = []
@@ -275,14 +856,4 @@ def cmp_ver(a: str, b: str) -> int:
     n = max(len(pa), len(pb))
     pa += (0,) * (n - len(pa))
     pb += (0,) * (n - len(pb))
-    return (pa > pb) - (pa < pb) 
-
-
-        
-
-
-
-
-
-
-    
+    return (pa > pb) - (pa < pb)
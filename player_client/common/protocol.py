@@ -0,0 +1,223 @@
+import json
+import socket
+import struct
+
+try:
+    # C decoder for the same wire format, used when installed; our own
+    # packer writes the bytes either way
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Client side of server/common/protocol.py: the two framings and the codec,
+# without the lobby's fan-out helpers. The wire format must stay the same as
+# the server's. Messages are JSON lines until a "hello" handshake agrees on
+# "binary": a 4-byte big-endian length followed by a msgpack-style payload.
+FRAMINGS = ("binary", "json")
+# what LobbyClient asks for first. Binary only pays off with the msgpack
+# extension; the pure-Python unpacker decodes a 100-game list_games ~5x
+# slower than json does (bench/bench_codec.py)
+DEFAULT_FRAMING = "binary" if msgpack is not None else "json"
+# frames longer than this are refused
+MAX_FRAME = 1 << 20
+
+_LEN = struct.Struct(">I")
+
+def encode_json(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+# msgpack-style codec: the msgpack wire format for nil, bool, int, float64,
+# str, bin, array and map. Map keys are turned into strings the way json.dumps
+# does, so a message decodes to the same dict under either framing.
+def _key(k) -> str:
+    return k if isinstance(k, str) else json.dumps(k)
+
+def _pack_into(out: bytearray, obj) -> None:
+    t = type(obj)
+    if t is str:
+        data = obj.encode("utf-8")
+        n = len(data)
+        if n < 32:
+            out.append(0xA0 | n)
+        elif n < 0x100:
+            out += b"\xd9" + bytes((n,))
+        elif n < 0x10000:
+            out += b"\xda" + n.to_bytes(2, "big")
+        else:
+            out += b"\xdb" + n.to_bytes(4, "big")
+        out += data
+    elif t is int:
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -32 <= obj < 0:
+            out.append(obj & 0xFF)
+        elif obj > 0:
+            # smallest width that fits, as msgpack does
+            for tag, size in ((b"\xcc", 1), (b"\xcd", 2), (b"\xce", 4), (b"\xcf", 8)):
+                if obj < 1 << (8 * size):
+                    out += tag + obj.to_bytes(size, "big")
+                    return
+            raise OverflowError(f"int too large to pack: {obj}")
+        else:
+            for tag, size in ((b"\xd0", 1), (b"\xd1", 2), (b"\xd2", 4), (b"\xd3", 8)):
+                if obj >= -(1 << (8 * size - 1)):
+                    out += tag + obj.to_bytes(size, "big", signed=True)
+                    return
+            raise OverflowError(f"int too large to pack: {obj}")
+    elif t is dict:
+        n = len(obj)
+        if n < 16:
+            out.append(0x80 | n)
+        elif n < 0x10000:
+            out += b"\xde" + n.to_bytes(2, "big")
+        else:
+            out += b"\xdf" + n.to_bytes(4, "big")
+        for k, v in obj.items():
+            _pack_into(out, _key(k))
+            _pack_into(out, v)
+    elif t is list or t is tuple:
+        n = len(obj)
+        if n < 16:
+            out.append(0x90 | n)
+        elif n < 0x10000:
+            out += b"\xdc" + n.to_bytes(2, "big")
+        else:
+            out += b"\xdd" + n.to_bytes(4, "big")
+        for v in obj:
+            _pack_into(out, v)
+    elif obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif t is float:
+        out += b"\xcb" + struct.pack(">d", obj)
+    elif isinstance(obj, (bytes, bytearray)):
+        n = len(obj)
+        if n < 0x100:
+            out += b"\xc4" + bytes((n,))
+        elif n < 0x10000:
+            out += b"\xc5" + n.to_bytes(2, "big")
+        else:
+            out += b"\xc6" + n.to_bytes(4, "big")
+        out += obj
+    elif isinstance(obj, (str, int, float, dict, list, tuple)):
+        # subclasses (IntEnum, OrderedDict, ...) pack as their base type
+        for base in (bool, int, float, str, dict, list, tuple):
+            if isinstance(obj, base):
+                _pack_into(out, base(obj))
+                return
+    else:
+        raise TypeError(f"cannot pack {t.__name__}")
+
+def pack(obj) -> bytes:
+    out = bytearray()
+    _pack_into(out, obj)
+    return bytes(out)
+
+_FIXED = {
+    0xCC: (">B", 1), 0xCD: (">H", 2), 0xCE: (">I", 4), 0xCF: (">Q", 8),
+    0xD0: (">b", 1), 0xD1: (">h", 2), 0xD2: (">i", 4), 0xD3: (">q", 8),
+    0xCA: (">f", 4), 0xCB: (">d", 8),
+}
+_SIZED = {
+    # type byte -> (length bytes, kind)
+    0xD9: (1, "str"), 0xDA: (2, "str"), 0xDB: (4, "str"),
+    0xC4: (1, "bin"), 0xC5: (2, "bin"), 0xC6: (4, "bin"),
+    0xDC: (2, "array"), 0xDD: (4, "array"),
+    0xDE: (2, "map"), 0xDF: (4, "map"),
+}
+
+def _unpack_from(data: bytes, pos: int):
+    b = data[pos]
+    pos += 1
+    if b < 0x80:
+        return b, pos
+    if b >= 0xE0:
+        return b - 0x100, pos
+    if 0xA0 <= b < 0xC0:
+        n = b & 0x1F
+        return data[pos:pos + n].decode("utf-8"), pos + n
+    if 0x80 <= b < 0x90:
+        n, kind = b & 0x0F, "map"
+    elif 0x90 <= b < 0xA0:
+        n, kind = b & 0x0F, "array"
+    elif b == 0xC0:
+        return None, pos
+    elif b == 0xC2:
+        return False, pos
+    elif b == 0xC3:
+        return True, pos
+    elif b in _FIXED:
+        fmt, size = _FIXED[b]
+        return struct.unpack_from(fmt, data, pos)[0], pos + size
+    elif b in _SIZED:
+        size, kind = _SIZED[b]
+        n = int.from_bytes(data[pos:pos + size], "big")
+        pos += size
+    else:
+        raise ValueError(f"unsupported type byte 0x{b:02x}")
+
+    if kind == "str":
+        return data[pos:pos + n].decode("utf-8"), pos + n
+    if kind == "bin":
+        return bytes(data[pos:pos + n]), pos + n
+    if kind == "array":
+        items = []
+        for _ in range(n):
+            v, pos = _unpack_from(data, pos)
+            items.append(v)
+        return items, pos
+    result = {}
+    for _ in range(n):
+        k, pos = _unpack_from(data, pos)
+        v, pos = _unpack_from(data, pos)
+        result[k] = v
+    return result, pos
+
+def unpack(data: bytes):
+    if msgpack is not None:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    obj, pos = _unpack_from(data, 0)
+    if pos != len(data):
+        raise ValueError(f"{len(data) - pos} trailing bytes after packed value")
+    return obj
+
+def encode_frame(obj) -> bytes:
+    data = pack(obj)
+    return _LEN.pack(len(data)) + data
+
+def encode_message(obj, framing: str = "json") -> bytes:
+    if framing == "binary":
+        return encode_frame(obj)
+    return encode_json(obj) + b"\n"
+
+def send_json(sock: socket.socket, obj, framing: str = "json"):
+    sock.sendall(encode_message(obj, framing))
+
+def recv_json(file_obj):
+    line = file_obj.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+def recv_frame(file_obj):
+    """Read one length-prefixed frame from a binary file object; None at EOF."""
+    head = file_obj.read(4)
+    if not head:
+        return None
+    if len(head) < 4:
+        raise ConnectionError("connection closed mid-frame")
+    n = _LEN.unpack(head)[0]
+    if n > MAX_FRAME:
+        raise ValueError(f"frame of {n} bytes is too large")
+    data = file_obj.read(n)
+    if len(data) < n:
+        raise ConnectionError("connection closed mid-frame")
+    return unpack(data)
+
+def recv_message(file_obj, framing: str = "json"):
+    if framing == "binary":
+        return recv_frame(file_obj)
+    return recv_json(file_obj)
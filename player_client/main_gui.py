@@ -32,6 +32,7 @@ class PlayerClientApp(tk.Tk):
         self.current_room: dict | None = None
         self.selected_game_id = None
         self.selected_game_name = None
+        self.current_frame: str | None = None
 
         container = tk.Frame(self)
         container.pack(fill="both", expand=True)
@@ -68,6 +69,12 @@ class PlayerClientApp(tk.Tk):
 
     def show_frame(self, name: str):
         frame = self.frames[name]
+        prev = self.frames.get(self.current_frame)
+        if prev is not None and prev is not frame:
+            on_hide = getattr(prev, "on_hide", None)
+            if callable(on_hide):
+                on_hide()
+        self.current_frame = name
         on_show = getattr(frame, "on_show", None)
         if callable(on_show):
             on_show()
@@ -106,9 +113,17 @@ class PlayerClientApp(tk.Tk):
             self.handle_room_update(msg)
         elif cmd == "room_closed":
             self.handle_room_closed(msg)
+        elif cmd in ("room_added", "room_changed", "room_removed"):
+            self.frames["RoomListFrame"].apply_room_event(msg)
+        elif cmd == "catalog_delta":
+            self.frames["GameStoreFrame"].apply_catalog_event(msg)
         elif cmd == "server_shutdown":
-            messagebox.showinfo("Server", msg.get("message", "Server shutting down"))
-            self.destroy()
+            # the client reconnects by itself once the lobby is back
+            self.set_status(msg.get("message", "Server shutting down") + ", waiting for it to come back...")
+        elif cmd == "connection_lost":
+            self.set_status("Connection to lobby lost, reconnecting...")
+        elif cmd == "reconnected":
+            self.handle_reconnected(msg)
         elif cmd == "game_start":
             info = msg
             username = self.get_current_user()
@@ -120,16 +135,8 @@ class PlayerClientApp(tk.Tk):
                 messagebox.showinfo("Start Game", "Game has started")
                 proc = subprocess.Popen([sys.executable, "-m", "client.client", "--host", info["game_host"], "--port", str(info["game_port"]), "--room", str(info["room_id"]), "--user", str(username)], cwd=game_dir)
                 self.withdraw()
-                proc.wait()
-                self.after(0, self.deiconify)
-
-                if info["host_name"] == self.get_current_user():
-                    resp = self.lobby_client.send_request({
-                        "cmd": "finish_game",
-                        "room_id": info["room_id"],    
-                    })
-                # print("finish game", resp)
-                self.show_frame("PlayerHomeFrame")
+                # the match is waited for off the Tk loop, which keeps handling lobby events
+                threading.Thread(target=self._wait_game, args=(proc, info), daemon=True).start()
 
             else:
                 print("game dir is ",game_dir)
@@ -138,6 +145,32 @@ class PlayerClientApp(tk.Tk):
         else:
             print("[event]", msg)
 
+    def _wait_game(self, proc, info: dict):
+        proc.wait()
+        self.after(0, self._on_game_over, info)
+
+    def _on_game_over(self, info: dict):
+        self.deiconify()
+        if info["host_name"] == self.get_current_user():
+            self.lobby_client.call(self, {
+                "cmd": "finish_game",
+                "room_id": info["room_id"],
+            }, lambda resp: None)
+        self.show_frame("PlayerHomeFrame")
+
+    def handle_reconnected(self, msg: dict):
+        # the lobby dropped our room seat with the old connection
+        if self.get_current_room():
+            self.set_current_room(None)
+            if self.get_current_user():
+                self.show_frame("PlayerHomeFrame")
+        if msg.get("resumed") or not self.get_current_user():
+            self.set_status("Reconnected to lobby.")
+            return
+        self.set_current_user(None)
+        self.show_frame("MainMenuFrame")
+        self.set_status("Reconnected to lobby, please log in again.")
+
     def handle_room_update(self, msg: dict):
         room_id = msg.get("room_id")
         players = msg.get("players", [])
@@ -63,12 +63,13 @@ class RegisterFrame(tk.Frame):
             messagebox.showwarning("Input error", "Username and password are required.")
             return
 
-        try:
-            resp = self.client.register_player(username, password, display_name)
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+        self.client.call(self, {
+            "cmd": "player_register",
+            "username": username,
+            "password": password,
+        }, self._on_registered, lambda e: messagebox.showerror("Network error", str(e)))
 
+    def _on_registered(self, resp: dict):
         if resp.get("ok"):
             msg = resp.get("message", "Register success.")
             self.controller.set_status(f"Register OK: {msg}")
@@ -143,12 +144,13 @@ class LoginFrame(tk.Frame):
             messagebox.showwarning("Input error", "Username and password are required.")
             return
 
-        try:
-            resp = self.client.login_player(username, password)
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+        self.client.call(self, {
+            "cmd": "player_login",
+            "username": username,
+            "password": password,
+        }, lambda resp: self._on_login(resp, username), lambda e: messagebox.showerror("Network error", str(e)))
 
+    def _on_login(self, resp: dict, username: str):
         if resp.get("ok"):
             msg = resp.get("message", "Login success.")
             self.controller.set_status(f"Login OK: {msg}")
@@ -45,17 +45,19 @@ class GameDetailFrame(tk.Frame):
         self.load_detail()
 
     def load_detail(self):
-        try:
-            resp = self.controller.lobby_client.send_request({"cmd": "get_game_detail", "game_id": self.game_id})
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+        self.controller.lobby_client.call(
+            self, {"cmd": "get_game_detail", "game_id": self.game_id},
+            self._on_detail, lambda e: messagebox.showerror("Network error", str(e)),
+        )
 
+    def _on_detail(self, resp: dict):
         if not resp.get("ok"):
             messagebox.showerror("Load failed", resp.get("message", "failed"))
             return
 
         g = resp.get("game", {})
+        if g.get("game_id") != self.game_id:
+            return  # another game was opened while this one loaded
         self.lbl_title.config(text=g.get("game_name", ""))
         meta = f"ID {g.get('game_id')} | latest: {g.get('latest_version') or 'N/A'} | max players: {g.get('max_players') or '-'}"
         self.lbl_meta.config(text=meta)
@@ -88,21 +90,19 @@ class GameDetailFrame(tk.Frame):
             return
         comment = self.entry_comment.get().strip()
 
-        try:
-            resp = self.controller.lobby_client.send_request({
-                "cmd": "add_rating",
-                "game_id": self.game_id,
-                "score": score,
-                "comment": comment,
-            })
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+        self.controller.lobby_client.call(self, {
+            "cmd": "add_rating",
+            "game_id": self.game_id,
+            "score": score,
+            "comment": comment,
+        }, self._on_rated, lambda e: messagebox.showerror("Network error", str(e)))
 
+    def _on_rated(self, resp: dict):
         if not resp.get("ok"):
             messagebox.showerror("Submit failed", resp.get("message", "failed"))
             return
 
-        self.entry_comment.delete(0, tk.END)
-        self.render_comments(resp.get("ratings", []))
+        if resp.get("game_id") == self.game_id:
+            self.entry_comment.delete(0, tk.END)
+            self.render_comments(resp.get("ratings", []))
         messagebox.showinfo("Thank you", "Rating submitted")
@@ -39,12 +39,13 @@ class GameListFrame(tk.Frame):
             self.listbox.delete(0, tk.END)
             return
 
-        try: 
-            resp = self.controller.lobby_client.send_request({"cmd": "list_games"})
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+        self.controller.lobby_client.call(
+            self, {"cmd": "list_games"},
+            lambda resp: self._on_store_games(username, resp),
+            lambda e: messagebox.showerror("Network error", str(e)),
+        )
 
+    def _on_store_games(self, username: str, resp: dict):
         store_games = resp.get("games", [])
         active_ids = {g.get("game_id") for g in store_games}
 
@@ -81,11 +82,18 @@ class GameListFrame(tk.Frame):
             messagebox.showwarning("Select game", "Please select a game first.")
             return
 
+        username = self.controller.get_current_user()
+        self.controller.lobby_client.call_sync_catalog(
+            self, lambda resp: self._create_checked(resp, game, username), self._on_network_error)
+
+    def _on_network_error(self, e: Exception):
+        messagebox.showerror("Network error", str(e))
+
+    def _create_checked(self, resp: dict, game: dict, username: str):
         game_id = game["game_id"]
         max_players = 2
-        
-        username = self.controller.get_current_user()
-        check_result = self.controller.lobby_client.check_vlocal_higher_vstore(username, game_id)
+
+        check_result = self.controller.lobby_client.compare_installed(username, game_id) if resp.get("ok") else None
         if  check_result == 0:
             messagebox.showerror("Create room", "You have to install the latest version before create a room.")
             self.controller.show_frame("GameStoreFrame")
@@ -97,17 +105,15 @@ class GameListFrame(tk.Frame):
             messagebox.showinfo("Create room", "The game is deprecated on the store. However, you can still played the game with other players whose game version is same")
             return
 
-        try:
-            resp = self.controller.lobby_client.send_request({
-                "cmd": "create_room",
-                "game_id": game_id,
-                "max_players": max_players,
-                "game_version": game["version"],
-            })
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+        self.controller.lobby_client.call(self, {
+            "cmd": "create_room",
+            "game_id": game_id,
+            "max_players": max_players,
+            "game_version": game["version"],
+        }, lambda resp: self._on_room_created(resp, game, max_players), self._on_network_error)
 
+    def _on_room_created(self, resp: dict, game: dict, max_players: int):
+        game_id = game["game_id"]
         if resp.get("ok"):
             room_id = resp.get("room_id")
             msg = f"Room #{room_id} created for game {game_id} ({game['name']})."
@@ -3,7 +3,8 @@ import json, zipfile, shutil, os
 from tkinter import messagebox
 from pathlib import Path
 
-from ..api_client import get_user_games, download_file_from_server, cmp_ver, PLAYERS_DIR
+from ..api_client import (get_user_games, download_file_from_server, update_game_files, write_json_atomic,
+                          cmp_ver, PLAYERS_DIR)
 
 
 class GameStoreFrame(tk.Frame):
@@ -43,10 +44,33 @@ class GameStoreFrame(tk.Frame):
         ).grid(row=0, column=3, padx=5)
 
         self.current_games: list[dict] = []
+        self.subscribed = False
+        self.showing = False
 
     def on_show(self):
+        # catalog_delta events keep the list current while we are on this page
+        self.showing = True
+        self.controller.lobby_client.call_subscribe(self, ["catalog"], self._on_subscribed, lambda e: None)
         self.on_refresh()
 
+    def _on_subscribed(self, resp: dict):
+        if self.showing:
+            self.subscribed = bool(resp.get("ok"))
+
+    def on_hide(self):
+        # also sent while the subscribe is in flight; the lobby answers in order
+        self.showing = False
+        self.subscribed = False
+        self.controller.lobby_client.call_unsubscribe(self, ["catalog"])
+
+    def apply_catalog_event(self, evt: dict):
+        if not self.subscribed:
+            return
+        if not self.controller.lobby_client.catalog.apply_event(evt):
+            self.on_refresh()
+            return
+        self._render()
+
     def on_refresh(self):
         username = self.controller.get_current_user()
         if not username:
@@ -54,23 +78,31 @@ class GameStoreFrame(tk.Frame):
             self.listbox.delete(0, tk.END)
             return
 
-        # 1. 先拿本地已安裝遊戲
-        local_games = {g["game_id"]: g for g in get_user_games(username)}
+        # only the games changed since the last refresh come over the wire
+        self.controller.lobby_client.call_sync_catalog(self, self._on_catalog, self._on_network_error)
 
-        # 2. 向 server 拿所有 active 遊戲 + 最新版本
-        try:
-            resp = self.controller.lobby_client.send_request({"cmd": "list_games"})
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+    def _on_network_error(self, e: Exception):
+        messagebox.showerror("Network error", str(e))
 
+    def _on_catalog(self, resp: dict):
         if not resp.get("ok"):
             msg = resp.get("message", "Failed to list games.")
             self.info_var.set(msg)
             messagebox.showerror("List games", f"{msg})")
             return
 
-        games = resp.get("games", [])
+        self._render()
+
+    def _render(self):
+        username = self.controller.get_current_user()
+        if not username:
+            return
+
+        # 1. 先拿本地已安裝遊戲
+        local_games = {g["game_id"]: g for g in get_user_games(username)}
+
+        # 2. server 上所有 active 遊戲 + 最新版本 (catalog mirror)
+        games = self.controller.lobby_client.catalog.games()
         self.current_games = games
 
         self.listbox.delete(0, tk.END)
@@ -118,13 +150,17 @@ class GameStoreFrame(tk.Frame):
             return
         
         username = self.controller.get_current_user()
+        self.controller.lobby_client.call_sync_catalog(
+            self, lambda resp: self._download_checked(resp, g, username), self._on_network_error)
+
+    def _download_checked(self, resp: dict, g: dict, username: str):
         gid = g["game_id"]
         name = g.get("game_name", f"Game {gid}")
         latest_ver = g.get("latest_version")
         latest_ver_id = g.get("latest_version_id")
         upload_path = g.get("upload_path")
 
-        check_result = self.controller.lobby_client.check_vlocal_higher_vstore(username, gid)
+        check_result = self.controller.lobby_client.compare_installed(username, gid) if resp.get("ok") else None
         if  check_result == 1:
             messagebox.showinfo("Download", "You have installed the latest version")
             return
@@ -139,14 +175,52 @@ class GameStoreFrame(tk.Frame):
 
         dest_dir = PLAYERS_DIR / username / "games" / f"{gid}_{name}"
         dest_dir.mkdir(parents=True, exist_ok=True)
+        extracted_dir = dest_dir / f"v{latest_ver}"
+
+        # with an older version installed, only fetch the files that changed
+        delta = None
+        old_dir = self._installed_dir(dest_dir)
+        if old_dir is not None and old_dir != extracted_dir:
+            try:
+                delta = update_game_files(upload_path, old_dir, extracted_dir)
+                print(f"[download] {name}: reused {delta['reused']} files, "
+                      f"fetched {delta['fetched']} ({delta['bytes']} of {delta['total_bytes']} bytes)")
+            except Exception as e:
+                print(f"[download] delta update failed, downloading the whole zip: {e}")
+        if delta is None and not self._download_zip(upload_path, dest_dir, latest_ver):
+            return
+
+        meta = {
+            "game_id": gid,
+            "name": name,
+            "version": latest_ver,
+        }
+        write_json_atomic(dest_dir / "meta.json", meta)
+        self.controller.set_status(f"Downloaded {name} v{latest_ver}")
+        messagebox.showinfo("Download", "Download successfully")
+        self.on_refresh()
+
+    def _installed_dir(self, dest_dir: Path):
+        try:
+            meta = json.loads((dest_dir / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        old_dir = dest_dir / f"v{meta.get('version')}"
+        return old_dir if old_dir.is_dir() else None
+
+    def _download_zip(self, upload_path: str, dest_dir: Path, latest_ver: str) -> bool:
         dest_zip = dest_dir / f"v{latest_ver}.zip"
         try:
-            download_file_from_server(upload_path, dest_zip)
+            # only returns once the zip matches the server's sha256
+            result = download_file_from_server(upload_path, dest_zip)
         except Exception as e:
-            messagebox.showerror("Download failed", str(e))
+            # a partial download is kept; pressing Download again resumes it
+            messagebox.showerror("Download failed", f"{e}\n\nPress Download again to resume.")
             self.controller.set_status("Download failed")
-            return
-        
+            return False
+        if result.get("resumed_from"):
+            print(f"[download] resumed {upload_path} from byte {result['resumed_from']}")
+
         # do unzip
         extracted_dir = dest_dir / f"v{latest_ver}"
         try:
@@ -155,10 +229,10 @@ class GameStoreFrame(tk.Frame):
                 zf.extractall(extracted_dir)
         except Exception as e:
             messagebox.showwarning("Unzip failed", f"File saved as {dest_zip}, but unzip fialed: {e}")
-        
+
         try:
             server_path = extracted_dir / "server"
-            shutil.rmtree(server_path)            
+            shutil.rmtree(server_path)
         except FileNotFoundError:
             pass
 
@@ -166,17 +240,8 @@ class GameStoreFrame(tk.Frame):
             os.remove(dest_zip)
         except FileNotFoundError:
             pass
-         
-        
-        meta = {
-            "game_id": gid,
-            "name": name,
-            "version": latest_ver,
-        }
-        (dest_dir / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
-        self.controller.set_status(f"Downloaded {name} v{latest_ver}")
-        messagebox.showinfo("Download", "Download successfully")
-        self.on_refresh()
+        return True
+
     def on_view_detail(self):
         g = self._get_selected_game()
         if not g:
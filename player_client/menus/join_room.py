@@ -41,15 +41,12 @@ class JoinRoomFrame(tk.Frame):
             return
         
 
-        try:
-            resp = self.controller.lobby_client.request({
-                "cmd": "join_room",
-                "room_id": room_id,
-            })
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+        self.controller.lobby_client.call(self, {
+            "cmd": "join_room",
+            "room_id": room_id,
+        }, lambda resp: self._on_joined(resp, room_id), lambda e: messagebox.showerror("Network error", str(e)))
 
+    def _on_joined(self, resp: dict, room_id: int):
         if resp.get("ok"):
             # username = self.controller.get_current_user()
             # check_result = self.controller.lobby_client.check_vlocal_higher_vstore(username, resp.get("game_id"))
@@ -37,25 +37,61 @@ class RoomListFrame(tk.Frame):
         ).grid(row=0, column=2, padx=5)
 
         self.current_rooms: list[dict] = []
+        self.rooms: dict[int, dict] = {}
+        self.subscribed = False
+        self.showing = False
 
     def on_show(self):
-        self.on_refresh()
+        # the server pushes room_added/room_changed/room_removed while we are on this page
+        self.showing = True
+        self.controller.lobby_client.call_subscribe(self, ["rooms"], self._on_subscribed, self._on_network_error)
 
-    def on_refresh(self):
-        try:
-            resp = self.controller.lobby_client.send_request({
-                "cmd": "list_rooms",
-            })
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
+    def _on_subscribed(self, resp: dict):
+        if not self.showing:
+            return
+        if not resp.get("ok"):
+            self.on_refresh()
+            return
+        self.subscribed = True
+        self.rooms = {r["room_id"]: r for r in resp.get("rooms", [])}
+        self._render()
+
+    def on_hide(self):
+        # also sent while the subscribe is in flight; the lobby answers in order
+        self.showing = False
+        self.subscribed = False
+        self.controller.lobby_client.call_unsubscribe(self, ["rooms"])
+
+    def apply_room_event(self, evt: dict):
+        if not self.subscribed:
             return
+        if evt.get("cmd") == "room_removed":
+            self.rooms.pop(evt.get("room_id"), None)
+        else:
+            room = evt.get("room", {})
+            self.rooms[room.get("room_id")] = room
+        self._render()
+
+    def on_refresh(self):
+        # answered on the Tk loop by _on_rooms; the window stays responsive meanwhile
+        self.controller.lobby_client.call(self, {"cmd": "list_rooms"}, self._on_rooms, self._on_network_error)
+
+    def _on_network_error(self, e: Exception):
+        messagebox.showerror("Network error", str(e))
+
+    def _on_rooms(self, resp: dict):
         if not resp.get("ok"):
             msg = resp.get("message", "Failed to list rooms.")
             self.info_var.set(msg)
             messagebox.showerror("List rooms", f"{msg})")
             return
 
-        rooms = resp.get("rooms", [])
+        self.rooms = {r["room_id"]: r for r in resp.get("rooms", [])}
+        self._render()
+
+    def _render(self):
+        selected = self._get_selected_room()
+        rooms = [self.rooms[k] for k in sorted(self.rooms)]
         self.current_rooms = rooms
 
         self.listbox.delete(0, tk.END)
@@ -64,7 +100,7 @@ class RoomListFrame(tk.Frame):
             self.info_var.set("No open rooms.")
             return
 
-        for r in rooms:
+        for idx, r in enumerate(rooms):
             room_id = r.get("room_id")
             host = r.get("host", "?")
             game_name = r.get("game_name", f"Game {r.get('game_id')}")
@@ -72,6 +108,9 @@ class RoomListFrame(tk.Frame):
             mx = r.get("max_players", "?")
             text = f"Room #{room_id} | Host: {host} | Game: {game_name} | Players: {cur}/{mx}"
             self.listbox.insert(tk.END, text)
+            # keep the user's selection when a pushed update redraws the list
+            if selected is not None and room_id == selected.get("room_id"):
+                self.listbox.selection_set(idx)
 
         self.info_var.set(f"{len(rooms)} room(s) available.")
 
@@ -90,12 +129,16 @@ class RoomListFrame(tk.Frame):
             messagebox.showwarning("Select room", "Please select a room first.")
             return
 
-        room_id = room["room_id"]
         game_id = room.get("game_id")
 
         username = self.controller.get_current_user()
         print(f"game_id: {game_id}")
-        check_result = self.controller.lobby_client.check_vlocal_higher_vstore(username, game_id)
+        self.controller.lobby_client.call_sync_catalog(
+            self, lambda resp: self._join_checked(resp, room, username), self._on_network_error)
+
+    def _join_checked(self, resp: dict, room: dict, username: str):
+        game_id = room.get("game_id")
+        check_result = self.controller.lobby_client.compare_installed(username, game_id) if resp.get("ok") else None
         print(f"check_result: {check_result}")
         if  check_result == 0:
             messagebox.showerror("Join room", "You have to install the latest version before join the room.")
@@ -108,14 +151,13 @@ class RoomListFrame(tk.Frame):
             messagebox.showinfo("Join room", "The game is deprecated on the store. However, you can still played the game with other players whose game version is same")
             return
 
-        try:
-            resp = self.controller.lobby_client.send_request({
-                "cmd": "join_room",
-                "room_id": room_id,
-            })
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-            return
+        self.controller.lobby_client.call(self, {
+            "cmd": "join_room",
+            "room_id": room["room_id"],
+        }, lambda resp: self._on_joined(resp, room), self._on_network_error)
+
+    def _on_joined(self, resp: dict, room: dict):
+        room_id = room["room_id"]
         print(f"resp\n{resp}")
         if resp.get("ok"):            
             self.controller.set_current_room({
@@ -91,18 +91,23 @@ class RoomWaitFrame(tk.Frame):
             return
 
         room_id = room["room_id"]
-        try:
-            resp = self.controller.lobby_client.send_request({
-                "cmd": "room_info",
-                "room_id": room_id,
-            })
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
+        self.controller.lobby_client.call(self, {
+            "cmd": "room_info",
+            "room_id": room_id,
+        }, lambda resp: self._on_room_info(resp, room), self._on_network_error)
+
+    def _on_network_error(self, e: Exception):
+        messagebox.showerror("Network error", str(e))
 
+    def _on_room_info(self, resp: dict, room: dict):
         if not resp.get("ok"):
             msg = resp.get("message", "Failed to fetch room info.")
             messagebox.showerror("Room info", f"{msg})")
             return
+        # we may have left the room while the reply was on its way
+        current = self.controller.get_current_room()
+        if not current or current.get("room_id") != room.get("room_id"):
+            return
 
         players = resp.get("players", [])
         room["players"] = players
@@ -134,13 +139,16 @@ class RoomWaitFrame(tk.Frame):
 
         room_id = room["room_id"]
 
-        try:
-            resp = self.controller.lobby_client.send_request({
-                "cmd": "leave_room",
-            })
-        except Exception as e:
-            messagebox.showerror("Network error", str(e))
-        
+        self.controller.lobby_client.call(self, {
+            "cmd": "leave_room",
+        }, self._on_left, self._on_leave_error)
+
+    def _on_leave_error(self, e: Exception):
+        messagebox.showerror("Network error", str(e))
+        self.controller.set_current_room(None)
+        self.controller.show_frame("PlayerHomeFrame")
+
+    def _on_left(self, resp: dict):
         if resp.get("ok"):
             msg = resp.get("message", "Left room.")
             self.controller.set_status(msg)
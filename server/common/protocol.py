@@ -1,12 +1,323 @@
 import json
 import socket
+import struct
+import weakref
+
+try:
+    # C decoder for the same wire format, used when installed; our own
+    # packer writes the bytes either way
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Two framings on the same socket: newline-delimited JSON (the default, what
+# every client speaks) and, once a "hello" handshake agreed on it, "binary":
+# a 4-byte big-endian length followed by a msgpack-style payload.
+FRAMINGS = ("binary", "json")
+# frames longer than this are refused, like over-long lines in asyncio mode
+MAX_FRAME = 1 << 20
+# send_buffers() gathers with one sendmsg from this many bytes up (below it,
+# joining is cheaper than setting up the iovecs) and at most IOV_MAX buffers a call
+SCATTER_MIN = 64 * 1024
+IOV_MAX = 1024
+
+_LEN = struct.Struct(">I")
+
+class RawJSON:
+    """
+    A value that is already JSON-encoded. Put it at the top level of a message
+    and encode_json() splices the bytes in instead of serializing again;
+    pack() does the same with its packed form, made once on first use.
+    """
+    __slots__ = ("data", "_packed")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._packed = None
+
+    def packed(self) -> bytes:
+        if self._packed is None:
+            self._packed = pack(json.loads(self.data))
+        return self._packed
+
+def encode_json(obj) -> bytes:
+    if isinstance(obj, dict) and any(isinstance(v, RawJSON) for v in obj.values()):
+        # same separators as json.dumps, so the bytes on the wire do not change
+        parts = []
+        for k, v in obj.items():
+            value = v.data if isinstance(v, RawJSON) else json.dumps(v, ensure_ascii=False).encode("utf-8")
+            parts.append(json.dumps(str(k), ensure_ascii=False).encode("utf-8") + b": " + value)
+        return b"{" + b", ".join(parts) + b"}"
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+# msgpack-style codec: the msgpack wire format for nil, bool, int, float64,
+# str, bin, array and map. Map keys are turned into strings the way json.dumps
+# does, so a message decodes to the same dict under either framing.
+def _key(k) -> str:
+    return k if isinstance(k, str) else json.dumps(k)
+
+def _pack_into(out: bytearray, obj) -> None:
+    t = type(obj)
+    if t is str:
+        data = obj.encode("utf-8")
+        n = len(data)
+        if n < 32:
+            out.append(0xA0 | n)
+        elif n < 0x100:
+            out += b"\xd9" + bytes((n,))
+        elif n < 0x10000:
+            out += b"\xda" + n.to_bytes(2, "big")
+        else:
+            out += b"\xdb" + n.to_bytes(4, "big")
+        out += data
+    elif t is int:
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -32 <= obj < 0:
+            out.append(obj & 0xFF)
+        elif obj > 0:
+            # smallest width that fits, as msgpack does
+            for tag, size in ((b"\xcc", 1), (b"\xcd", 2), (b"\xce", 4), (b"\xcf", 8)):
+                if obj < 1 << (8 * size):
+                    out += tag + obj.to_bytes(size, "big")
+                    return
+            raise OverflowError(f"int too large to pack: {obj}")
+        else:
+            for tag, size in ((b"\xd0", 1), (b"\xd1", 2), (b"\xd2", 4), (b"\xd3", 8)):
+                if obj >= -(1 << (8 * size - 1)):
+                    out += tag + obj.to_bytes(size, "big", signed=True)
+                    return
+            raise OverflowError(f"int too large to pack: {obj}")
+    elif t is dict:
+        n = len(obj)
+        if n < 16:
+            out.append(0x80 | n)
+        elif n < 0x10000:
+            out += b"\xde" + n.to_bytes(2, "big")
+        else:
+            out += b"\xdf" + n.to_bytes(4, "big")
+        for k, v in obj.items():
+            _pack_into(out, _key(k))
+            _pack_into(out, v)
+    elif t is list or t is tuple:
+        n = len(obj)
+        if n < 16:
+            out.append(0x90 | n)
+        elif n < 0x10000:
+            out += b"\xdc" + n.to_bytes(2, "big")
+        else:
+            out += b"\xdd" + n.to_bytes(4, "big")
+        for v in obj:
+            _pack_into(out, v)
+    elif obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif t is float:
+        out += b"\xcb" + struct.pack(">d", obj)
+    elif t is RawJSON:
+        out += obj.packed()
+    elif isinstance(obj, (bytes, bytearray)):
+        n = len(obj)
+        if n < 0x100:
+            out += b"\xc4" + bytes((n,))
+        elif n < 0x10000:
+            out += b"\xc5" + n.to_bytes(2, "big")
+        else:
+            out += b"\xc6" + n.to_bytes(4, "big")
+        out += obj
+    elif isinstance(obj, (str, int, float, dict, list, tuple)):
+        # subclasses (IntEnum, OrderedDict, ...) pack as their base type
+        for base in (bool, int, float, str, dict, list, tuple):
+            if isinstance(obj, base):
+                _pack_into(out, base(obj))
+                return
+    else:
+        raise TypeError(f"cannot pack {t.__name__}")
+
+def pack(obj) -> bytes:
+    out = bytearray()
+    _pack_into(out, obj)
+    return bytes(out)
+
+_FIXED = {
+    0xCC: (">B", 1), 0xCD: (">H", 2), 0xCE: (">I", 4), 0xCF: (">Q", 8),
+    0xD0: (">b", 1), 0xD1: (">h", 2), 0xD2: (">i", 4), 0xD3: (">q", 8),
+    0xCA: (">f", 4), 0xCB: (">d", 8),
+}
+_SIZED = {
+    # type byte -> (length bytes, kind)
+    0xD9: (1, "str"), 0xDA: (2, "str"), 0xDB: (4, "str"),
+    0xC4: (1, "bin"), 0xC5: (2, "bin"), 0xC6: (4, "bin"),
+    0xDC: (2, "array"), 0xDD: (4, "array"),
+    0xDE: (2, "map"), 0xDF: (4, "map"),
+}
+
+def _unpack_from(data: bytes, pos: int):
+    b = data[pos]
+    pos += 1
+    if b < 0x80:
+        return b, pos
+    if b >= 0xE0:
+        return b - 0x100, pos
+    if 0xA0 <= b < 0xC0:
+        n = b & 0x1F
+        return data[pos:pos + n].decode("utf-8"), pos + n
+    if 0x80 <= b < 0x90:
+        n, kind = b & 0x0F, "map"
+    elif 0x90 <= b < 0xA0:
+        n, kind = b & 0x0F, "array"
+    elif b == 0xC0:
+        return None, pos
+    elif b == 0xC2:
+        return False, pos
+    elif b == 0xC3:
+        return True, pos
+    elif b in _FIXED:
+        fmt, size = _FIXED[b]
+        return struct.unpack_from(fmt, data, pos)[0], pos + size
+    elif b in _SIZED:
+        size, kind = _SIZED[b]
+        n = int.from_bytes(data[pos:pos + size], "big")
+        pos += size
+    else:
+        raise ValueError(f"unsupported type byte 0x{b:02x}")
+
+    if kind == "str":
+        return data[pos:pos + n].decode("utf-8"), pos + n
+    if kind == "bin":
+        return bytes(data[pos:pos + n]), pos + n
+    if kind == "array":
+        items = []
+        for _ in range(n):
+            v, pos = _unpack_from(data, pos)
+            items.append(v)
+        return items, pos
+    result = {}
+    for _ in range(n):
+        k, pos = _unpack_from(data, pos)
+        v, pos = _unpack_from(data, pos)
+        result[k] = v
+    return result, pos
+
+def unpack(data: bytes):
+    if msgpack is not None:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    obj, pos = _unpack_from(data, 0)
+    if pos != len(data):
+        raise ValueError(f"{len(data) - pos} trailing bytes after packed value")
+    return obj
+
+def encode_frame(obj) -> bytes:
+    data = pack(obj)
+    return _LEN.pack(len(data)) + data
+
+def encode_message(obj, framing: str = "json") -> bytes:
+    if framing == "binary":
+        return encode_frame(obj)
+    return encode_json(obj) + b"\n"
+
+# connections that switched to binary framing; weak, so a closed socket drops out
+_binary = weakref.WeakSet()
+
+def set_framing(sock, framing: str) -> None:
+    if framing == "binary":
+        _binary.add(sock)
+    else:
+        _binary.discard(sock)
+
+def framing_of(sock) -> str:
+    return "binary" if sock in _binary else "json"
+
+def choose_framing(offered) -> str:
+    """Pick the first framing in the client's hello we support; json otherwise."""
+    if isinstance(offered, str):
+        offered = [offered]
+    for framing in offered or ():
+        if framing in FRAMINGS:
+            return framing
+    return "json"
+
+def hello_framing(resp: dict):
+    """The framing a successful hello response switches to, else None."""
+    if resp.get("cmd") == "hello" and resp.get("ok"):
+        return resp.get("framing")
+    return None
+
+def broadcast(socks, *messages) -> int:
+    """
+    Send messages to every sock in socks. Each message is encoded once per
+    framing in use and the same bytes object is handed to every member, so
+    fanning out to a room costs one json.dumps, not one per player. A member
+    whose send fails is skipped (its own connection handler cleans up).
+    Returns how many members it was sent to.
+    """
+    encoded = {}
+    sent = 0
+    for sock in socks:
+        framing = framing_of(sock)
+        data = encoded.get(framing)
+        if data is None:
+            data = encoded[framing] = b"".join(encode_message(m, framing) for m in messages)
+        try:
+            sock.sendall(data)
+        except Exception:
+            continue
+        sent += 1
+    return sent
+
+def send_buffers(sock: socket.socket, buffers) -> None:
+    """
+    sendall() for a list of buffers. Large batches go out with sendmsg
+    (scatter-gather, so big shared buffers are not copied into a joined one);
+    small ones are joined, which is cheaper for them.
+    """
+    if len(buffers) == 1:
+        sock.sendall(buffers[0])
+        return
+    if not hasattr(sock, "sendmsg") or sum(len(b) for b in buffers) < SCATTER_MIN:
+        sock.sendall(b"".join(buffers))
+        return
+    views = [memoryview(b) for b in buffers]
+    i = 0
+    while i < len(views):
+        n = sock.sendmsg(views[i:i + IOV_MAX])
+        # skip what went out completely, then trim a partly sent buffer
+        while i < len(views) and n >= len(views[i]):
+            n -= len(views[i])
+            i += 1
+        if n:
+            views[i] = views[i][n:]
 
 def send_json(sock: socket.socket, obj):
-    data = json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n"
+    # a JSON line, or a frame if this connection agreed on binary framing
+    data = encode_message(obj, framing_of(sock))
     sock.sendall(data)
 
 def recv_json(file_obj):
     line = file_obj.readline()
     if not line:
         return None
-    return json.loads(line)
\ No newline at end of file
+    return json.loads(line)
+
+def recv_frame(file_obj):
+    """Read one length-prefixed frame from a binary file object; None at EOF."""
+    head = file_obj.read(4)
+    if not head:
+        return None
+    if len(head) < 4:
+        raise ConnectionError("connection closed mid-frame")
+    n = _LEN.unpack(head)[0]
+    if n > MAX_FRAME:
+        raise ValueError(f"frame of {n} bytes is too large")
+    data = file_obj.read(n)
+    if len(data) < n:
+        raise ConnectionError("connection closed mid-frame")
+    return unpack(data)
+
+def recv_message(file_obj, framing: str = "json"):
+    if framing == "binary":
+        return recv_frame(file_obj)
+    return recv_json(file_obj)
@@ -1,21 +1,63 @@
 import sqlite3
+import threading
 from pathlib import Path
 
 DB_PATH = Path(__file__).parent / "store.db"
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+# how long a writer waits on a locked database before sqlite gives up
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 16 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+
+# one connection per thread, opened on first use and reused afterwards
+_local = threading.local()
+
+
+def _open_connection():
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000)
 
     conn.row_factory = sqlite3.Row
     # activate foreign key
     conn.execute("PRAGMA foreign_keys = ON;")
+    # WAL lets readers keep going while start_game/finish_game write sessions
+    conn.execute("PRAGMA journal_mode = WAL;")
+    # with WAL, NORMAL only risks the last commits on power loss, never corruption
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB};")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE};")
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS};")
+    return conn
+
+
+def get_connection():
+    # callers use "with get_connection() as conn:", which commits/rolls back
+    # but does not close, so handing out the same connection again is safe
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _open_connection()
+        _local.conn = conn
     return conn
 
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _local.conn = None
+        conn.close()
+
+
 def init_db():
     schema_path = Path(__file__).parent / "schema.sql"
     with get_connection() as conn:
         with open(schema_path, "r", encoding="utf-8") as f:
             schema_sql = f.read()
         conn.executescript(schema_sql)
+        _migrate(conn)
+
 
-        
\ No newline at end of file
+def _migrate(conn):
+    # columns added after a database was first created
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(gamelog)")}
+    if "published" not in columns:
+        conn.execute("ALTER TABLE gamelog ADD COLUMN published INTEGER NOT NULL DEFAULT 1")
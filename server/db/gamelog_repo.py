@@ -2,17 +2,67 @@ from __future__ import annotations
 from typing import Optional, Dict, Any, List
 from . import get_connection
 
-def create_gamelog(game_id: int, game_version: str, changelog: str, upload_path: str, is_active: int = 1) -> int:
+def create_gamelog(game_id: int, game_version: str, changelog: str, upload_path: str,
+                   is_active: int = 1, published: int = 1) -> int:
     with get_connection() as conn:
         cur = conn.execute(
             """
-            INSERT INTO gamelog (game_id, game_version, changelog, upload_path, is_active)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO gamelog (game_id, game_version, changelog, upload_path, is_active, published)
+            VALUES (?, ?, ?, ?, ?, ?)
             """,
-            (game_id, game_version, changelog, upload_path, is_active),
+            (game_id, game_version, changelog, upload_path, is_active, published),
         )
         return cur.lastrowid
 
+def get_gamelog_by_version(game_id: int, game_version: str) -> Optional[Dict[str, Any]]:
+    with get_connection() as conn:
+        cur = conn.execute(
+            """
+            SELECT id, game_id, game_version, changelog, upload_path, is_active, published, uploaded_at
+            FROM gamelog
+            WHERE game_id = ? AND game_version = ?
+            """,
+            (game_id, game_version),
+        )
+        row = cur.fetchone()
+    return dict(row) if row else None
+
+def get_gamelog(version_id: int) -> Optional[Dict[str, Any]]:
+    with get_connection() as conn:
+        cur = conn.execute(
+            """
+            SELECT id, game_id, game_version, changelog, upload_path, is_active, published, uploaded_at
+            FROM gamelog
+            WHERE id = ?
+            """,
+            (version_id,),
+        )
+        row = cur.fetchone()
+    return dict(row) if row else None
+
+def update_pending_gamelog(version_id: int, changelog: str) -> None:
+    with get_connection() as conn:
+        conn.execute(
+            "UPDATE gamelog SET changelog = ?, uploaded_at = CURRENT_TIMESTAMP WHERE id = ? AND published = 0",
+            (changelog, version_id),
+        )
+
+def publish_gamelog(version_id: int, game_id: int) -> None:
+    # one transaction: the version goes live together with its game, or not at all
+    with get_connection() as conn:
+        conn.execute(
+            "UPDATE gamelog SET published = 1, is_active = 1 WHERE id = ?",
+            (version_id,),
+        )
+        conn.execute(
+            "UPDATE gamelog SET is_active = 1 WHERE game_id = ? AND published = 1",
+            (game_id,),
+        )
+        conn.execute(
+            "UPDATE games SET game_status = 'active' WHERE id = ?",
+            (game_id,),
+        )
+
 def get_latest_gamelog_for_game(game_id: int) -> Optional[Dict[str, Any]]:
     with get_connection() as conn:
         cur = conn.execute(
@@ -36,53 +86,95 @@ def get_latest_gamelog_for_game(game_id: int) -> Optional[Dict[str, Any]]:
         row = cur.fetchone()
     return dict(row) if row else None
 
+# id of the latest active version of game g; a single seek on idx_gamelog_latest,
+# so listing every game is one statement instead of a round trip per game.
+# A ROW_NUMBER() OVER (PARTITION BY game_id ...) window is ~3x slower here: sqlite
+# numbers every active gamelog row before the join (bench/bench_list_games.py)
+_LATEST_VERSION_ID = """(
+        SELECT id
+        FROM gamelog
+        WHERE game_id = g.id
+        AND is_active = 1
+        ORDER BY uploaded_at DESC, id DESC
+        LIMIT 1
+    )"""
+
+_GAMES_WITH_LATEST_SQL = """
+    SELECT
+        g.id AS game_id,
+        g.game_name,
+        g.game_description,
+        g.max_players,
+        l.game_version AS latest_version,
+        l.id AS latest_version_id,
+        l.upload_path
+    FROM games g
+    LEFT JOIN gamelog l ON l.id = """ + _LATEST_VERSION_ID + """
+    WHERE {where}
+    ORDER BY g.id
+"""
+
+# everything the lobby catalog keeps per game, deleted games included
+_CATALOG_SQL = """
+    SELECT
+        g.id AS game_id,
+        g.game_name,
+        g.game_description,
+        g.max_players,
+        g.game_status,
+        g.developer_id,
+        d.username AS developer_name,
+        l.game_version AS latest_version,
+        l.id AS latest_version_id,
+        l.upload_path
+    FROM games g
+    LEFT JOIN developers d ON d.id = g.developer_id
+    LEFT JOIN gamelog l ON l.id = """ + _LATEST_VERSION_ID + """
+    WHERE {where}
+    ORDER BY g.id
+"""
+
 def list_games_with_latest_version() -> List[Dict[str, Any]]:
-    from .games_repo import get_all_games
+    with get_connection() as conn:
+        cur = conn.execute(
+            _GAMES_WITH_LATEST_SQL.format(where="g.game_status = 'active'")
+        )
+        rows = cur.fetchall()
+    return [dict(row) for row in rows]
+
+def list_developer_games_with_latest_version(developer_id: int) -> List[Dict[str, Any]]:
+    with get_connection() as conn:
+        cur = conn.execute(
+            _GAMES_WITH_LATEST_SQL.format(where="g.developer_id = ?"),
+            (developer_id,),
+        )
+        rows = cur.fetchall()
+    return [dict(row) for row in rows]
 
-    games = get_all_games()
-    result: List[Dict[str, Any]] = []
+def list_catalog_entries(game_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    with get_connection() as conn:
+        if game_id is None:
+            cur = conn.execute(_CATALOG_SQL.format(where="1 = 1"))
+        else:
+            cur = conn.execute(_CATALOG_SQL.format(where="g.id = ?"), (game_id,))
+        rows = cur.fetchall()
+    return [dict(row) for row in rows]
 
+def list_superseded_versions() -> List[Dict[str, Any]]:
+    # versions uploaded before their game's latest published one; deleted games have none
     with get_connection() as conn:
-        for g in games:
-            game_id = g["id"]
-            cur = conn.execute(
-                """
-                SELECT
-                    id,
-                    game_version,
-                    upload_path,
-                    uploaded_at
-                FROM gamelog
-                WHERE game_id = ?
-                AND is_active = 1
-                ORDER BY uploaded_at DESC, id DESC
-                LIMIT 1
-                """,
-                (game_id,),
-            )
-            row = cur.fetchone()
-            latest_version = None
-            latest_version_id = None
-            upload_path = None
-            if row:
-                latest_version_id = row["id"]
-                latest_version = row["game_version"]
-                upload_path = row["upload_path"]
-            
-            result.append(
-                {
-                    "game_id": game_id,
-                    "game_name": g["game_name"],
-                    "game_description": g["game_description"],
-                    "max_players": g["max_players"],
-                    "latest_version": latest_version,
-                    "latest_version_id": latest_version_id,
-                    "upload_path": upload_path,
-                }
-
-            )
-
-    return result
+        cur = conn.execute(
+            """
+            SELECT l.id, l.game_id, l.game_version, l.upload_path
+            FROM games g
+            JOIN gamelog latest ON latest.id = """ + _LATEST_VERSION_ID + """
+            JOIN gamelog l ON l.game_id = g.id
+            WHERE l.uploaded_at < latest.uploaded_at
+            OR (l.uploaded_at = latest.uploaded_at AND l.id < latest.id)
+            """
+        )
+        rows = cur.fetchall()
+    return [dict(row) for row in rows]
 
 def deactivate_versions_for_game(game_id: int) -> int:
     with get_connection() as conn:
@@ -94,7 +186,7 @@ def deactivate_versions_for_game(game_id: int) -> int:
 def activate_versions_for_game(game_id: int) -> int:
     with get_connection() as conn:
         cur = conn.execute(
-            "UPDATE gamelog SET is_active = 1 WHERE game_id = ?",
+            "UPDATE gamelog SET is_active = 1 WHERE game_id = ? AND published = 1",
             (game_id,),
         )
 
@@ -46,10 +46,12 @@ def create_session(player_id, game_id, game_version_id=None):
 def search_session(player_id, game_id):
     with get_connection() as conn:
         cur = conn.execute(
-            """SELECT id from player_sessions WHERE player_id=? and game_id=?""",
+            """SELECT id from player_sessions WHERE player_id=? and game_id=?
+               ORDER BY finished_at IS NOT NULL, id DESC LIMIT 1""",
             (player_id, game_id),
         )
-        return cur.lastrowid
+        row = cur.fetchone()
+        return row["id"] if row else None
 
 def finish_session(session_id, result=None):
     with get_connection() as conn:
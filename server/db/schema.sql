@@ -54,12 +54,17 @@ CREATE TABLE IF NOT EXISTS gamelog(
     changelog TEXT,
     upload_path TEXT NOT NULL,
     is_active INTEGER NOT NULL DEFAULT 1,
+    published INTEGER NOT NULL DEFAULT 1, -- 0 until the upload is verified and on disk
     uploaded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
 
     UNIQUE(game_id, game_version),
     FOREIGN KEY (game_id) REFERENCES games(id)
 );
 
+-- latest-version lookups: filter by game and is_active, newest upload first
+CREATE INDEX IF NOT EXISTS idx_gamelog_latest
+    ON gamelog(game_id, is_active, uploaded_at, id);
+
 CREATE TABLE IF NOT EXISTS player_sessions(
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     player_id INTEGER NOT NULL,
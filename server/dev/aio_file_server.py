@@ -0,0 +1,171 @@
+import asyncio
+import json
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+# a header line longer than this, or slower than HEADER_TIMEOUT, is dropped
+MAX_HEADER = 256 * 1024
+HEADER_TIMEOUT = 10.0
+
+
+def _line(msg: dict) -> bytes:
+    return (json.dumps(msg) + "\n").encode("utf-8")
+
+
+class AsyncFileServer:
+    """
+    File server on one asyncio loop, for release days with many downloads.
+
+    Downloads, the bulk of the traffic, are sent from the loop itself with
+    sock_sendfile: no thread and no Python buffer per transfer. Every other
+    action (uploads, manifests, ...) runs the threaded server's handler on a
+    small executor. A semaphore caps concurrent transfers; a connection waits
+    up to queue_wait seconds for a slot, then gets busy_response() (BUSY with
+    retry_after) and is closed. Actions in `slotless` (quick lookups) skip the
+    semaphore.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        prepare_download: Callable[[dict], tuple],
+        run_request: Callable[[socket.socket, dict], None],
+        busy_response: Callable[[], dict],
+        max_transfers: int = 256,
+        queue_wait: float = 2.0,
+        rate_kbps: int = 0,
+        workers: int = 32,
+        backlog: int = 4096,
+        slotless=(),
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.prepare_download = prepare_download
+        self.run_request = run_request
+        self.busy_response = busy_response
+        self.max_transfers = max_transfers
+        self.queue_wait = queue_wait
+        self.rate = rate_kbps * 1024
+        self.backlog = backlog
+        self.slotless = tuple(slotless)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="file-worker")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._stopped: Optional[asyncio.Event] = None
+
+    async def _read_header(self, loop: asyncio.AbstractEventLoop, conn: socket.socket) -> Optional[dict]:
+        # peek first, then take exactly the header line; an upload's bytes stay in the socket
+        deadline = loop.time() + HEADER_TIMEOUT
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            ready = loop.create_future()
+            loop.add_reader(conn.fileno(), lambda: ready.done() or ready.set_result(None))
+            try:
+                await asyncio.wait_for(ready, remaining)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                loop.remove_reader(conn.fileno())
+            data = conn.recv(MAX_HEADER, socket.MSG_PEEK)
+            if not data:
+                return None
+            end = data.find(b"\n")
+            if end >= 0:
+                return json.loads(conn.recv(end + 1))
+            if len(data) >= MAX_HEADER:
+                return None
+            await asyncio.sleep(0.01)
+
+    async def handle_connection(self, conn: socket.socket, addr) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            header = await self._read_header(loop, conn)
+            if header is None:
+                return
+            if header.get("action") in self.slotless:
+                conn.setblocking(True)
+                await loop.run_in_executor(self.executor, self.run_request, conn, header)
+                return
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_wait)
+            except asyncio.TimeoutError:
+                await loop.sock_sendall(conn, _line(self.busy_response()))
+                return
+            try:
+                if header.get("action") == "download":
+                    await self._download(loop, conn, header)
+                else:
+                    conn.setblocking(True)
+                    await loop.run_in_executor(self.executor, self.run_request, conn, header)
+            finally:
+                self._slots.release()
+        except (ConnectionError, BrokenPipeError):
+            pass
+        except Exception as e:
+            print(f"[file] error with {addr}: {e}")
+        finally:
+            conn.close()
+
+    async def _download(self, loop: asyncio.AbstractEventLoop, conn: socket.socket, header: dict) -> None:
+        # may hash or rebuild the file the first time, so not on the loop
+        ack, full_path, offset, length = await loop.run_in_executor(self.executor, self.prepare_download, header)
+        await loop.sock_sendall(conn, _line(ack))
+        if not ack["ok"]:
+            return
+        with open(full_path, "rb") as rf:
+            await self._send_file(loop, conn, rf, offset, length)
+
+    async def _send_file(self, loop: asyncio.AbstractEventLoop, conn: socket.socket, rf, offset: int, count: int) -> None:
+        if count == 0:
+            return
+        if self.rate <= 0:
+            await loop.sock_sendfile(conn, rf, offset, count)
+            return
+        # a tenth of a second's worth at a time, then wait until the schedule catches up
+        step = max(self.rate // 10, 16 * 1024)
+        started = loop.time()
+        sent = 0
+        while sent < count:
+            n = min(step, count - sent)
+            await loop.sock_sendfile(conn, rf, offset + sent, n)
+            sent += n
+            delay = started + sent / self.rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    def request_stop(self) -> None:
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def serve(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_transfers)
+
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        srv.bind((self.host, self.port))
+        srv.listen(self.backlog)
+        srv.setblocking(False)
+        print(f"[file] listening on {self.host}:{self.port} (asyncio, up to {self.max_transfers} transfers)")
+
+        tasks = set()
+
+        async def accept_loop():
+            while True:
+                conn, addr = await loop.sock_accept(srv)
+                conn.setblocking(False)
+                task = loop.create_task(self.handle_connection(conn, addr))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+        acceptor = loop.create_task(accept_loop())
+        await self._stopped.wait()
+        acceptor.cancel()
+        srv.close()
+        for task in list(tasks):
+            task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,295 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# content-defined chunking: a cut may fall at the end of any run of a repeated
+# byte (found by the regex engine, not a Python loop) whose trailing WINDOW bytes
+# crc32 to 0 under CUT_MASK, so an insert early in a file only changes the
+# chunks around it. Such runs come every ~256 bytes in compressed data, so
+# chunks average ~20 KiB there.
+MIN_CHUNK = 4 * 1024
+MAX_CHUNK = 64 * 1024
+WINDOW = 32
+CUT_MASK = 0x3F
+READ_BLOCK = 8 * 1024 * 1024
+
+_CANDIDATE = re.compile(rb"(.)\1(?!\1)", re.DOTALL)
+
+
+class ChunkStoreError(Exception):
+    pass
+
+
+def cut_points(buf: bytes, final: bool) -> Tuple[List[int], int]:
+    """
+    Chunk ends in buf, and how much of buf they cover. Unless final, the tail
+    after the last cut is left over to be chunked with the next block.
+    """
+    cuts = []
+    start = 0
+    n = len(buf)
+    view = memoryview(buf)
+    while start < n:
+        limit = min(start + MAX_CHUNK, n)
+        cut = None
+        pos = start + MIN_CHUNK
+        while pos < limit:
+            m = _CANDIDATE.search(buf, pos, limit)
+            if m is None:
+                break
+            end = m.end()
+            if zlib.crc32(view[end - WINDOW:end]) & CUT_MASK == 0:
+                cut = end
+                break
+            pos = m.start() + 1
+        if cut is None:
+            if limit - start < MAX_CHUNK and not final:
+                break
+            cut = limit
+        cuts.append(cut)
+        start = cut
+    return cuts, start
+
+
+class ChunkStore:
+    """
+    Content-addressed store for uploaded packages. Every file is split into
+    content-defined chunks kept once under chunks/<sha256>, plus a recipe
+    (recipes/<key>.json: size, sha256 and the chunk list) to put it back
+    together, so versions of a game that share most of their bytes share
+    most of their chunks. Keys are paths relative to GAME_STORE_ROOT, the
+    same as a version's upload_path.
+
+    Chunks and recipes are written to a temp name and renamed, so the dev
+    server and the lobby can both use the store at once. The dev server is
+    the only writer; it keeps running totals for stats() in stats.json.
+    """
+
+    def __init__(self, root) -> None:
+        self.root = Path(root)
+        self.chunk_dir = self.root / "chunks"
+        self.recipe_dir = self.root / "recipes"
+        self.stats_path = self.root / "stats.json"
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._totals: Optional[dict] = None
+        self._totals_lock = threading.Lock()
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.chunk_dir / digest[:2] / digest
+
+    def _recipe_path(self, key: str) -> Path:
+        key = key.replace("\\", "/").lstrip("/")
+        if ".." in key.split("/"):
+            raise ChunkStoreError(f"bad key {key}")
+        return self.recipe_dir / (key + ".json")
+
+    def has(self, key: str) -> bool:
+        try:
+            return self._recipe_path(key).is_file()
+        except ChunkStoreError:
+            return False
+
+    def stored_at(self, key: str) -> float:
+        """When key's recipe was last written (st_mtime); 0.0 if key is not in the store."""
+        try:
+            return self._recipe_path(key).stat().st_mtime
+        except (OSError, ChunkStoreError):
+            return 0.0
+
+    def recipe(self, key: str) -> dict:
+        try:
+            with self._recipe_path(key).open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ChunkStoreError(f"{key} is not in the chunk store")
+
+    # writing
+    def put_file(self, key: str, path) -> dict:
+        """Chunk the file at path into the store under key; returns its recipe."""
+        with self._totals_lock:
+            # seeded before this upload writes any chunk, so none is counted twice
+            self._load_totals()
+        chunks = []
+        h = hashlib.sha256()
+        size = 0
+        new_chunks = 0
+        new_bytes = 0
+        with open(path, "rb") as f:
+            buf = b""
+            while True:
+                block = f.read(READ_BLOCK)
+                final = not block
+                buf = buf + block if buf else block
+                cuts, used = cut_points(buf, final)
+                start = 0
+                for end in cuts:
+                    data = buf[start:end]
+                    digest = hashlib.sha256(data).hexdigest()
+                    if self._write_chunk(digest, data):
+                        new_chunks += 1
+                        new_bytes += len(data)
+                    chunks.append([digest, len(data)])
+                    h.update(data)
+                    size += len(data)
+                    start = end
+                buf = buf[used:]
+                if final:
+                    break
+
+        recipe = {"size": size, "sha256": h.hexdigest(), "chunks": chunks}
+        target = self._recipe_path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(recipe, f)
+        with self._totals_lock:
+            totals = self._load_totals()
+            try:
+                # a re-upload under the same key replaces the old recipe
+                old_size = self.recipe(key)["size"]
+            except ChunkStoreError:
+                old_size = None
+            os.replace(tmp, target)
+            if old_size is None:
+                totals["store_files"] += 1
+            else:
+                totals["store_logical_bytes"] -= old_size
+            totals["store_logical_bytes"] += size
+            totals["store_chunks"] += new_chunks
+            totals["store_stored_bytes"] += new_bytes
+            self._save_totals(totals)
+        print(f"[store] {key}: {size} bytes, {len(chunks)} chunks, {new_bytes} bytes new")
+        return recipe
+
+    def _write_chunk(self, digest: str, data: bytes) -> bool:
+        target = self._chunk_path(digest)
+        if target.exists():
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp.open("wb") as f:
+            f.write(data)
+        # two uploads can race on a shared chunk; only one of them counts it as new
+        with self._totals_lock:
+            if target.exists():
+                tmp.unlink()
+                return False
+            os.replace(tmp, target)
+        return True
+
+    # reading
+    def materialize(self, key: str, dest) -> Path:
+        """Rebuild key's file at dest (unless it is already there) and check its sha256."""
+        dest = Path(dest)
+        recipe = self.recipe(key)
+        with self._key_lock(key):
+            if dest.is_file() and dest.stat().st_size == recipe["size"]:
+                return dest
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dest.with_name(f"{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            h = hashlib.sha256()
+            try:
+                with tmp.open("wb") as out:
+                    for digest, _ in recipe["chunks"]:
+                        with self._chunk_path(digest).open("rb") as f:
+                            data = f.read()
+                        h.update(data)
+                        out.write(data)
+                if h.hexdigest() != recipe["sha256"]:
+                    raise ChunkStoreError(f"{key}: rebuilt file does not match its sha256")
+                os.replace(tmp, dest)
+            except FileNotFoundError as e:
+                raise ChunkStoreError(f"{key}: missing chunk {e.filename}")
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+        print(f"[store] materialized {key} -> {dest}")
+        return dest
+
+    def materialize_dir(self, key: str, zip_path, dest_dir) -> Path:
+        """Extract key's zip (rebuilt at zip_path first if needed) into dest_dir."""
+        dest_dir = Path(dest_dir)
+        if dest_dir.is_dir():
+            return dest_dir
+        zip_path = self.materialize(key, zip_path)
+        with self._key_lock(key):
+            if dest_dir.is_dir():
+                return dest_dir
+            tmp = dest_dir.with_name(f"{dest_dir.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                with zipfile.ZipFile(zip_path, "r") as zf:
+                    zf.extractall(tmp)
+                os.rename(tmp, dest_dir)
+            finally:
+                if tmp.exists():
+                    shutil.rmtree(tmp, ignore_errors=True)
+        return dest_dir
+
+    # totals
+    def stats(self) -> dict:
+        """Logical bytes (all recipes) vs stored bytes (chunks on disk); their ratio is the dedup ratio."""
+        try:
+            with self.stats_path.open("r", encoding="utf-8") as f:
+                totals = json.load(f)
+        except (OSError, ValueError):
+            # nothing uploaded since the store got its totals file
+            totals = self._scan()
+        stored = totals["store_stored_bytes"]
+        totals["store_dedup_ratio"] = round(totals["store_logical_bytes"] / stored, 2) if stored else 1.0
+        return totals
+
+    def _load_totals(self) -> dict:
+        if self._totals is None:
+            try:
+                with self.stats_path.open("r", encoding="utf-8") as f:
+                    self._totals = json.load(f)
+            except (OSError, ValueError):
+                self._totals = self._scan()
+        return self._totals
+
+    def _save_totals(self, totals: dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.stats_path.with_name(f"stats.json.{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(totals, f)
+        os.replace(tmp, self.stats_path)
+
+    def _scan(self) -> dict:
+        """Totals from every recipe and chunk on disk; only for a store that has no stats.json yet."""
+        logical = 0
+        files = 0
+        if self.recipe_dir.is_dir():
+            for p in self.recipe_dir.rglob("*.json"):
+                try:
+                    with p.open("r", encoding="utf-8") as f:
+                        recipe = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                files += 1
+                logical += recipe["size"]
+        chunks = 0
+        stored = 0
+        if self.chunk_dir.is_dir():
+            for p in self.chunk_dir.glob("*/*"):
+                if p.suffix == ".tmp":
+                    continue
+                chunks += 1
+                stored += p.stat().st_size
+        return {
+            "store_files": files,
+            "store_chunks": chunks,
+            "store_logical_bytes": logical,
+            "store_stored_bytes": stored,
+        }
@@ -1,18 +1,59 @@
 import socket
 import threading
 import json
+import hashlib
+import mmap
 import os
+import re
 import signal
+import shutil
+import struct
+import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from .chunk_store import ChunkStore, ChunkStoreError
+
 PORT = None
 HOST = None
 
 running = False
 
+# "threaded": a thread per connection; "asyncio": one event loop sends every download
+SERVER_MODE = "threaded"
+ASYNC_WORKERS = 32
+# transfers served at once; a connection waits up to QUEUE_WAIT seconds for a
+# slot, then gets BUSY with retry_after. The status lookup (SLOTLESS_ACTIONS)
+# skips the slots, so a full server still answers the dev client's polls.
+MAX_TRANSFERS = 256
+SLOTLESS_ACTIONS = ("status",)
+QUEUE_WAIT = 2.0
+RETRY_AFTER = 2
+# per-connection download rate in KiB/s, 0 = unlimited
+RATE_LIMIT_KBPS = 0
+transfer_slots = None
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 GAME_STORE_ROOT = os.path.join(BASE_DIR, "game")
+CHUNK_STORE_ROOT = os.path.join(GAME_STORE_ROOT, "chunk_store")
+
+store = ChunkStore(CHUNK_STORE_ROOT)
+
+# uploads are extracted (and put into the chunk store) by EXTRACT_JOBS background
+# jobs, each spreading its zip's members over a shared pool of EXTRACT_THREADS
+EXTRACT_JOBS = 2
+EXTRACT_THREADS = 4
+extract_jobs = None
+extract_threads = None
+# upload_path -> {"state": queued/extracting/storing/done/failed, ...}
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+# full_path -> (size, mtime_ns, sha256 hex / file manifest); packages are hashed once, not per request
+_digests = {}
+_manifests = {}
+_digests_lock = threading.Lock()
 
 
 def load_connection_info():
@@ -20,9 +61,18 @@ def load_connection_info():
 
     with _config_path.open("r", encoding="utf-8") as f:
         _cfg = json.load(f)
-    global PORT, HOST
+    global PORT, HOST, EXTRACT_JOBS, EXTRACT_THREADS
+    global SERVER_MODE, ASYNC_WORKERS, MAX_TRANSFERS, QUEUE_WAIT, RETRY_AFTER, RATE_LIMIT_KBPS
     HOST = str(_cfg["HOST"])
     PORT = int(_cfg["PORT"])
+    SERVER_MODE = str(_cfg.get("SERVER_MODE", SERVER_MODE)).lower()
+    ASYNC_WORKERS = int(_cfg.get("ASYNC_WORKERS", ASYNC_WORKERS))
+    MAX_TRANSFERS = int(_cfg.get("MAX_TRANSFERS", MAX_TRANSFERS))
+    QUEUE_WAIT = float(_cfg.get("QUEUE_WAIT", QUEUE_WAIT))
+    RETRY_AFTER = int(_cfg.get("RETRY_AFTER", RETRY_AFTER))
+    RATE_LIMIT_KBPS = int(_cfg.get("RATE_LIMIT_KBPS", RATE_LIMIT_KBPS))
+    EXTRACT_JOBS = int(_cfg.get("EXTRACT_JOBS", EXTRACT_JOBS))
+    EXTRACT_THREADS = int(_cfg.get("EXTRACT_THREADS", EXTRACT_THREADS))
 
     print(f"Host: {HOST}/ {type(HOST)}, Port: {PORT} / {type(PORT)}")
 
@@ -36,106 +86,512 @@ def recv_exact(sock: socket.socket, n: int) -> bytes:
     return buf
 
 
-def handle_client(conn, addr):
-    print(f"[file] connected from {addr}")
-    f = conn.makefile("rb")
+def send_file(conn: socket.socket, rf, offset: int, count: int) -> None:
+    """
+    Send count bytes of an open file starting at offset, paced to
+    RATE_LIMIT_KBPS if that is set.
+    """
+    if RATE_LIMIT_KBPS <= 0:
+        _send_range(conn, rf, offset, count)
+        return
+    rate = RATE_LIMIT_KBPS * 1024
+    # a tenth of a second's worth at a time, then wait until the schedule catches up
+    step = max(rate // 10, 16 * 1024)
+    started = time.monotonic()
+    sent = 0
+    while sent < count:
+        n = min(step, count - sent)
+        _send_range(conn, rf, offset + sent, n)
+        sent += n
+        delay = started + sent / rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
 
-    try:
-        # read header
-        header_line = f.readline()
-        if not header_line:
-            print("[file] empty header")
-            return
-        
-        header = json.loads(header_line.decode("utf-8"))
-        action = header.get("action") or "upload"
-
-        if action == "download":
-            download_path = header.get("download_path")
-            if not download_path:
-                resp = {
-                    "ok": False,
-                    "error": "BAD_HEADER",
-                    "message": "download_path missing"
-                }
-                conn.sendall((json.dumps(resp) + "\n").encode("utf-8"))
-                return
-            full_path = os.path.join(GAME_STORE_ROOT, download_path)
-            if not os.path.isfile(full_path):
-                resp = {
-                    "ok": False,
-                    "error": "BAD_PATH",
-                    "message": "download_path is wrong"
-                }
-                conn.sendall((json.dumps(resp) + "\n").encode("utf-8"))
-                return
-            file_size = os.path.getsize(full_path)
-            conn.sendall((json.dumps({
-                "ok": True,
-                "file_size": file_size
-            }) + "\n").encode("utf-8"))
-            with open(full_path, "rb") as rf:
+
+def _send_range(conn: socket.socket, rf, offset: int, count: int) -> None:
+    """
+    Send the bytes without copying them through Python: sendfile(2) where the
+    OS has it, otherwise sendall straight out of an mmap of the file.
+    """
+    if count == 0:
+        return
+    if hasattr(os, "sendfile"):
+        conn.sendfile(rf, offset, count)
+        return
+    with mmap.mmap(rf.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        conn.sendall(memoryview(mm)[offset:offset + count])
+
+
+def receive_stream(rf, full_path: str):
+    """
+    Read a streamed upload into full_path: frames of a 4-byte big-endian length
+    and that many bytes, ended by an empty frame and a JSON trailer line
+    {"size", "sha256"}. Returns (size, sha256 of what arrived, trailer).
+    """
+    h = hashlib.sha256()
+    size = 0
+    with open(full_path, "wb") as out:
+        while True:
+            head = rf.read(4)
+            if len(head) < 4:
+                raise RuntimeError("connection closed mid-file")
+            remaining = struct.unpack(">I", head)[0]
+            if remaining == 0:
+                break
+            size += remaining
+            while remaining > 0:
+                chunk = rf.read(min(65536, remaining))
+                if not chunk:
+                    raise RuntimeError("connection closed mid-file")
+                h.update(chunk)
+                out.write(chunk)
+                remaining -= len(chunk)
+        out.flush()
+        os.fsync(out.fileno())
+    trailer = json.loads(rf.readline().decode("utf-8") or "{}")
+    return size, h.hexdigest(), trailer
+
+
+def receive_raw(conn: socket.socket, full_path: str, file_size: int) -> str:
+    """Read exactly file_size raw bytes into full_path; returns their sha256."""
+    h = hashlib.sha256()
+    remaining = file_size
+    with open(full_path, "wb") as out:
+        while remaining > 0:
+            chunk = conn.recv(min(65536, remaining))
+            if not chunk:
+                raise RuntimeError("connection closed mid-file")
+            h.update(chunk)
+            out.write(chunk)
+            remaining -= len(chunk)
+        out.flush()
+        os.fsync(out.fileno())
+    return h.hexdigest()
+
+
+def file_sha256(full_path: str) -> str:
+    st = os.stat(full_path)
+    with _digests_lock:
+        cached = _digests.get(full_path)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+
+    h = hashlib.sha256()
+    with open(full_path, "rb") as rf:
+        while True:
+            chunk = rf.read(1024 * 1024)
+            if not chunk:
+                break
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _digests_lock:
+        _digests[full_path] = (st.st_size, st.st_mtime_ns, digest)
+    return digest
+
+
+def zip_manifest(full_path: str) -> list:
+    """[{"path", "size", "sha256"}] of every file in a version zip, computed once per zip."""
+    st = os.stat(full_path)
+    with _digests_lock:
+        cached = _manifests.get(full_path)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+
+    files = []
+    with zipfile.ZipFile(full_path, "r") as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            h = hashlib.sha256()
+            with zf.open(info, "r") as member:
                 while True:
-                    chunk = rf.read(65536)
+                    chunk = member.read(1024 * 1024)
                     if not chunk:
                         break
-                    conn.sendall(chunk)
-            return
+                    h.update(chunk)
+            files.append({"path": info.filename, "size": info.file_size, "sha256": h.hexdigest()})
+    with _digests_lock:
+        _manifests[full_path] = (st.st_size, st.st_mtime_ns, files)
+    return files
+
+
+def resolve_download(download_path):
+    """Full path of a stored version zip, rebuilt from the chunk store if needed; None if there is none."""
+    if not download_path:
+        return None
+    full_path = os.path.join(GAME_STORE_ROOT, download_path)
+    if not os.path.isfile(full_path) and store.has(download_path):
+        try:
+            store.materialize(download_path, full_path)
+        except ChunkStoreError as e:
+            print(f"[file] {e}")
+    if not os.path.isfile(full_path):
+        return None
+    return full_path
+
+
+def fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def set_job(key: str, new: bool = False, **fields) -> None:
+    with _jobs_lock:
+        if new:
+            _jobs[key] = {}
+        _jobs.setdefault(key, {}).update(fields)
+
+
+def job_status(key: str) -> dict:
+    with _jobs_lock:
+        job = dict(_jobs.get(key, {}))
+    if not job:
+        # uploaded before this server started
+        known = os.path.isfile(os.path.join(GAME_STORE_ROOT, key)) or store.has(key)
+        job = {"state": "done" if known else "unknown"}
+    return job
+
+
+def extract_members(full_path: str, names: list, dest: str) -> None:
+    with zipfile.ZipFile(full_path, "r") as zf:
+        for name in names:
+            with zf.open(name, "r") as src, open(os.path.join(dest, name), "wb") as out:
+                shutil.copyfileobj(src, out, 1024 * 1024)
+
+
+def extract_zip(full_path: str, extract_dir: str) -> int:
+    """
+    Extract a zip into extract_dir with its files spread over the
+    extract_threads pool (zlib inflates without holding the GIL). Works in a
+    staging dir swapped in at the end, so nobody sees half a version.
+    Returns the number of files.
+    """
+    with zipfile.ZipFile(full_path, "r") as zf:
+        infos = zf.infolist()
+
+    tmp = f"{extract_dir}.{os.getpid()}.{threading.get_ident()}.extracting"
+    if os.path.isdir(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+    files = []
+    try:
+        for info in infos:
+            parts = info.filename.split("/")
+            if info.filename.startswith("/") or ".." in parts or ":" in parts[0]:
+                raise ValueError(f"unsafe path in zip: {info.filename}")
+            target = os.path.join(tmp, info.filename)
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            # directories first, so the member threads never race on them
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            files.append(info)
+
+        # largest first, dealt round-robin, so the threads get similar shares
+        files.sort(key=lambda i: i.file_size, reverse=True)
+        groups = [files[i::EXTRACT_THREADS] for i in range(EXTRACT_THREADS)]
+        futures = [extract_threads.submit(extract_members, full_path, [i.filename for i in g], tmp)
+                   for g in groups if g]
+        for fut in futures:
+            fut.result()
+        swap_in(tmp, extract_dir)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return len(files)
+
+
+def swap_in(staging: str, target: str) -> None:
+    """
+    Replace target (if any) with the staging dir: the old dir is renamed
+    aside first, so target is missing only between two renames and a reader
+    never sees a mix of old and new files.
+    """
+    old = None
+    if os.path.isdir(target):
+        old = f"{target}.{os.getpid()}.{threading.get_ident()}.old"
+        os.rename(target, old)
+    try:
+        os.rename(staging, target)
+    except OSError:
+        if old is not None:
+            os.rename(old, target)
+        raise
+    fsync_dir(os.path.dirname(target))
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def process_upload(key: str, full_path: str, version) -> None:
+    started = time.time()
+    try:
+        set_job(key, state="extracting")
+        extract_dir = os.path.join(os.path.dirname(full_path), f"v{version}")
+        files = extract_zip(full_path, extract_dir)
+        set_job(key, state="storing", files=files)
+        store.put_file(key, full_path)
+        set_job(key, state="done", seconds=round(time.time() - started, 3))
+        print(f"[file] {key}: {files} files extracted to {extract_dir}")
+    except Exception as e:
+        print(f"[file] processing {key} failed: {e}")
+        set_job(key, state="failed", message=str(e))
+
+
+def store_key(full_path: str) -> str:
+    return os.path.relpath(full_path, GAME_STORE_ROOT).replace(os.sep, "/")
+
+
+# <name>.<pid>.<thread>.<suffix>, as written by handle_request, extract_zip, swap_in
+# and the lobby's VersionCollector
+_STAGING_NAME = re.compile(r"\.\d+\.\d+\.(upload|extracting|old)$")
+
+
+def clean_staging() -> None:
+    """Drop temp uploads and staging dirs a crash left behind."""
+    store_root = Path(GAME_STORE_ROOT) / "game_store"
+    if not store_root.is_dir():
+        return
+    for leftover in list(store_root.rglob("*")):
+        if not _STAGING_NAME.search(leftover.name):
+            continue
+        if leftover.is_dir():
+            shutil.rmtree(leftover, ignore_errors=True)
+        elif leftover.exists():
+            leftover.unlink()
+
+
+def import_existing_uploads() -> None:
+    """Put zips uploaded before the chunk store existed into it."""
+    store_root = Path(GAME_STORE_ROOT) / "game_store"
+    if not store_root.is_dir():
+        return
+    for zip_path in store_root.rglob("v*.zip"):
+        if not store.has(store_key(str(zip_path))):
+            store.put_file(store_key(str(zip_path)), zip_path)
+
+
+def prepare_download(header: dict):
+    """
+    Check a download request; returns (ack, full_path, offset, length). The
+    ack is what the client gets before the bytes, with ok False on errors.
+    """
+    download_path = header.get("download_path")
+    full_path = resolve_download(download_path)
+    if full_path is None:
+        resp = {
+            "ok": False,
+            "error": "BAD_PATH" if download_path else "BAD_HEADER",
+            "message": "download_path is wrong" if download_path else "download_path missing"
+        }
+        return resp, None, 0, 0
+    file_size = os.path.getsize(full_path)
+    # optional byte range, so an interrupted download can resume
+    offset = header.get("offset", 0)
+    length = header.get("length")
+    if length is None and isinstance(offset, int):
+        length = file_size - offset
+    if (not isinstance(offset, int) or not isinstance(length, int)
+            or offset < 0 or length < 0 or offset + length > file_size):
+        resp = {
+            "ok": False,
+            "error": "BAD_RANGE",
+            "message": f"range {offset}+{length} outside file of {file_size} bytes",
+            "file_size": file_size,
+        }
+        return resp, None, 0, 0
+    ack = {
+        "ok": True,
+        "file_size": file_size,
+        "offset": offset,
+        "length": length,
+        "sha256": file_sha256(full_path),
+    }
+    return ack, full_path, offset, length
+
+
+def busy_response() -> dict:
+    return {
+        "ok": False,
+        "error": "BUSY",
+        "message": f"file server is at its limit of {MAX_TRANSFERS} transfers, retry later",
+        "retry_after": RETRY_AFTER,
+    }
+
+
+def handle_request(conn, f, header: dict) -> None:
+    action = header.get("action") or "upload"
+
+    if action == "status":
+        upload_path = header.get("upload_path")
+        if not upload_path:
+            resp = {
+                "ok": False,
+                "error": "BAD_HEADER",
+                "message": "upload_path missing"
+            }
         else:
-            upload_path = header.get("upload_path")
-            file_size = header.get("file_size")
-            version = header.get("version")
-            if not upload_path or not isinstance(file_size, int):
-                resp = {
-                    "ok": False,
-                    "error": "BAD_HEADER",
-                    "message": "upload_path/file_size missing"
-                }
-                conn.sendall((json.dumps(resp) + "\n").encode("utf-8"))
-                return
-            
-            full_path = os.path.join(GAME_STORE_ROOT, upload_path)
-            full_dir = os.path.dirname(full_path)
-            os.makedirs(full_dir, exist_ok=True)
-
-            ack = {
-                "ok": True,
-                "message": "ready"
+            resp = {"ok": True, "upload_path": upload_path, **job_status(upload_path)}
+        conn.sendall((json.dumps(resp) + "\n").encode("utf-8"))
+        return
+
+    if action == "store_stats":
+        resp = {"ok": True, "stats": store.stats()}
+        conn.sendall((json.dumps(resp) + "\n").encode("utf-8"))
+        return
+
+    if action == "download":
+        ack, full_path, offset, length = prepare_download(header)
+        conn.sendall((json.dumps(ack) + "\n").encode("utf-8"))
+        if ack["ok"]:
+            with open(full_path, "rb") as rf:
+                send_file(conn, rf, offset, length)
+        return
+
+    if action in ("manifest", "download_files"):
+        download_path = header.get("download_path")
+        full_path = resolve_download(download_path)
+        if full_path is None:
+            resp = {
+                "ok": False,
+                "error": "BAD_PATH" if download_path else "BAD_HEADER",
+                "message": "download_path is wrong" if download_path else "download_path missing"
             }
-            conn.sendall((json.dumps(ack) + "\n").encode("utf-8"))
-
-            # receive binary
-            remaining = file_size
-            with open(full_path, "wb") as out:
-                while remaining > 0:
-                    chunk_size = min(65536, remaining)
-                    chunk = conn.recv(chunk_size)
-                    if not chunk:
-                        raise RuntimeError("connection closed mid-file")
-                    out.write(chunk)
-                    remaining -= len(chunk)
-            print(f"[file] saved {file_size} bytes to {full_path}")
-
-            # extract
-            if full_path.lower().endswith(".zip"):
-                extract_dir = Path(full_dir) / f"v{version}"
-                extract_dir.mkdir(parents=True, exist_ok=True)
-                with zipfile.ZipFile(full_path, "r") as zf:
-                    zf.extractall(extract_dir)
-                # zip_path = str(extract_dir) + ".zip"
-                # print(f"zip_path: {zip_path}")
-                # try:
-                #     os.remove(zip_path)
-                # except FileNotFoundError:
-                #     print("[FILE] not found the file")
-                #     pass
-
-            done = {
-                "ok": True,
-                "message": "upload complete",
-                "store_path": full_path,
+            conn.sendall((json.dumps(resp) + "\n").encode("utf-8"))
+            return
+
+    if action == "manifest":
+        resp = {
+            "ok": True,
+            "sha256": file_sha256(full_path),
+            "files": zip_manifest(full_path),
+        }
+        conn.sendall((json.dumps(resp) + "\n").encode("utf-8"))
+        return
+
+    if action == "download_files":
+        paths = header.get("paths")
+        listed = {e["path"]: e for e in zip_manifest(full_path)}
+        if not isinstance(paths, list) or any(p not in listed for p in paths):
+            resp = {
+                "ok": False,
+                "error": "BAD_PATH",
+                "message": "paths must be files listed in the manifest"
             }
-            conn.sendall((json.dumps(done) + "\n").encode("utf-8"))
+            conn.sendall((json.dumps(resp) + "\n").encode("utf-8"))
+            return
+        conn.sendall((json.dumps({"ok": True, "count": len(paths)}) + "\n").encode("utf-8"))
+        # per file: a JSON line {"path", "file_size", "sha256"}, then its bytes
+        with zipfile.ZipFile(full_path, "r") as zf:
+            for path in paths:
+                entry = listed[path]
+                conn.sendall((json.dumps({
+                    "path": path,
+                    "file_size": entry["size"],
+                    "sha256": entry["sha256"],
+                }) + "\n").encode("utf-8"))
+                with zf.open(path, "r") as member:
+                    while True:
+                        chunk = member.read(65536)
+                        if not chunk:
+                            break
+                        conn.sendall(chunk)
+        return
+
+    # upload
+    upload_path = header.get("upload_path")
+    file_size = header.get("file_size")
+    version = header.get("version")
+    # a streamed upload does not know its size up front
+    stream = bool(header.get("stream"))
+    if not upload_path or (not stream and not isinstance(file_size, int)):
+        resp = {
+            "ok": False,
+            "error": "BAD_HEADER",
+            "message": "upload_path/file_size missing"
+        }
+        conn.sendall((json.dumps(resp) + "\n").encode("utf-8"))
+        return
+    # a raw upload's digest comes in the header; without one a corrupted
+    # transfer would be stored and published as if it were fine
+    if not stream and not isinstance(header.get("sha256"), str):
+        resp = {
+            "ok": False,
+            "error": "BAD_DIGEST",
+            "message": "sha256 missing from the upload header"
+        }
+        conn.sendall((json.dumps(resp) + "\n").encode("utf-8"))
+        return
+
+    full_path = os.path.join(GAME_STORE_ROOT, upload_path)
+    full_dir = os.path.dirname(full_path)
+    os.makedirs(full_dir, exist_ok=True)
+
+    ack = {
+        "ok": True,
+        "message": "ready"
+    }
+    conn.sendall((json.dumps(ack) + "\n").encode("utf-8"))
+
+    # receive into a temp file next to the target; a dropped connection or a
+    # bad digest never leaves a truncated zip where downloads can find it
+    tmp_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.upload"
+    try:
+        if stream:
+            file_size, digest, trailer = receive_stream(f, tmp_path)
+            expected_size = trailer.get("size")
+            expected = trailer.get("sha256")
+        else:
+            digest = receive_raw(conn, tmp_path, file_size)
+            expected_size = file_size
+            expected = header["sha256"]
+        if expected_size != file_size or expected != digest:
+            resp = {
+                "ok": False,
+                "error": "BAD_DIGEST",
+                "message": f"received {file_size} bytes with sha256 {digest}, "
+                           f"client sent {expected_size} bytes with sha256 {expected}",
+            }
+            conn.sendall((json.dumps(resp) + "\n").encode("utf-8"))
+            return
+        os.replace(tmp_path, full_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    fsync_dir(full_dir)
+    st = os.stat(full_path)
+    with _digests_lock:
+        _digests[full_path] = (st.st_size, st.st_mtime_ns, digest)
+    print(f"[file] saved {file_size} bytes to {full_path}")
+
+    # the bytes are on disk; extract etc. in the background and ack right away
+    key = store_key(full_path)
+    if full_path.lower().endswith(".zip"):
+        set_job(key, new=True, state="queued", queued_at=time.time())
+        extract_jobs.submit(process_upload, key, full_path, version)
+    else:
+        set_job(key, new=True, state="done")
+
+    done = {
+        "ok": True,
+        "message": "upload complete",
+        "store_path": full_path,
+        "sha256": digest,
+        "extract": job_status(key)["state"],
+    }
+    conn.sendall((json.dumps(done) + "\n").encode("utf-8"))
+
+
+def serve_request(conn, f, header: dict) -> None:
+    try:
+        handle_request(conn, f, header)
     except Exception as e:
         print("[file] error", e)
         try:
@@ -147,6 +603,42 @@ def handle_client(conn, addr):
             conn.sendall((json.dumps(resp) + "\n").encode("utf-8"))
         except Exception:
             pass
+
+
+def run_request(conn, header: dict) -> None:
+    """serve_request for a connection whose header line the asyncio server already read."""
+    f = conn.makefile("rb")
+    try:
+        serve_request(conn, f, header)
+    finally:
+        f.close()
+
+
+def handle_client(conn, addr):
+    print(f"[file] connected from {addr}")
+    f = conn.makefile("rb")
+
+    try:
+        # read header
+        header_line = f.readline()
+        if not header_line:
+            print("[file] empty header")
+            return
+
+        header = json.loads(header_line.decode("utf-8"))
+        if header.get("action") in SLOTLESS_ACTIONS:
+            serve_request(conn, f, header)
+            return
+        # at most MAX_TRANSFERS at once; the rest wait a little, then are told to come back later
+        if not transfer_slots.acquire(timeout=QUEUE_WAIT):
+            conn.sendall((json.dumps(busy_response()) + "\n").encode("utf-8"))
+            return
+        try:
+            serve_request(conn, f, header)
+        finally:
+            transfer_slots.release()
+    except Exception as e:
+        print("[file] error", e)
     finally:
         f.close()
         conn.close()
@@ -158,10 +650,46 @@ def handle_shutdown(signum, frame):
     print("\nShutdown signal received!\n")
     running = False
 
+def main_async():
+    import asyncio
+    from .aio_file_server import AsyncFileServer
+    from server.lobby.aio_server import raise_fd_limit
+
+    raise_fd_limit()
+    file_server = AsyncFileServer(
+        HOST, PORT, prepare_download, run_request, busy_response,
+        max_transfers=MAX_TRANSFERS, queue_wait=QUEUE_WAIT, slotless=SLOTLESS_ACTIONS,
+        rate_kbps=RATE_LIMIT_KBPS, workers=ASYNC_WORKERS,
+    )
+
+    async def runner():
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGINT, file_server.request_stop)
+        except NotImplementedError:
+            signal.signal(signal.SIGINT, lambda signum, frame: loop.call_soon_threadsafe(file_server.request_stop))
+        await file_server.serve()
+
+    try:
+        asyncio.run(runner())
+    except KeyboardInterrupt:
+        print("\nCtrl+C pressed, shutting down...")
+    finally:
+        print("Server closed.")
+
 def main():
     signal.signal(signal.SIGINT, handle_shutdown)
     load_connection_info()
+    global extract_jobs, extract_threads, transfer_slots
+    extract_jobs = ThreadPoolExecutor(EXTRACT_JOBS, thread_name_prefix="extract-job")
+    extract_threads = ThreadPoolExecutor(EXTRACT_THREADS, thread_name_prefix="extract")
+    transfer_slots = threading.BoundedSemaphore(MAX_TRANSFERS)
     os.makedirs(GAME_STORE_ROOT, exist_ok=True)
+    clean_staging()
+    import_existing_uploads()
+    if SERVER_MODE == "asyncio":
+        main_async()
+        return
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     server.bind((HOST, PORT))
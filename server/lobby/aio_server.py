@@ -0,0 +1,207 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from server.common.protocol import MAX_FRAME, send_json, set_framing, hello_framing, unpack
+from server.lobby import outbox
+
+# requests are single JSON lines; anything longer than this is dropped
+MAX_LINE = 1 << 20
+# how long shutdown waits for connection handlers to run their cleanup
+SHUTDOWN_GRACE = 5.0
+
+
+class StreamSession:
+    """
+    Stand-in for a client socket in asyncio mode.
+
+    The lobby handlers only ever call sendall()/close() on the socket they get,
+    and use it as a dict key, so this object is enough for them to run unchanged.
+    Handlers run on executor threads, so every write is handed back to the loop.
+    The transport buffers what the client has not read yet; past max_backlog
+    bytes the client is a slow consumer and gets disconnected.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, writer: asyncio.StreamWriter, max_backlog: int = 0):
+        self._loop = loop
+        self._writer = writer
+        self._closed = False
+        self._loop_thread = threading.get_ident()
+        self.addr = writer.get_extra_info("peername")
+        self.max_backlog = max_backlog or outbox.SEND_BACKLOG
+
+    def _in_loop(self) -> bool:
+        return self._loop_thread == threading.get_ident()
+
+    def _write(self, data: bytes) -> None:
+        if self._closed or self._writer.is_closing():
+            return
+        transport = self._writer.transport
+        if transport.get_write_buffer_size() + len(data) > self.max_backlog:
+            print(f"[!] {self.addr} is not reading ({transport.get_write_buffer_size()} bytes queued), disconnecting")
+            outbox.count_dropped()
+            self._closed = True
+            transport.abort()
+            return
+        self._writer.write(data)
+
+    def _close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._writer.close()
+
+    def sendall(self, data: bytes) -> None:
+        if self._closed:
+            raise OSError("session closed")
+        if self._in_loop():
+            self._write(data)
+        else:
+            self._loop.call_soon_threadsafe(self._write, data)
+
+    def close(self) -> None:
+        if self._in_loop():
+            self._close()
+        else:
+            self._loop.call_soon_threadsafe(self._close)
+
+    def __repr__(self) -> str:
+        return f"<StreamSession {self.addr}>"
+
+
+class AsyncLobbyServer:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        process_request: Callable[[dict, object], dict],
+        cleanup_session: Callable[[object], None],
+        workers: int = 32,
+        backlog: int = 4096,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.process_request = process_request
+        self.cleanup_session = cleanup_session
+        self.backlog = backlog
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lobby-worker")
+        self.sessions: set[StreamSession] = set()
+        self._handlers: set[asyncio.Task] = set()
+        self._executor_closed = False
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._stopped: Optional[asyncio.Event] = None
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        session = StreamSession(loop, writer)
+        self.sessions.add(session)
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        framing = "json"
+        try:
+            while True:
+                req = await self._read_request(reader, framing, session)
+                if req is None:
+                    break
+                # the handlers talk to sqlite and may block, keep them off the loop
+                resp = await loop.run_in_executor(self.executor, self.process_request, req, session)
+                send_json(session, resp)
+                new_framing = hello_framing(resp)
+                if new_framing:
+                    framing = new_framing
+                    set_framing(session, framing)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            print(f"[!] Error with {session.addr}: {e}")
+        finally:
+            self.sessions.discard(session)
+            try:
+                await self._cleanup(loop, session)
+            finally:
+                session.close()
+                self._handlers.discard(task)
+
+    async def _cleanup(self, loop: asyncio.AbstractEventLoop, session: StreamSession) -> None:
+        if not self._executor_closed:
+            try:
+                await loop.run_in_executor(self.executor, self.cleanup_session, session)
+                return
+            except RuntimeError:
+                # the executor was shut down under us
+                pass
+        self.cleanup_session(session)
+
+    async def _read_request(self, reader: asyncio.StreamReader, framing: str, session: StreamSession):
+        if framing == "binary":
+            try:
+                head = await reader.readexactly(4)
+            except asyncio.IncompleteReadError as e:
+                if e.partial:
+                    raise
+                return None
+            n = int.from_bytes(head, "big")
+            if n > MAX_FRAME:
+                print(f"[!] Oversized request from {session.addr}")
+                return None
+            return unpack(await reader.readexactly(n))
+        try:
+            line = await reader.readline()
+        except (asyncio.LimitOverrunError, ValueError):
+            print(f"[!] Oversized request from {session.addr}")
+            return None
+        if not line:
+            return None
+        return json.loads(line)
+
+    def request_stop(self) -> None:
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def serve(self, on_shutdown: Optional[Callable[[], None]] = None):
+        self._stopped = asyncio.Event()
+        self._server = await asyncio.start_server(
+            self.handle_connection,
+            self.host,
+            self.port,
+            limit=MAX_LINE,
+            backlog=self.backlog,
+            reuse_address=True,
+        )
+        print(f"[*] Lobby server (asyncio) listening on {self.host}: {self.port}")
+        await self._stopped.wait()
+
+        self._server.close()
+        if on_shutdown is not None:
+            on_shutdown()
+        for session in list(self.sessions):
+            session.close()
+        # give the shutdown notices a moment to flush before the loop goes away
+        await asyncio.sleep(0.2)
+        await self._server.wait_closed()
+        # the handlers still need the executor for their session cleanup
+        handlers = list(self._handlers)
+        if handlers:
+            _, stuck = await asyncio.wait(handlers, timeout=SHUTDOWN_GRACE)
+            for task in stuck:
+                task.cancel()
+            await asyncio.gather(*stuck, return_exceptions=True)
+        self._executor_closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def raise_fd_limit() -> None:
+    # every idle lobby connection costs a descriptor; the default soft limit is often 1024
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
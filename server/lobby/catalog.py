@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from server.common.protocol import RawJSON
+from server.db import gamelog_repo
+
+# keys of a list_games entry, in the order clients have always received them
+LIST_FIELDS = (
+    "game_id",
+    "game_name",
+    "game_description",
+    "max_players",
+    "latest_version",
+    "latest_version_id",
+    "upload_path",
+)
+
+
+def _list_entry(entry: dict) -> dict:
+    return {k: entry.get(k) for k in LIST_FIELDS}
+
+
+def _is_listed(entry: Optional[dict]) -> bool:
+    return entry is not None and entry.get("game_status") == "active"
+
+
+class GameCatalog:
+    """
+    In-process copy of the game catalog (games + their latest active version).
+
+    Loaded once at startup; the developer handlers are the only writers of the
+    catalog tables and call refresh_game() right after their DB write, so reads
+    never need to touch SQLite. Every effective change bumps `version`, and the
+    list_games payload is kept pre-serialized for that version.
+
+    Versions start from the load time in milliseconds, so they keep growing
+    across lobby restarts and a client holding a pre-restart version simply
+    falls below `base_version` and gets a full listing from delta().
+
+    on_change, if set, is called (outside the lock) after every version bump.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[int, dict] = {}
+        # catalog version at which each game last changed / last became listed
+        self._changed_at: Dict[int, int] = {}
+        self._listed_at: Dict[int, int] = {}
+        self.version = 0
+        self.base_version = 0
+        # (version, encoded list of active games), swapped as one tuple
+        self._listing: Tuple[int, RawJSON] = (0, RawJSON(b"[]"))
+        self.on_change: Optional[Callable[[], None]] = None
+
+    def load(self) -> None:
+        rows = gamelog_repo.list_catalog_entries()
+        with self._lock:
+            self.version = max(self.version + 1, int(time.time() * 1000))
+            self.base_version = self.version
+            self._entries = {row["game_id"]: row for row in rows}
+            self._changed_at = {gid: self.version for gid in self._entries}
+            self._listed_at = {gid: self.version for gid in self._entries}
+            self._rebuild_listing()
+
+    def refresh_game(self, game_id: int) -> bool:
+        """Re-read one game from the DB. Returns True if the catalog changed."""
+        with self._lock:
+            rows = gamelog_repo.list_catalog_entries(game_id)
+            row = rows[0] if rows else None
+            old = self._entries.get(game_id)
+            if old == row:
+                return False
+            self.version += 1
+            if row is None:
+                self._entries.pop(game_id, None)
+            else:
+                self._entries[game_id] = row
+            if _is_listed(row) and not _is_listed(old):
+                self._listed_at[game_id] = self.version
+            self._changed_at[game_id] = self.version
+            self._rebuild_listing()
+        if self.on_change is not None:
+            self.on_change()
+        return True
+
+    def _rebuild_listing(self) -> None:
+        games = [
+            _list_entry(e)
+            for _, e in sorted(self._entries.items())
+            if _is_listed(e)
+        ]
+        blob = json.dumps(games, ensure_ascii=False).encode("utf-8")
+        self._listing = (self.version, RawJSON(blob))
+
+    def listing(self) -> Tuple[int, RawJSON]:
+        return self._listing
+
+    def delta(self, since: Optional[int]) -> dict:
+        """
+        What changed in the listing after version `since`:
+        {"catalog_version", "full", "added", "changed", "removed"}.
+        With full=True the client must drop its copy and take `added` as the whole listing.
+        """
+        with self._lock:
+            version = self.version
+            if not isinstance(since, int) or since < self.base_version or since > version:
+                return {
+                    "catalog_version": version,
+                    "full": True,
+                    "added": [_list_entry(e) for _, e in sorted(self._entries.items()) if _is_listed(e)],
+                    "changed": [],
+                    "removed": [],
+                }
+            added, changed, removed = [], [], []
+            for game_id, changed_at in self._changed_at.items():
+                if changed_at <= since:
+                    continue
+                entry = self._entries.get(game_id)
+                if not _is_listed(entry):
+                    removed.append(game_id)
+                elif self._listed_at.get(game_id, 0) > since:
+                    added.append(_list_entry(entry))
+                else:
+                    changed.append(_list_entry(entry))
+        added.sort(key=lambda g: g["game_id"])
+        changed.sort(key=lambda g: g["game_id"])
+        removed.sort()
+        return {
+            "catalog_version": version,
+            "full": False,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+        }
+
+    def get(self, game_id: int) -> Optional[dict]:
+        entry = self._entries.get(game_id)
+        return dict(entry) if entry is not None else None
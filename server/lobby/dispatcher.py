@@ -0,0 +1,140 @@
+import bisect
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+# bucket upper bounds in seconds: 10us .. ~168s, growing by 1.25x
+_BOUNDS: List[float] = []
+_b = 1e-5
+while _b < 180:
+    _BOUNDS.append(_b)
+    _b *= 1.25
+del _b
+
+
+class LatencyHistogram:
+    """
+    Fixed log-bucket histogram, so recording is O(log buckets) and memory
+    stays constant no matter how many requests we see.
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                # report the bucket's upper bound, capped by the slowest sample
+                bound = _BOUNDS[idx] if idx < len(_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+
+class CommandStats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.latency = LatencyHistogram()
+        self.errors = 0       # handler answered ok=False
+        self.exceptions = 0   # handler raised
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            h = self.latency
+            return {
+                "count": h.count,
+                "errors": self.errors,
+                "exceptions": self.exceptions,
+                "avg_ms": round(h.total / h.count * 1000, 3) if h.count else 0.0,
+                "p50_ms": round(h.percentile(0.50) * 1000, 3),
+                "p95_ms": round(h.percentile(0.95) * 1000, 3),
+                "p99_ms": round(h.percentile(0.99) * 1000, 3),
+                "max_ms": round(h.max * 1000, 3),
+            }
+
+
+class CommandDispatcher:
+    """
+    Maps cmd names to handlers and times every call.
+
+    Handlers either take (request) or (request, sock); register() records which
+    so dispatch() can call them uniformly.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, Callable] = {}
+        self._needs_session: Dict[str, bool] = {}
+        self._stats: Dict[str, CommandStats] = {}
+        self._started_at = time.time()
+
+    def register(self, cmd: str, handler: Callable, needs_session: bool = True) -> None:
+        self._handlers[cmd] = handler
+        self._needs_session[cmd] = needs_session
+        self._stats[cmd] = CommandStats()
+
+    def commands(self) -> List[str]:
+        return sorted(self._handlers)
+
+    def dispatch(self, request: dict, sock) -> dict:
+        cmd = request.get("cmd", "")
+        handler = self._handlers.get(cmd)
+        if handler is None:
+            return {
+                "ok": False,
+                "cmd": cmd,
+                "error": "UNKNOWN_CMD",
+                "message": f"unknown cmd: {cmd}",
+            }
+
+        stats = self._stats[cmd]
+        start = time.perf_counter()
+        failed = False
+        try:
+            if self._needs_session[cmd]:
+                resp = handler(request, sock)
+            else:
+                resp = handler(request)
+        except Exception as e:
+            failed = True
+            traceback.print_exc()
+            resp = {
+                "ok": False,
+                "cmd": cmd,
+                "error": "INTERNAL",
+                "message": f"internal error: {e}",
+            }
+        elapsed = time.perf_counter() - start
+
+        with stats.lock:
+            stats.latency.record(elapsed)
+            if failed:
+                stats.exceptions += 1
+            elif isinstance(resp, dict) and resp.get("ok") is False:
+                stats.errors += 1
+        return resp
+
+    def stats(self, cmd: Optional[str] = None) -> dict:
+        names = [cmd] if cmd else self.commands()
+        return {
+            "uptime_s": round(time.time() - self._started_at, 1),
+            "commands": {
+                name: self._stats[name].snapshot()
+                for name in names
+                if name in self._stats
+            },
+        }
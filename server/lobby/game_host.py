@@ -0,0 +1,284 @@
+"""
+Multi-room game host, started by GameHostManager with cwd = a game version dir.
+
+    python <path>/game_host.py --host H --port P --ctl-fd N
+
+One process and one listening port serve every room of that game version.
+An asyncio loop accepts connections and peeks (without consuming) at the
+first line, the game's own {"cmd": "join", "room_id": ...} message, to route
+the socket to its room. Each room runs the game's unmodified main() in a
+thread; the module's `socket` and `argparse` names are swapped for shims so
+that, inside a room thread, main() parses that room's argv and start()'s
+listening socket is a per-room queue fed by the router.
+
+Control (JSON lines): requests on stdin, replies and events on fd N.
+    {"seq", "cmd": "open_room",  "room_id", "argv"} -> {"seq", "ok"}
+    {"seq", "cmd": "close_room", "room_id"}         -> {"seq", "ok"}
+    event: {"event": "ready", "port"}
+    event: {"event": "room_done", "room_id", "returncode"}
+EOF on stdin closes every room and exits.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+# a join line longer than this, or slower than JOIN_TIMEOUT, is dropped
+MAX_JOIN_LINE = 64 * 1024
+JOIN_TIMEOUT = 10.0
+
+_ctx = threading.local()
+
+
+class RoomListener:
+    """Stands in for the listening socket a game's start() creates."""
+
+    def __init__(self, room_id: int) -> None:
+        self.room_id = room_id
+        self._conns: "queue.Queue" = queue.Queue()
+        self._timeout: Optional[float] = None
+        self._closed = False
+        self.handed: list = []
+
+    # the calls the games make on their listening socket
+    def setsockopt(self, *args) -> None:
+        pass
+
+    def bind(self, addr) -> None:
+        pass
+
+    def listen(self, backlog: int = 0) -> None:
+        pass
+
+    def settimeout(self, timeout: Optional[float]) -> None:
+        self._timeout = timeout
+
+    def accept(self):
+        if self._closed:
+            raise OSError("room closed")
+        try:
+            conn, addr = self._conns.get(timeout=self._timeout)
+        except queue.Empty:
+            raise socket.timeout("timed out")
+        if conn is None:
+            raise OSError("room closed")
+        return conn, addr
+
+    def close(self) -> None:
+        self._closed = True
+        self._conns.put((None, None))
+
+    # router side
+    def deliver(self, conn: socket.socket, addr) -> None:
+        self.handed.append(conn)
+        self._conns.put((conn, addr))
+
+    def shutdown_all(self) -> None:
+        self.close()
+        for conn in self.handed:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _SocketModule:
+    def __getattr__(self, name):
+        return getattr(socket, name)
+
+    def socket(self, *args, **kwargs):
+        listener = getattr(_ctx, "listener", None)
+        if listener is not None:
+            # the first socket a room thread creates is the game's server socket
+            _ctx.listener = None
+            return listener
+        return socket.socket(*args, **kwargs)
+
+
+class _ArgumentParser(argparse.ArgumentParser):
+    def parse_args(self, args=None, namespace=None):
+        if args is None:
+            args = getattr(_ctx, "argv", None)
+        return super().parse_args(args, namespace)
+
+
+class _ArgparseModule:
+    ArgumentParser = _ArgumentParser
+
+    def __getattr__(self, name):
+        return getattr(argparse, name)
+
+
+class GameHost:
+    def __init__(self, host: str, port: int, ctl_fd: int) -> None:
+        self.host = host
+        self.port = port
+        self._ctl = os.fdopen(ctl_fd, "w", encoding="utf-8")
+        self._ctl_lock = threading.Lock()
+        self._rooms: Dict[int, RoomListener] = {}
+        self._rooms_lock = threading.Lock()
+
+        # unmodified game module; give it per-room socket/argparse
+        self.game = importlib.import_module("server.server")
+        self.game.socket = _SocketModule()
+        self.game.argparse = _ArgparseModule()
+
+    def send_ctl(self, msg: dict) -> None:
+        with self._ctl_lock:
+            try:
+                self._ctl.write(json.dumps(msg) + "\n")
+                self._ctl.flush()
+            except (OSError, ValueError):
+                pass
+
+    # rooms
+    def open_room(self, room_id: int, argv: list) -> None:
+        listener = RoomListener(room_id)
+        with self._rooms_lock:
+            old = self._rooms.get(room_id)
+            self._rooms[room_id] = listener
+        if old is not None:
+            old.shutdown_all()
+        threading.Thread(target=self._run_room, args=(listener, argv), daemon=True).start()
+
+    def close_room(self, room_id: int) -> None:
+        with self._rooms_lock:
+            listener = self._rooms.get(room_id)
+        if listener is not None:
+            listener.shutdown_all()
+
+    def _run_room(self, listener: RoomListener, argv: list) -> None:
+        _ctx.listener = listener
+        _ctx.argv = [str(a) for a in argv]
+        returncode = 0
+        try:
+            self.game.main()
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else 1
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+        finally:
+            listener.shutdown_all()
+            with self._rooms_lock:
+                if self._rooms.get(listener.room_id) is listener:
+                    del self._rooms[listener.room_id]
+        self.send_ctl({"event": "room_done", "room_id": listener.room_id, "returncode": returncode})
+
+    def control_loop(self, loop: asyncio.AbstractEventLoop, stop: asyncio.Event) -> None:
+        for line in sys.stdin:
+            msg = {}
+            try:
+                msg = json.loads(line)
+                cmd = msg.get("cmd")
+                room_id = int(msg.get("room_id"))
+                if cmd == "open_room":
+                    self.open_room(room_id, msg.get("argv", []))
+                elif cmd == "close_room":
+                    self.close_room(room_id)
+                else:
+                    raise ValueError(f"unknown cmd {cmd}")
+                self.send_ctl({"seq": msg.get("seq"), "ok": True})
+            except Exception as e:
+                seq = msg.get("seq") if isinstance(msg, dict) else None
+                self.send_ctl({"seq": seq, "ok": False, "message": str(e)})
+        loop.call_soon_threadsafe(stop.set)
+
+    # routing
+    async def _peek_join(self, loop, conn: socket.socket) -> Optional[dict]:
+        deadline = time.monotonic() + JOIN_TIMEOUT
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            ready = loop.create_future()
+            loop.add_reader(conn.fileno(), lambda: ready.done() or ready.set_result(None))
+            try:
+                await asyncio.wait_for(ready, remaining)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                loop.remove_reader(conn.fileno())
+            data = conn.recv(MAX_JOIN_LINE, socket.MSG_PEEK)
+            if not data:
+                return None
+            if b"\n" in data:
+                return json.loads(data.split(b"\n", 1)[0])
+            if len(data) >= MAX_JOIN_LINE:
+                return None
+            # partial line: the socket stays readable until the rest arrives
+            await asyncio.sleep(0.01)
+
+    async def _route(self, loop, conn: socket.socket, addr) -> None:
+        try:
+            join = await self._peek_join(loop, conn)
+        except Exception:
+            join = None
+        room_id = join.get("room_id") if isinstance(join, dict) else None
+        with self._rooms_lock:
+            listener = self._rooms.get(room_id)
+        if listener is None:
+            try:
+                conn.setblocking(True)
+                conn.sendall((json.dumps({"cmd": "error", "message": "wrong room"}) + "\n").encode("utf-8"))
+            except OSError:
+                pass
+            conn.close()
+            return
+        # the join line is still unread; the game reads it as usual
+        conn.setblocking(True)
+        listener.deliver(conn, addr)
+
+    async def serve(self) -> None:
+        loop = asyncio.get_running_loop()
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        srv.bind((self.host, self.port))
+        srv.listen(1024)
+        srv.setblocking(False)
+        self.port = srv.getsockname()[1]
+        print(f"[HOST] {os.getcwd()} listening on {self.host}:{self.port}")
+
+        stop = asyncio.Event()
+        threading.Thread(target=self.control_loop, args=(loop, stop), daemon=True).start()
+        self.send_ctl({"event": "ready", "port": self.port})
+
+        async def accept_loop():
+            while True:
+                conn, addr = await loop.sock_accept(srv)
+                conn.setblocking(False)
+                loop.create_task(self._route(loop, conn, addr))
+
+        acceptor = loop.create_task(accept_loop())
+        await stop.wait()
+        acceptor.cancel()
+        srv.close()
+        with self._rooms_lock:
+            rooms = list(self._rooms.values())
+        for listener in rooms:
+            listener.shutdown_all()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=0)
+    ap.add_argument("--ctl-fd", type=int, required=True)
+    args = ap.parse_args()
+
+    # run as a script, so sys.path[0] is this file's dir; the game lives in cwd
+    sys.path[0] = os.getcwd()
+    host = GameHost(args.host, args.port, args.ctl_fd)
+    asyncio.run(host.serve())
+
+
+if __name__ == "__main__":
+    main()
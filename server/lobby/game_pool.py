@@ -0,0 +1,452 @@
+import itertools
+import json
+import os
+import queue
+import select
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+WORKER_SCRIPT = Path(__file__).with_name("game_worker.py")
+HOST_SCRIPT = Path(__file__).with_name("game_host.py")
+
+# how long start_game waits for a warm worker to take the room before
+# falling back to a cold start
+HANDOFF_TIMEOUT = 3.0
+
+
+class WarmWorker:
+    def __init__(self, game_dir: Path) -> None:
+        ctl_r, ctl_w = os.pipe()
+        try:
+            self.proc = subprocess.Popen(
+                [sys.executable, str(WORKER_SCRIPT), "--ctl-fd", str(ctl_w)],
+                cwd=game_dir,
+                stdin=subprocess.PIPE,
+                pass_fds=(ctl_w,),
+            )
+        except Exception:
+            os.close(ctl_r)
+            raise
+        finally:
+            os.close(ctl_w)
+        self.ctl_r = ctl_r
+        self.idle_since = time.monotonic()
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def hand_off(self, argv: List[str], timeout: float = HANDOFF_TIMEOUT) -> bool:
+        """Give the worker its room. True once it confirmed, False if it is unusable."""
+        try:
+            self.proc.stdin.write((json.dumps({"argv": argv}) + "\n").encode("utf-8"))
+            self.proc.stdin.close()
+            ready, _, _ = select.select([self.ctl_r], [], [], timeout)
+            return bool(ready) and os.read(self.ctl_r, 4096).startswith(b'{"ok": true')
+        except (OSError, ValueError):
+            return False
+        finally:
+            self._close_ctl()
+
+    def retire(self) -> None:
+        try:
+            # EOF on stdin makes an idle worker exit on its own
+            self.proc.stdin.close()
+        except Exception:
+            pass
+        self._close_ctl()
+        try:
+            self.proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+    def _close_ctl(self) -> None:
+        if self.ctl_r is not None:
+            os.close(self.ctl_r)
+            self.ctl_r = None
+
+
+class GameServerPool:
+    """
+    Keeps pre-started game server interpreters per game version, with the
+    version's server.server module already imported, so start_game does not
+    pay for interpreter start-up and imports while the players wait.
+
+    A version is warmed when a room for it is created (or right after a cold
+    start), up to max_idle workers. Each worker runs exactly one room and then
+    exits; the pool tops the version back up to min_idle. Idle workers that
+    have not been needed for idle_timeout seconds are retired, down to
+    min_idle for a version still in use and down to zero for a version
+    nobody played within idle_timeout.
+    """
+
+    def __init__(self, min_idle: int = 1, max_idle: int = 4, idle_timeout: float = 300.0) -> None:
+        self.min_idle = min_idle
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._idle: Dict[str, List[WarmWorker]] = {}
+        self._last_used: Dict[str, float] = {}
+        self._running = False
+
+        self.warm_starts = 0
+        self.cold_starts = 0
+
+    def start(self) -> None:
+        self._running = True
+        threading.Thread(target=self._reap_loop, daemon=True).start()
+
+    def shutdown(self) -> None:
+        self._running = False
+        with self._lock:
+            workers = [w for ws in self._idle.values() for w in ws]
+            self._idle.clear()
+        for w in workers:
+            w.retire()
+
+    def warm(self, game_dir: Path, extra: int = 0) -> None:
+        """Make sure game_dir has min_idle (+extra, capped at max_idle) idle workers."""
+        key = str(game_dir)
+        if not Path(game_dir).is_dir():
+            return
+        with self._lock:
+            self._last_used[key] = time.monotonic()
+            idle = [w for w in self._idle.get(key, []) if w.alive()]
+            self._idle[key] = idle
+            want = min(self.max_idle, max(self.min_idle, len(idle) + extra))
+            missing = want - len(idle)
+        for _ in range(missing):
+            try:
+                worker = WarmWorker(game_dir)
+            except Exception as e:
+                print(f"[!] could not warm {game_dir}: {e}")
+                return
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle:
+                    idle.append(worker)
+                    continue
+            # a concurrent warm() already filled the version up
+            worker.retire()
+
+    def prewarm(self, game_dir: Path) -> None:
+        """Add one idle worker for game_dir in the background (a room for it was just created)."""
+        threading.Thread(target=self.warm, args=(game_dir, 1), daemon=True).start()
+
+    def launch(self, game_dir: Path, argv: List[str]) -> subprocess.Popen:
+        """Start a game server for one room, warm if possible, cold otherwise."""
+        key = str(game_dir)
+        while True:
+            worker = self._take(key)
+            if worker is None:
+                break
+            if worker.hand_off(argv):
+                self.warm_starts += 1
+                self._refill(game_dir)
+                return worker.proc
+            worker.retire()
+
+        proc = subprocess.Popen([sys.executable, "-m", "server.server"] + argv, cwd=game_dir)
+        self.cold_starts += 1
+        self._refill(game_dir)
+        return proc
+
+    def _take(self, key: str) -> Optional[WarmWorker]:
+        with self._lock:
+            self._last_used[key] = time.monotonic()
+            idle = self._idle.get(key, [])
+            while idle:
+                # most recently started first; it is the least likely to be reaped
+                worker = idle.pop()
+                if worker.alive():
+                    return worker
+        return None
+
+    def _refill(self, game_dir: Path) -> None:
+        threading.Thread(target=self.warm, args=(game_dir,), daemon=True).start()
+
+    def _reap_loop(self) -> None:
+        while self._running:
+            time.sleep(min(5.0, self.idle_timeout))
+            self.reap()
+
+    def reap(self) -> None:
+        now = time.monotonic()
+        retired: List[WarmWorker] = []
+        with self._lock:
+            for key in list(self._idle.keys()):
+                idle = [w for w in self._idle[key] if w.alive()]
+                cold = now - self._last_used.get(key, 0) > self.idle_timeout
+                keep = 0 if cold else self.min_idle
+                # oldest first
+                while len(idle) > keep and now - idle[0].idle_since > self.idle_timeout:
+                    retired.append(idle.pop(0))
+                if idle:
+                    self._idle[key] = idle
+                else:
+                    del self._idle[key]
+                    self._last_used.pop(key, None)
+        for w in retired:
+            w.retire()
+
+    def game_dirs(self) -> set:
+        """Versions with idle workers; their interpreters run from these dirs."""
+        with self._lock:
+            return {key for key, ws in self._idle.items() if ws}
+
+    def counts(self) -> dict:
+        with self._lock:
+            idle = sum(len(ws) for ws in self._idle.values())
+            versions = len(self._idle)
+        return {
+            "pool_idle_workers": idle,
+            "pool_warm_versions": versions,
+            "pool_warm_starts": self.warm_starts,
+            "pool_cold_starts": self.cold_starts,
+        }
+
+
+class HostedRoom:
+    """
+    A room running inside a shared game host. start_game stores it where a
+    per-room Popen used to go, so it offers the same poll/wait/terminate.
+    """
+
+    def __init__(self, host: "GameHostProcess", room_id: int) -> None:
+        self.host = host
+        self.room_id = room_id
+        self.pid = host.proc.pid
+        self.returncode: Optional[int] = None
+        self._done = threading.Event()
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        if not self._done.wait(timeout):
+            raise subprocess.TimeoutExpired(f"room {self.room_id}", timeout)
+        return self.returncode
+
+    def terminate(self) -> None:
+        self.host.close_room(self.room_id)
+
+    kill = terminate
+
+    def _finish(self, returncode: int) -> None:
+        self.returncode = returncode
+        self._done.set()
+
+
+class GameHostProcess:
+    """One game_host.py process: every room of one game version, on one port."""
+
+    def __init__(self, game_dir: Path, bind_host: str, port: int,
+                 on_exit: Callable[["GameHostProcess"], None], lease_owner=None) -> None:
+        self.key = str(game_dir)
+        # who holds `port` in the lobby's PortAllocator, released when the host exits
+        self.lease_owner = lease_owner
+        self._on_exit = on_exit
+        ctl_r, ctl_w = os.pipe()
+        try:
+            self.proc = subprocess.Popen(
+                [sys.executable, str(HOST_SCRIPT), "--host", bind_host, "--port", str(port), "--ctl-fd", str(ctl_w)],
+                cwd=game_dir,
+                stdin=subprocess.PIPE,
+                pass_fds=(ctl_w,),
+            )
+        except Exception:
+            os.close(ctl_r)
+            raise
+        finally:
+            os.close(ctl_w)
+
+        self.port: Optional[int] = None
+        self.rooms: Dict[int, HostedRoom] = {}
+        self.idle_since = time.monotonic()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._seq = itertools.count(1)
+        self._waiters: Dict[int, "queue.Queue[dict]"] = {}
+        threading.Thread(target=self._read_loop, args=(ctl_r,), daemon=True).start()
+
+    def wait_ready(self, timeout: float) -> bool:
+        return self._ready.wait(timeout) and self.port is not None
+
+    def _read_loop(self, ctl_r: int) -> None:
+        with os.fdopen(ctl_r, "r", encoding="utf-8") as ctl:
+            for line in ctl:
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    continue
+                event = msg.get("event")
+                if event == "ready":
+                    self.port = msg.get("port")
+                    self._ready.set()
+                elif event == "room_done":
+                    self._room_done(msg.get("room_id"), msg.get("returncode", 0))
+                else:
+                    with self._lock:
+                        waiter = self._waiters.pop(msg.get("seq"), None)
+                    if waiter is not None:
+                        waiter.put(msg)
+
+        # control pipe closed: the host process is gone, and its rooms with it
+        returncode = self.proc.wait()
+        self._ready.set()
+        with self._lock:
+            rooms, self.rooms = list(self.rooms.values()), {}
+            waiters, self._waiters = list(self._waiters.values()), {}
+        for room in rooms:
+            room._finish(returncode)
+        for waiter in waiters:
+            waiter.put({"ok": False, "message": "game host exited"})
+        self._on_exit(self)
+
+    def _room_done(self, room_id: int, returncode: int) -> None:
+        with self._lock:
+            room = self.rooms.pop(room_id, None)
+            if not self.rooms:
+                self.idle_since = time.monotonic()
+        if room is not None:
+            room._finish(returncode)
+
+    def _request(self, msg: dict, timeout: float = HANDOFF_TIMEOUT) -> dict:
+        seq = next(self._seq)
+        waiter: "queue.Queue[dict]" = queue.Queue()
+        with self._lock:
+            self._waiters[seq] = waiter
+        try:
+            self.proc.stdin.write((json.dumps(dict(msg, seq=seq)) + "\n").encode("utf-8"))
+            self.proc.stdin.flush()
+            return waiter.get(timeout=timeout)
+        except (OSError, ValueError, queue.Empty) as e:
+            return {"ok": False, "message": f"game host not responding: {e}"}
+        finally:
+            with self._lock:
+                self._waiters.pop(seq, None)
+
+    def open_room(self, room_id: int, argv: List[str]) -> HostedRoom:
+        room = HostedRoom(self, room_id)
+        # registered first: the game may already be over before the reply arrives
+        with self._lock:
+            self.rooms[room_id] = room
+        resp = self._request({"cmd": "open_room", "room_id": room_id, "argv": argv})
+        if not resp.get("ok"):
+            with self._lock:
+                self.rooms.pop(room_id, None)
+            raise RuntimeError(resp.get("message", "open_room failed"))
+        return room
+
+    def close_room(self, room_id: int) -> None:
+        self._request({"cmd": "close_room", "room_id": room_id})
+
+    def room_count(self) -> int:
+        with self._lock:
+            return len(self.rooms)
+
+    def stop(self) -> None:
+        try:
+            # EOF on stdin closes every room and ends the host
+            self.proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            self.proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+class GameHostManager:
+    """
+    One shared game host process per game version, started with the
+    version's first room and stopped after idle_timeout seconds without rooms.
+    A room costs a few threads and sockets inside the host instead of a
+    whole interpreter and a port of its own.
+    """
+
+    def __init__(self, idle_timeout: float = 300.0, start_timeout: float = 10.0, ports=None) -> None:
+        self.idle_timeout = idle_timeout
+        self.start_timeout = start_timeout
+        # PortAllocator for the host ports; without one the OS picks a port
+        self.ports = ports
+        self._host_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, GameHostProcess] = {}
+        self._running = False
+
+    def start(self) -> None:
+        self._running = True
+        threading.Thread(target=self._reap_loop, daemon=True).start()
+
+    def shutdown(self) -> None:
+        self._running = False
+        with self._lock:
+            hosts, self._hosts = list(self._hosts.values()), {}
+        for host in hosts:
+            host.stop()
+
+    def _host_for(self, game_dir: Path, bind_host: str) -> GameHostProcess:
+        key = str(game_dir)
+        with self._lock:
+            host = self._hosts.get(key)
+            if host is None or host.proc.poll() is not None:
+                owner = ("host", next(self._host_ids))
+                port = self.ports.lease(owner) if self.ports is not None else 0
+                try:
+                    host = GameHostProcess(game_dir, bind_host, port, self._host_exited, owner)
+                except Exception:
+                    if self.ports is not None:
+                        self.ports.release(owner)
+                    raise
+                self._hosts[key] = host
+            # keeps reap() off a host that is about to get a room
+            host.idle_since = time.monotonic()
+        if not host.wait_ready(self.start_timeout):
+            raise RuntimeError(f"game host for {game_dir} did not start")
+        return host
+
+    def _host_exited(self, host: GameHostProcess) -> None:
+        with self._lock:
+            if self._hosts.get(host.key) is host:
+                del self._hosts[host.key]
+        if self.ports is not None and host.lease_owner is not None:
+            self.ports.release(host.lease_owner)
+
+    def open_room(self, game_dir: Path, bind_host: str, room_id: int, argv: List[str]):
+        """Returns (room handle, port the players connect to)."""
+        host = self._host_for(game_dir, bind_host)
+        return host.open_room(room_id, argv), host.port
+
+    def _reap_loop(self) -> None:
+        while self._running:
+            time.sleep(min(5.0, self.idle_timeout))
+            self.reap()
+
+    def reap(self) -> None:
+        now = time.monotonic()
+        idle = []
+        with self._lock:
+            for key, host in list(self._hosts.items()):
+                if host.room_count() == 0 and now - host.idle_since > self.idle_timeout:
+                    idle.append(self._hosts.pop(key))
+        for host in idle:
+            host.stop()
+
+    def game_dirs(self) -> set:
+        with self._lock:
+            return set(self._hosts.keys())
+
+    def counts(self) -> dict:
+        with self._lock:
+            hosts = list(self._hosts.values())
+        return {
+            "shared_hosts": len(hosts),
+            "shared_host_rooms": sum(h.room_count() for h in hosts),
+        }
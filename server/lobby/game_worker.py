@@ -0,0 +1,41 @@
+"""
+Warm game server process, started by GameServerPool with cwd = a game version dir.
+
+    python <path>/game_worker.py --ctl-fd N
+
+Imports the game's server.server module right away, then waits on stdin for
+one JSON line {"argv": [...]} and runs the game's main() with that argv, the
+same as `python -m server.server <argv>` would. It answers {"ok": true} on
+fd N (the control pipe back to the lobby) once it took the room. EOF on stdin
+means the pool no longer needs it and the process just exits.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ctl-fd", type=int, required=True)
+    args = ap.parse_args()
+
+    # run as a script, so sys.path[0] is this file's dir; the game lives in cwd
+    sys.path[0] = os.getcwd()
+    game = importlib.import_module("server.server")
+
+    line = sys.stdin.readline()
+    if not line:
+        return
+    msg = json.loads(line)
+    sys.argv = [game.__file__] + [str(a) for a in msg.get("argv", [])]
+
+    with os.fdopen(args.ctl_fd, "w", encoding="utf-8") as ctl:
+        ctl.write(json.dumps({"ok": True, "pid": os.getpid()}) + "\n")
+
+    game.main()
+
+
+if __name__ == "__main__":
+    main()
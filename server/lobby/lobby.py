@@ -8,24 +8,73 @@ from pathlib import Path
 
 from typing import Dict
 from server.db import accounts_repo, room_repo , gamelog_repo, games_repo, ratings_repo, init_db
-from server.common.protocol import send_json, recv_json
+from server.common.protocol import send_json, recv_message, set_framing, hello_framing, choose_framing, broadcast
+from server.lobby.dispatcher import CommandDispatcher
+from server.lobby.state import LobbyState
+from server.lobby.catalog import GameCatalog
+from server.lobby.subscriptions import SubscriptionHub, TOPICS
+from server.lobby.game_pool import GameServerPool, GameHostManager
+from server.lobby.ports import PortAllocator, NoFreePort
+from server.lobby.supervisor import GameSupervisor
+from server.lobby import outbox
+from server.lobby.outbox import SocketSession
+from server.lobby.resume import ResumeTokens
+from server.lobby.versions import VersionCollector
+from server.dev.chunk_store import ChunkStore
 
 HOST = "0.0.0.0"
 PORT = 10050
 
-running = True
-
-online_players: Dict[str, socket.socket] = {}
-sock_usernames: Dict[socket.socket, str] = {}
-
-online_developers: Dict[str, socket.socket] = {}
-sock_devnames: Dict[socket.socket, str] = {}
+# "threaded" keeps one thread per connection, "asyncio" serves everyone from one event loop
+SERVER_MODE = "threaded"
+ASYNC_WORKERS = 32
+LISTEN_BACKLOG = 4096
+# "pool": one game server process per room, started from pre-warmed interpreters
+# "shared": one multi-room game host process (and port) per game version
+GAME_HOSTING = "pool"
+# pre-started game server interpreters kept per game version
+POOL_MIN_IDLE = 1
+POOL_MAX_IDLE = 4
+POOL_IDLE_TIMEOUT = 300
+# game servers only ever listen on ports from this range (open it in the firewall)
+GAME_PORT_MIN = 20000
+GAME_PORT_MAX = 20999
+# a match running longer than this is terminated; per-room game processes
+# are also capped in address space (MiB) and CPU seconds (0 = no limit)
+MATCH_TIMEOUT = 3600
+GAME_RLIMIT_AS_MB = 1024
+GAME_RLIMIT_CPU_S = 600
+# how often (s) the plain copies of superseded versions nobody uses are dropped
+VERSION_GC_INTERVAL = 60
+# how long a login's resume token stays valid (s); the HMAC key lives in RESUME_SECRET_PATH
+RESUME_TOKEN_TTL = 86400
+RESUME_SECRET_PATH = Path(__file__).parent / "resume_secret"
 
-room_members: Dict[int, set[str]] = {}
-room_states: Dict[int, dict] = {}
-user_room: Dict[str, int] = {}
+running = True
 
-game_processes: dict[int, subprocess.Popen] = {}
+GAME_ROOT = Path(__file__).parent.parent / "game"
+# uploaded versions, deduplicated by the dev server; older versions are rebuilt from it on demand
+chunk_store = ChunkStore(GAME_ROOT / "chunk_store")
+
+# sessions, rooms and game processes; shared by every connection handler
+lobby_state = LobbyState()
+# games and their latest versions, kept in memory; developer handlers refresh it
+catalog = GameCatalog()
+# pushes room-list / catalog changes to subscribed connections
+subscriptions = SubscriptionHub(lobby_state.open_room_entry, catalog)
+lobby_state.on_room_change = subscriptions.mark_room
+catalog.on_change = subscriptions.mark_catalog
+game_pool = GameServerPool(POOL_MIN_IDLE, POOL_MAX_IDLE, POOL_IDLE_TIMEOUT)
+game_ports = PortAllocator(GAME_PORT_MIN, GAME_PORT_MAX)
+game_hosts = GameHostManager(POOL_IDLE_TIMEOUT, ports=game_ports)
+# reaps game processes, enforces MATCH_TIMEOUT and cleans rooms whose game ended without finish_game
+supervisor = GameSupervisor(lambda *args: on_game_exit(*args), MATCH_TIMEOUT,
+                            as_mb=GAME_RLIMIT_AS_MB, cpu_s=GAME_RLIMIT_CPU_S)
+# lets a reconnecting client log back in without its password (resume_session)
+resume_tokens = ResumeTokens(RESUME_SECRET_PATH, RESUME_TOKEN_TTL)
+# drops superseded versions' zip + folder once no room, warm worker or shared host uses them
+versions = VersionCollector(GAME_ROOT, chunk_store, VERSION_GC_INTERVAL,
+                            busy_dirs=lambda: game_pool.game_dirs() | game_hosts.game_dirs())
 
 
 def load_connection_info():
@@ -39,10 +88,97 @@ def load_connection_info():
 
     print(f"Host: {HOST}/ {type(HOST)}, Port: {PORT} / {type(PORT)}")
 
-def pick_free_port() -> int:
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind(("0.0.0.0", 0))
-        return s.getsockname()[1]
+def load_server_options():
+    _config_path = Path(__file__).parent / "config.json"
+
+    with _config_path.open("r", encoding="utf-8") as f:
+        _cfg = json.load(f)
+    global SERVER_MODE, ASYNC_WORKERS, LISTEN_BACKLOG, GAME_HOSTING, game_ports
+    SERVER_MODE = str(_cfg.get("SERVER_MODE", SERVER_MODE)).lower()
+    ASYNC_WORKERS = int(_cfg.get("ASYNC_WORKERS", ASYNC_WORKERS))
+    LISTEN_BACKLOG = int(_cfg.get("LISTEN_BACKLOG", LISTEN_BACKLOG))
+    outbox.SEND_BACKLOG = int(_cfg.get("SEND_BACKLOG_KB", outbox.SEND_BACKLOG // 1024)) * 1024
+    outbox.SEND_TIMEOUT = float(_cfg.get("SEND_TIMEOUT", outbox.SEND_TIMEOUT))
+    game_pool.min_idle = int(_cfg.get("POOL_MIN_IDLE", POOL_MIN_IDLE))
+    game_pool.max_idle = int(_cfg.get("POOL_MAX_IDLE", POOL_MAX_IDLE))
+    game_pool.idle_timeout = float(_cfg.get("POOL_IDLE_TIMEOUT", POOL_IDLE_TIMEOUT))
+    game_hosts.idle_timeout = game_pool.idle_timeout
+    GAME_HOSTING = str(_cfg.get("GAME_HOSTING", GAME_HOSTING)).lower()
+    game_ports = PortAllocator(
+        int(_cfg.get("GAME_PORT_MIN", GAME_PORT_MIN)),
+        int(_cfg.get("GAME_PORT_MAX", GAME_PORT_MAX)),
+    )
+    game_hosts.ports = game_ports
+    supervisor.match_timeout = float(_cfg.get("MATCH_TIMEOUT", MATCH_TIMEOUT))
+    supervisor.as_mb = int(_cfg.get("GAME_RLIMIT_AS_MB", GAME_RLIMIT_AS_MB))
+    supervisor.cpu_s = int(_cfg.get("GAME_RLIMIT_CPU_S", GAME_RLIMIT_CPU_S))
+    resume_tokens.ttl = float(_cfg.get("RESUME_TOKEN_TTL", RESUME_TOKEN_TTL))
+    versions.interval = float(_cfg.get("VERSION_GC_INTERVAL", VERSION_GC_INTERVAL))
+
+    print(f"Server mode: {SERVER_MODE}, game hosting: {GAME_HOSTING}")
+
+def game_server_dir(game: dict, room_id=None) -> Path:
+    server_dir = (GAME_ROOT / "game_store" / f"{game.get('developer_name')}"
+                  / f"{game.get('game_id')}_{game.get('game_name')}" / f"v{game.get('latest_version')}")
+    if room_id is not None:
+        # pinned before it is built, so a publish right now cannot get it collected under the room
+        versions.pin(room_id, server_dir)
+    key = game.get("upload_path")
+    if not server_dir.is_dir() and key and chunk_store.has(key):
+        chunk_store.materialize_dir(key, GAME_ROOT / key, server_dir)
+    return server_dir
+
+def notify_players(names, evt: dict, skip=None) -> None:
+    socks = []
+    for name in names:
+        psock = lobby_state.player_sock(name)
+        if psock is not None and psock is not skip:
+            socks.append(psock)
+    # encoded once; sendall only queues, so a slow member never holds us up
+    broadcast(socks, evt)
+
+def kick_old_session(old_session) -> None:
+    # the account just logged in on another connection; tell the old one and drop it
+    if old_session is None:
+        return
+    try:
+        send_json(old_session, {
+            "ok": False,
+            "cmd": "force_logout",
+            "message": "logged in from another location",
+        })
+    except Exception:
+        pass
+    try:
+        old_session.close()
+    except Exception:
+        pass
+
+def leave_current_room(username: str):
+    left = lobby_state.leave_room(username)
+    if left is None:
+        return None
+    room_id = left["room_id"]
+    if left["closed"]:
+        if left["host"] is not None:
+            evt = {
+                "cmd": "room_closed",
+                "room_id": room_id,
+                "message": f"host {left['host']} left, room closed",
+            }
+            notify_players(left["players"], evt)
+        try:
+            room_repo.delete_room(room_id)
+        except Exception:
+            pass
+    else:
+        evt = {
+            "cmd": "room_update",
+            "room_id": room_id,
+            "players": left["players"],
+        }
+        notify_players(left["players"], evt)
+    return left
 
 def handle_player_register(request: dict) -> dict:
     username = request.get("username", "").strip()
@@ -93,34 +229,19 @@ def handle_player_login(request: dict, session: socket.socket) -> dict:
             "message": "invalid username or password"
         }
     
-    old_session = online_players.get(username)
-    if old_session is not None and old_session is not session:
-        try:
-            send_json(old_session, {
-                "ok": False,
-                "cmd": "force_logout",
-                "message": "logged in from another location",
-            })
-        except Exception:
-            pass
-        try:
-            old_session.close()
-        except Exception:
-            pass
-
-    # remember connection info
-    online_players[username] = session
-    sock_usernames[session] = username
+    old_session = lobby_state.bind_player(username, session)
+    kick_old_session(old_session)
 
     print(f"[*] User {username} logined success.")
     return {
         "ok": True, 
         "cmd": "player_login",
-        "message": "login success"
+        "message": "login success",
+        "resume_token": resume_tokens.issue("player", username),
     }
 
 def handle_room_create(request: dict, sock: socket.socket) -> dict:
-    username = sock_usernames.get(sock)
+    username = lobby_state.player_of(sock)
     if not username:
         return {
             "ok": False,
@@ -130,10 +251,20 @@ def handle_room_create(request: dict, sock: socket.socket) -> dict:
         }
     
     game_id = request.get("game_id")
-    game = games_repo.get_game_by_id(game_id)
-    max_players = game.get("max_players")
     try:
         game_id = int(game_id)
+    except(TypeError, ValueError):
+        game_id = None
+    game = catalog.get(game_id) if game_id is not None else None
+    if game is None:
+        return {
+            "ok": False,
+            "cmd": "create_room",
+            "error": "NO_SUCH_GAME",
+            "message": "game not found"
+        }
+    max_players = game.get("max_players")
+    try:
         max_players = int(max_players)
     except(TypeError, ValueError):
         return {
@@ -171,24 +302,23 @@ def handle_room_create(request: dict, sock: socket.socket) -> dict:
     
     host_player_id = player_row["id"]
 
-    room_id = room_repo.create_room(host_player_id, game_id, max_players)
+    # a player sits in one room at a time; leave the old one properly first
+    if lobby_state.room_of(username) is not None:
+        leave_current_room(username)
 
-    if room_id not in room_members:
-        room_members[room_id] = set()
-    room_members[room_id].add(username)
+    room_id = room_repo.create_room(host_player_id, game_id, max_players)
 
     game_name = game.get("game_name")
 
-    room_states[room_id] = {
-        "room_id": room_id,
-        "host": username,
+    lobby_state.create_room(room_id, username, {
         "game_id": game_id,
         "game_name": game_name,
         "max_players": max_players,
-        "status": "open",
-    }
+    })
+    # get a game server interpreter ready while the players gather
+    if GAME_HOSTING == "pool":
+        game_pool.prewarm(game_server_dir(game))
 
-    user_room[username] = room_id
     print(f"max_players {max_players}")
     return {
         "ok": True,
@@ -200,7 +330,7 @@ def handle_room_create(request: dict, sock: socket.socket) -> dict:
     }
 
 def handle_join_room(request: dict, sock: socket.socket) -> dict:
-    username = sock_usernames.get(sock)
+    username = lobby_state.player_of(sock)
     if not username:
         return {
             "ok": False,
@@ -219,44 +349,41 @@ def handle_join_room(request: dict, sock: socket.socket) -> dict:
             "error": "BAD_INPUT",
             "message": "room_id must be integer",
         }
-    room = room_repo.get_room(room_id)
-    members = room_members.get(room_id)
-    if members is None:
+    current = lobby_state.room_of(username)
+    if current is not None and current != room_id:
+        leave_current_room(username)
+
+    # capacity is checked and the seat taken under the room lock, so racing joins cannot overfill it
+    error, player_list = lobby_state.join_room(room_id, username)
+    if error == "NO_SUCH_ROOM":
         return {
             "ok": False,
             "cmd": "join_room",
             "error": "NO_SUCH_ROOM",
             "message": f"room {room_id} not found",
         }
-    
-    # if username in members:
-    #     return {
-    #         "ok": True,
-    #         "cmd": "join_room",
-    #         "room_id": room_id,
-    #         "message": "already in room",
-    #     }
-    
-    members.add(username)
-    if len(members) > (room.get("max_players")):
+    if error == "ROOM_FULL":
         return {
             "ok": False,
             "cmd": "join_room",
             "error": "ROOM_FULL",
             "message": f"room {room_id} is full. Please join others room",
         }
-    user_room[username] = room_id
+    if error == "ROOM_NOT_OPEN":
+        return {
+            "ok": False,
+            "cmd": "join_room",
+            "error": "ROOM_NOT_OPEN",
+            "message": f"room {room_id} already started",
+        }
+
     # broadcast join message
-    player_list = list(members)
     evt = {
         "cmd": "room_update",
         "room_id": room_id,
         "players": player_list,
     }
-    for name in player_list:
-        members_sock = online_players.get(name)
-        if members_sock is not None and sock != members_sock:
-            send_json(members_sock, evt)
+    notify_players(player_list, evt, skip=sock)
     return{
         "ok": True,
         "cmd": "join_room",
@@ -266,7 +393,7 @@ def handle_join_room(request: dict, sock: socket.socket) -> dict:
     }
 
 def handle_room_info(request: dict, sock: socket.socket) -> dict:
-    username = sock_usernames.get(sock)
+    username = lobby_state.player_of(sock)
     if not username:
         return {
             "ok": False,
@@ -286,8 +413,8 @@ def handle_room_info(request: dict, sock: socket.socket) -> dict:
             "message": "room_id must be integer",
         }
 
-    members = room_members.get(room_id)
-    if members is None:
+    players = lobby_state.room_players(room_id)
+    if players is None:
         return {
             "ok": False,
             "cmd": "room_info",
@@ -299,11 +426,11 @@ def handle_room_info(request: dict, sock: socket.socket) -> dict:
         "ok": True,
         "cmd": "room_info",
         "room_id": room_id,
-        "players": list(members),
+        "players": players,
     }
 
 def handle_list_room(request: dict, sock: socket.socket) -> dict:
-    username = sock_usernames.get(sock)
+    username = lobby_state.player_of(sock)
     if not username:
         return {
             "ok": False,
@@ -312,20 +439,7 @@ def handle_list_room(request: dict, sock: socket.socket) -> dict:
             "message": "login required",
         }
     
-    rooms_list = []
-    for room_id, state in room_states.items():
-        if state.get("status") != "open":
-            continue
-        members = room_members.get(room_id, set())
-        rooms_list.append({
-            "room_id": room_id,
-            "host": state.get("host"),
-            "game_name": state.get("game_name"),
-            "game_id": state.get("game_id"),
-            "current_players": len(members),
-            "max_players": state.get("max_players"),
-            "status": state.get("status"),
-        })
+    rooms_list = lobby_state.list_open_rooms()
     return {
         "ok": True,
         "cmd": "list_rooms",
@@ -333,7 +447,7 @@ def handle_list_room(request: dict, sock: socket.socket) -> dict:
     }
 
 def handle_leave_room(request: dict, sock: socket.socket) -> dict:
-    username = sock_usernames.get(sock)
+    username = lobby_state.player_of(sock)
     if not username:
         return {
             "ok": False,
@@ -342,87 +456,146 @@ def handle_leave_room(request: dict, sock: socket.socket) -> dict:
             "message": "login required",
         }
     
-    room_id = user_room.get(username)
-    if room_id is None:
+    left = leave_current_room(username)
+    if left is None:
         return {
             "ok": False,
             "cmd": "leave_room",
             "error": "NOT_IN_ROOM",
             "message": "you are not in any room",
         }
-    members = room_members.get(room_id)
-    state = room_states.get(room_id)
-    if members is None or state is None:
-        user_room.pop(username, None)
-        return{
+    room_id = left["room_id"]
+    if left["closed"] and left["host"] == username:
+        return {
             "ok": True,
             "cmd": "leave_room",
             "room_id": room_id,
-            "message": "left room"
+            "message": "left room as host, room closed",
         }
-    members.discard(username)
-    user_room.pop(username, None)
-
-    host = state.get("host")
+    return {
+        "ok": True,
+        "cmd": "leave_room",
+        "room_id": room_id,
+        "message": "left room"
+    }
 
-    if username == host:
-        state["status"] = "closed"
-        evt = {
-            "cmd": "room_closed",
-            "room_id": room_id,
-            "message": f"host {host} left, room closed",
+def handle_list_games(request: dict, sock: socket.socket) -> dict:
+    username = lobby_state.player_of(sock)
+    devname = lobby_state.developer_of(sock)
+    if not username and not devname:
+        return {
+            "ok": False,
+            "cmd": "list_games",
+            "error": "NOT_LOGGED_IN",
+            "message": "login required",
         }
-
-        for name in list(members):
-            sock2 = online_players.get(name)
-            if sock2 is not None:
-                send_json(sock2, evt)
-        
-        room_members.pop(room_id, None)
-        room_states.pop(room_id, None)
-        room_repo.delete_room(room_id)
+    
+    version, games = catalog.listing()
+    if request.get("catalog_version") == version:
         return {
             "ok": True,
-            "cmd": "leave_room",
-            "room_id": room_id,
-            "message": "left room as host, room closed",
+            "cmd": "list_games",
+            "catalog_version": version,
+            "unchanged": True,
         }
-    else:
-        evt = {
-            "cmd": "room_update",
-            "room_id": room_id,
-            "players": list(members)
+
+    # games is the pre-encoded listing; send_json splices it in as is
+    return {
+        "ok": True,
+        "cmd": "list_games",
+        "games": games,
+        "catalog_version": version,
+    }
+
+def handle_list_games_delta(request: dict, sock: socket.socket) -> dict:
+    username = lobby_state.player_of(sock)
+    devname = lobby_state.developer_of(sock)
+    if not username and not devname:
+        return {
+            "ok": False,
+            "cmd": "list_games_delta",
+            "error": "NOT_LOGGED_IN",
+            "message": "login required",
         }
 
-        for name in list(members):
-            sock2 = online_players.get(name)
-            if sock2 is not None:
-                send_json(sock2, evt)
-            
+    since = request.get("since")
+    if since is not None and (not isinstance(since, int) or isinstance(since, bool)):
         return {
-            "ok": True,
-            "cmd": "leave_room",
-            "room_id": room_id,
-            "message": "left room"
+            "ok": False,
+            "cmd": "list_games_delta",
+            "error": "BAD_INPUT",
+            "message": "since must be a catalog_version integer",
         }
 
-def handle_list_games(request: dict, sock: socket.socket) -> dict:
-    username = sock_usernames.get(sock)
-    devname = sock_devnames.get(sock)
+    delta = catalog.delta(since)
+    resp = {
+        "ok": True,
+        "cmd": "list_games_delta",
+    }
+    resp.update(delta)
+    return resp
+
+def _requested_topics(request: dict):
+    topics = request.get("topics", request.get("topic"))
+    if isinstance(topics, str):
+        topics = [topics]
+    if not isinstance(topics, list) or not topics:
+        return None
+    if any(t not in TOPICS for t in topics):
+        return None
+    return topics
+
+def handle_subscribe(request: dict, sock: socket.socket) -> dict:
+    username = lobby_state.player_of(sock)
+    devname = lobby_state.developer_of(sock)
     if not username and not devname:
         return {
             "ok": False,
-            "cmd": "list_games",
+            "cmd": "subscribe",
             "error": "NOT_LOGGED_IN",
             "message": "login required",
         }
-    
-    games = gamelog_repo.list_games_with_latest_version()
 
+    topics = _requested_topics(request)
+    if topics is None:
+        return {
+            "ok": False,
+            "cmd": "subscribe",
+            "error": "BAD_INPUT",
+            "message": f"topic must be one of {', '.join(TOPICS)}",
+        }
+
+    resp = {
+        "ok": True,
+        "cmd": "subscribe",
+        "topics": topics,
+    }
+    resp.update(subscriptions.subscribe(sock, topics))
+    return resp
+
+def handle_unsubscribe(request: dict, sock: socket.socket) -> dict:
+    topics = _requested_topics(request)
+    if topics is None:
+        return {
+            "ok": False,
+            "cmd": "unsubscribe",
+            "error": "BAD_INPUT",
+            "message": f"topic must be one of {', '.join(TOPICS)}",
+        }
+
+    subscriptions.unsubscribe(sock, topics)
     return {
         "ok": True,
-        "cmd": "list_games",
-        "games": games
+        "cmd": "unsubscribe",
+        "topics": topics,
+    }
+
+def handle_hello(request: dict) -> dict:
+    # sent first thing on a connection; picks the framing for the rest of it
+    return {
+        "ok": True,
+        "cmd": "hello",
+        "framing": choose_framing(request.get("framing")),
     }
 
 def handle_developer_register(request: dict) -> dict:
@@ -474,34 +647,57 @@ def handle_developer_login(request: dict, session: socket.socket) -> dict:
             "message": "invalid username or password"
         }
     
-    old_session = online_developers.get(username)
-    if old_session is not None and old_session is not session:
-        try:
-            send_json(old_session, {
-                "ok": False,
-                "cmd": "force_logout",
-                "message": "logged in from another location",
-            })
-        except Exception:
-            pass
-        try:
-            old_session.close()
-        except Exception:
-            pass
-
-    # remember connection info
-    online_developers[username] = session
-    sock_devnames[session] = username
+    old_session = lobby_state.bind_developer(username, session)
+    kick_old_session(old_session)
 
     print(f"[*] User {username} logined success.")
     return {
         "ok": True, 
         "cmd": "player_login",
-        "message": "login success"
+        "message": "login success",
+        "resume_token": resume_tokens.issue("developer", username),
+    }
+
+def handle_resume_session(request: dict, session: socket.socket) -> dict:
+    # a reconnecting client logs back in with the token from its last login
+    identity = resume_tokens.verify(request.get("token"))
+    if identity is None:
+        return {
+            "ok": False,
+            "cmd": "resume_session",
+            "error": "BAD_TOKEN",
+            "message": "resume token is invalid or expired, log in again"
+        }
+    role, username = identity
+    if role == "player":
+        exists = accounts_repo.get_player_by_username(username) is not None
+    else:
+        exists = accounts_repo.get_developer_by_username(username) is not None
+    if not exists:
+        return {
+            "ok": False,
+            "cmd": "resume_session",
+            "error": "BAD_TOKEN",
+            "message": "account no longer exists"
+        }
+
+    if role == "player":
+        old_session = lobby_state.bind_player(username, session)
+    else:
+        old_session = lobby_state.bind_developer(username, session)
+    kick_old_session(old_session)
+
+    print(f"[*] {role} {username} resumed session.")
+    return {
+        "ok": True,
+        "cmd": "resume_session",
+        "role": role,
+        "username": username,
+        "resume_token": resume_tokens.issue(role, username),
     }
 
 def handle_developer_create_version(request: dict, sock: socket.socket):
-    username = sock_devnames.get(sock)
+    username = lobby_state.developer_of(sock)
     if not username:
         return {
             "ok": False,
@@ -551,24 +747,31 @@ def handle_developer_create_version(request: dict, sock: socket.socket):
     
     
     upload_path = f"game_store/{username}/{game_id}_{game_name}/v{version}.zip"
-    games_repo.mark_game_active(game_id)
-    gamelog_repo.activate_versions_for_game(game_id)
 
-    try:
-        version_id = gamelog_repo.create_gamelog(
-            game_id=game_id,
-            game_version=version,
-            changelog=changelog,
-            upload_path=upload_path,
-            is_active=1,
-        )
-    except Exception as e:
-        return {
-            "ok": False,
-            "cmd": "developer_create_version",
-            "error": "DB_ERROR",
-            "message": f"failed to create gamelog: {e}",
-        }
+    # the row stays unpublished (invisible to players) until
+    # developer_publish_version confirms the upload landed
+    existing = gamelog_repo.get_gamelog_by_version(game_id, version)
+    if existing is not None and not existing["published"]:
+        # an earlier upload of this version failed; try again with the same row
+        gamelog_repo.update_pending_gamelog(existing["id"], changelog)
+        version_id = existing["id"]
+    else:
+        try:
+            version_id = gamelog_repo.create_gamelog(
+                game_id=game_id,
+                game_version=version,
+                changelog=changelog,
+                upload_path=upload_path,
+                is_active=0,
+                published=0,
+            )
+        except Exception as e:
+            return {
+                "ok": False,
+                "cmd": "developer_create_version",
+                "error": "DB_ERROR",
+                "message": f"failed to create gamelog: {e}",
+            }
     
     return{
         "ok": True,
@@ -577,11 +780,88 @@ def handle_developer_create_version(request: dict, sock: socket.socket):
         "version_id": version_id,
         "game_version": version,
         "upload_path": upload_path,
-        "message": "version metadata created"
+        "message": "version metadata created; upload the package, then publish it"
+    }
+
+def handle_developer_publish_version(request: dict, sock: socket.socket) -> dict:
+    username = lobby_state.developer_of(sock)
+    if not username:
+        return {
+            "ok": False,
+            "cmd": "developer_publish_version",
+            "error": "NOT_LOGGED_IN",
+            "message": "developer login required",
+        }
+    try:
+        version_id = int(request.get("version_id"))
+    except (TypeError, ValueError):
+        return {
+            "ok": False,
+            "cmd": "developer_publish_version",
+            "error": "BAD_INPUT",
+            "message": "version_id must be integer",
+        }
+
+    row = gamelog_repo.get_gamelog(version_id)
+    game = games_repo.get_game_by_id(row["game_id"]) if row else None
+    if row is None or game is None:
+        return {
+            "ok": False,
+            "cmd": "developer_publish_version",
+            "error": "NO_SUCH_VERSION",
+            "message": f"version {version_id} not found",
+        }
+    dev_row = accounts_repo.get_developer_by_username(username)
+    if dev_row is None or game["developer_id"] != dev_row["id"]:
+        return {
+            "ok": False,
+            "cmd": "developer_publish_version",
+            "error": "NOT_OWNER",
+            "message": "you are not the developer of this game",
+        }
+
+    # the file server only renames a zip into place once its digest checked out
+    key = row["upload_path"]
+    zip_path = GAME_ROOT / key
+    if not zip_path.is_file() and not chunk_store.has(key):
+        return {
+            "ok": False,
+            "cmd": "developer_publish_version",
+            "error": "NOT_UPLOADED",
+            "message": f"{key} has not been uploaded",
+        }
+    # and only writes the chunk recipe once the zip is extracted; until both
+    # are there for this upload (not an earlier one) start_game has nothing to run
+    if zip_path.is_file() and (chunk_store.stored_at(key) < zip_path.stat().st_mtime
+                               or not zip_path.with_suffix("").is_dir()):
+        return {
+            "ok": False,
+            "cmd": "developer_publish_version",
+            "error": "NOT_READY",
+            "message": f"{key} is still being processed by the file server (or processing failed)",
+        }
+
+    try:
+        gamelog_repo.publish_gamelog(version_id, row["game_id"])
+    except Exception as e:
+        return {
+            "ok": False,
+            "cmd": "developer_publish_version",
+            "error": "DB_ERROR",
+            "message": f"failed to publish version: {e}",
+        }
+    catalog.refresh_game(row["game_id"])
+    return {
+        "ok": True,
+        "cmd": "developer_publish_version",
+        "game_id": row["game_id"],
+        "version_id": version_id,
+        "game_version": row["game_version"],
+        "message": "version published",
     }
 
 def handle_developer_list_games(request: dict, sock:socket.socket) -> dict:
-    username = sock_devnames.get(sock)
+    username = lobby_state.developer_of(sock)
     if not username:
         return {
             "ok": False,
@@ -599,17 +879,16 @@ def handle_developer_list_games(request: dict, sock:socket.socket) -> dict:
         }
     
     dev_id = dev["id"]
-    games = games_repo.list_games_by_developer(dev_id)
+    games = gamelog_repo.list_developer_games_with_latest_version(dev_id)
     result = []
     for g in games:
-        latest = gamelog_repo.get_latest_gamelog_for_game(g["id"])
         result.append({
-            "game_id": g["id"],
+            "game_id": g["game_id"],
             "game_name": g["game_name"],
             "game_description": g["game_description"],
             "max_players": g["max_players"],
-            "latest_version": latest["game_version"] if latest else None,
-            "latest_version_id": latest["id"] if latest else None,
+            "latest_version": g["latest_version"],
+            "latest_version_id": g["latest_version_id"],
         })
     return {
         "ok": True,
@@ -618,7 +897,7 @@ def handle_developer_list_games(request: dict, sock:socket.socket) -> dict:
     }
 
 def handle_developer_create_game(request: dict, sock:socket.socket) -> dict:
-    username = sock_devnames.get(sock)
+    username = lobby_state.developer_of(sock)
     if not username:
         return {
             "ok": False,
@@ -659,6 +938,7 @@ def handle_developer_create_game(request: dict, sock:socket.socket) -> dict:
         }
     
     game_id = games_repo.create_game(dev["id"], game_name, desc, max_players)
+    catalog.refresh_game(game_id)
 
     return {
         "ok": True,
@@ -669,7 +949,7 @@ def handle_developer_create_game(request: dict, sock:socket.socket) -> dict:
     }
 
 def handle_developer_delete_game(request: dict, sock:socket.socket) -> dict:
-    username = sock_devnames.get(sock)
+    username = lobby_state.developer_of(sock)
     if not username:
         return {
             "ok": False,
@@ -707,6 +987,7 @@ def handle_developer_delete_game(request: dict, sock:socket.socket) -> dict:
     
     games_repo.mark_game_deleted(game_id)
     gamelog_repo.deactivate_versions_for_game(game_id)
+    catalog.refresh_game(game_id)
     return {
         "ok": True,
         "cmd": "developer_delete_game",
@@ -715,8 +996,8 @@ def handle_developer_delete_game(request: dict, sock:socket.socket) -> dict:
     }
 
 def handle_get_game_detail(request: dict, sock: socket.socket) -> dict:
-    username = sock_usernames.get(sock)
-    devname = sock_devnames.get(sock)
+    username = lobby_state.player_of(sock)
+    devname = lobby_state.developer_of(sock)
     if not username and not devname:
         return {
             "ok": False,
@@ -736,7 +1017,7 @@ def handle_get_game_detail(request: dict, sock: socket.socket) -> dict:
             "message": "game_id must be integer"
         }
     
-    game = games_repo.get_game_by_id(game_id)
+    game = catalog.get(game_id)
     if game is None or game.get("game_status") != "active":
         return {
             "ok": False, 
@@ -744,19 +1025,18 @@ def handle_get_game_detail(request: dict, sock: socket.socket) -> dict:
             "error": "NO_SUCH_GAME", 
             "message": "game not found"
         }
-    latest = gamelog_repo.get_latest_gamelog_for_game(game_id)
     ratings = ratings_repo.list_ratings_for_game(game_id)
 
     return {
         "ok": True,
         "cmd": "get_game_detail",
         "game": {
-            "game_id": game["id"],
+            "game_id": game["game_id"],
             "game_name": game["game_name"],
             "game_description": game.get("game_description") or "",
             "max_players": game.get("max_players"),
-            "latest_version": latest.get("game_version") if latest else None,
-            "upload_path": latest.get("upload_path") if latest else None,
+            "latest_version": game.get("latest_version"),
+            "upload_path": game.get("upload_path"),
         },
         "ratings": [
             {
@@ -770,7 +1050,7 @@ def handle_get_game_detail(request: dict, sock: socket.socket) -> dict:
     }
 
 def handle_add_rating(request: dict, sock:socket.socket) -> dict:
-    username = sock_usernames.get(sock)
+    username = lobby_state.player_of(sock)
     if not username:
         return {
             "ok": False, 
@@ -839,7 +1119,7 @@ def handle_add_rating(request: dict, sock:socket.socket) -> dict:
     }
 
 def handle_start_game(request: dict, sock: socket.socket) -> dict:
-    username = sock_usernames.get(sock)
+    username = lobby_state.player_of(sock)
     if not username:
         return {
             "ok": False, 
@@ -859,16 +1139,22 @@ def handle_start_game(request: dict, sock: socket.socket) -> dict:
             "message": "room_id must be integer"
         }
     
-    room = room_states.get(room_id)
-    members = room_members.get(room_id) or set()
-
-    if not room or room.get("host") != username:
+    # flips the room to "playing" atomically, so a double click cannot launch two servers
+    error, room, members = lobby_state.begin_start(room_id, username)
+    if error == "NOT_HOST":
         return {
             "ok": False, "cmd": "start_game", 
             "error": "NOT_HOST", 
             "message": "only host can start"
         }
-    if len(members) < 2:
+    if error == "ALREADY_STARTED":
+        return {
+            "ok": False,
+            "cmd": "start_game",
+            "error": "ALREADY_STARTED",
+            "message": "game already started"
+        }
+    if error == "NOT_ENOUGH_PLAYERS":
         return {
             "ok": False, 
             "cmd": "start_game", 
@@ -877,22 +1163,39 @@ def handle_start_game(request: dict, sock: socket.socket) -> dict:
         }
     
     game_host = "140.113.17.11"
-    game_port = pick_free_port()
-    game_id = room_states[room_id].get("game_id")
-    game = games_repo.get_game_by_id(game_id)
-    game_log = gamelog_repo.get_latest_gamelog_for_game(game_id)
-    game_name = game.get("game_name")
-    game_version = game_log.get("game_version")
-    developer_id = game.get("developer_id")
-    print("dev_id", developer_id)
-    dev = accounts_repo.get_developer_by_id(developer_id)
-    print("dev", dev)
-    dev_name = dev["username"]
-    game_server_dir = Path(__file__).parent.parent / "game" / "game_store"/ f"{dev_name}" / f"{game_id}_{game_name}" / f"v{game_version}"
-    print("game_server_dir is ",game_server_dir)
-    cmd = [sys.executable ,"-m","server.server" , "--host", game_host, "--port", str(game_port), "--room-id", str(room_id)]
-    proc = subprocess.Popen(cmd, cwd=game_server_dir)
-    game_processes[room_id] = proc
+    game_id = room.get("game_id")
+    try:
+        game = catalog.get(game_id)
+        game_name = game.get("game_name")
+        game_version = game.get("latest_version")
+        server_dir = game_server_dir(game, room_id)
+        print("game_server_dir is ", server_dir)
+        if GAME_HOSTING == "shared":
+            # the room joins the version's host process; players pick it by room_id
+            argv = ["--host", game_host, "--room-id", str(room_id)]
+            proc, game_port = game_hosts.open_room(server_dir, game_host, room_id, argv)
+        else:
+            # leased until finish_game, or until the server process has exited
+            game_port = game_ports.lease(room_id)
+            argv = ["--host", game_host, "--port", str(game_port), "--room-id", str(room_id)]
+            proc = game_pool.launch(server_dir, argv)
+            game_ports.attach(room_id, proc)
+    except NoFreePort:
+        versions.unpin(room_id)
+        lobby_state.abort_start(room_id)
+        return {
+            "ok": False,
+            "cmd": "start_game",
+            "error": "NO_FREE_PORT",
+            "message": "no game server port available, try again later",
+        }
+    except Exception:
+        versions.unpin(room_id)
+        game_ports.release(room_id)
+        lobby_state.abort_start(room_id)
+        raise
+    lobby_state.set_process(room_id, proc)
+    supervisor.watch(room_id, proc)
 
     remote_game_host = "140.113.17.11"
 
@@ -910,11 +1213,10 @@ def handle_start_game(request: dict, sock: socket.socket) -> dict:
     for name in members:
         pinfo = accounts_repo.get_player_by_username(name)
         pid = pinfo["id"]
-        psock = online_players.get(name)
+        psock = lobby_state.player_sock(name)
         if psock:
             ratings_repo.create_session(pid, game_id)
-            
-            send_json(psock, evt)
+    notify_players(members, evt)
 
     return {
         "ok": True,
@@ -924,8 +1226,36 @@ def handle_start_game(request: dict, sock: socket.socket) -> dict:
         "game_port": game_port
     }
 
+def close_game_records(room_id: int, game_id, members) -> None:
+    for name in members:
+        pinfo = accounts_repo.get_player_by_username(name)
+        if pinfo is None:
+            continue
+        session_id = ratings_repo.search_session(pinfo["id"], game_id)
+        ratings_repo.finish_session(session_id)
+
+    game_ports.release(room_id)
+    versions.unpin(room_id)
+    # delete room in DB
+    try:
+        room_repo.delete_room(room_id)
+    except Exception:
+        pass
+
+def on_game_exit(room_id: int, proc, returncode, reason: str) -> None:
+    """Called by the supervisor after a game process is gone."""
+    print(f"[*] room {room_id}: game server {reason} (returncode {returncode})")
+    if lobby_state.process_of(room_id) is not proc:
+        # finish_game already cleaned this room up
+        game_ports.release(room_id)
+        return
+    # the host never sent finish_game (client crashed, timeout, game crashed)
+    state, members, _ = lobby_state.finish_room(room_id)
+    game_id = state.get("game_id") if state else None
+    close_game_records(room_id, game_id, members if state else [])
+
 def handle_finish_game(request: dict, sock: socket.socket) -> dict:
-    username = sock_usernames.get(sock)
+    username = lobby_state.player_of(sock)
     if not username:
         return {
             "ok": False,
@@ -955,20 +1285,9 @@ def handle_finish_game(request: dict, sock: socket.socket) -> dict:
         }
     game_id = room.get("game_id")
 
-    state = room_states.pop(room_id, None)
+    # drops the room, its user_room entries and the tracked game process in one step
+    state, members, proc = lobby_state.finish_room(room_id)
     print(state)
-    members = room_members.pop(room_id, set())
-
-    # clear user_room mapping
-    for name in members:
-        pinfo = accounts_repo.get_player_by_username(name)
-        pid = pinfo["id"]
-        session_id = ratings_repo.search_session(pid, game_id)
-        ratings_repo.finish_session(session_id)
-
-    for m in list(members):
-        user_room.pop(m, None)
-
 
     # # notify others the game/room is closed
     # evt = {
@@ -977,26 +1296,22 @@ def handle_finish_game(request: dict, sock: socket.socket) -> dict:
     #     "message": "game finished, room closed",
     # }
     # for m in members:
-    #     psock = online_players.get(m)
+    #     psock = lobby_state.player_sock(m)
     #     if psock:
     #         try:
     #             send_json(psock, evt)
     #         except Exception:
     #             pass
 
-    # stop game process if tracked
-    proc = game_processes.pop(room_id, None)
+    # stop game process if tracked; the supervisor reaps it
     if proc:
+        supervisor.finishing(proc)
         try:
             proc.terminate()
         except Exception:
             pass
 
-    # delete room in DB
-    try:
-        room_repo.delete_room(room_id)
-    except Exception:
-        pass
+    close_game_records(room_id, game_id, members)
 
     return {
         "ok": True,
@@ -1005,132 +1320,194 @@ def handle_finish_game(request: dict, sock: socket.socket) -> dict:
         "message": "room closed",
     }
 
+def handle_lobby_stats(request: dict, sock) -> dict:
+    username = lobby_state.player_of(sock)
+    devname = lobby_state.developer_of(sock)
+    if username:
+        row = accounts_repo.get_player_by_username(username)
+    elif devname:
+        row = accounts_repo.get_developer_by_username(devname)
+    else:
+        return {
+            "ok": False,
+            "cmd": "lobby_stats",
+            "error": "NOT_LOGGED_IN",
+            "message": "login required",
+        }
+    if row is None or not row["is_admin"]:
+        return {
+            "ok": False,
+            "cmd": "lobby_stats",
+            "error": "NOT_ADMIN",
+            "message": "admin only",
+        }
+
+    stats = dispatcher.stats(request.get("target_cmd"))
+    stats.update(lobby_state.counts())
+    stats["catalog_version"] = catalog.version
+    stats.update(subscriptions.counts())
+    stats["slow_consumers_dropped"] = outbox.dropped_consumers()
+    stats.update(game_pool.counts())
+    stats.update(game_hosts.counts())
+    stats.update(game_ports.counts())
+    stats.update(supervisor.stats())
+    stats.update(chunk_store.stats())
+    stats["versions_collected"] = versions.collected
+    return {
+        "ok": True,
+        "cmd": "lobby_stats",
+        "stats": stats,
+    }
+
+dispatcher = CommandDispatcher()
+dispatcher.register("hello", handle_hello, needs_session=False)
+dispatcher.register("player_register", handle_player_register, needs_session=False)
+dispatcher.register("player_login", handle_player_login)
+dispatcher.register("create_room", handle_room_create)
+dispatcher.register("join_room", handle_join_room)
+dispatcher.register("list_rooms", handle_list_room)
+dispatcher.register("leave_room", handle_leave_room)
+dispatcher.register("list_games", handle_list_games)
+dispatcher.register("list_games_delta", handle_list_games_delta)
+dispatcher.register("room_info", handle_room_info)
+dispatcher.register("subscribe", handle_subscribe)
+dispatcher.register("unsubscribe", handle_unsubscribe)
+dispatcher.register("developer_register", handle_developer_register, needs_session=False)
+dispatcher.register("developer_login", handle_developer_login)
+dispatcher.register("resume_session", handle_resume_session)
+dispatcher.register("developer_create_version", handle_developer_create_version)
+dispatcher.register("developer_publish_version", handle_developer_publish_version)
+dispatcher.register("developer_list_games", handle_developer_list_games)
+dispatcher.register("developer_create_game", handle_developer_create_game)
+dispatcher.register("developer_delete_game", handle_developer_delete_game)
+dispatcher.register("get_game_detail", handle_get_game_detail)
+dispatcher.register("add_rating", handle_add_rating)
+dispatcher.register("start_game", handle_start_game)
+dispatcher.register("finish_game", handle_finish_game)
+dispatcher.register("lobby_stats", handle_lobby_stats)
+
+def process_request(req: dict, sock) -> dict:
+    resp = dispatcher.dispatch(req, sock)
+    req_id = req.get("req_id")
+    if req_id is not None:
+        resp["req_id"] = req_id
+    return resp
+
+def cleanup_session(sock) -> None:
+    subscriptions.drop(sock)
+    username, _ = lobby_state.unbind_session(sock)
+    if username is None:
+        return
+    # another connection took over this account; its room seat belongs to that one now
+    if lobby_state.player_sock(username) is not None:
+        return
+    leave_current_room(username)
+
 def client_thread(sock, addr):
     print(f"[+] New connection from {addr}")
-    file = sock.makefile("r", encoding="utf-8")
+    file = sock.makefile("rb")
+    # every write to this client goes through the session's queue
+    session = SocketSession(sock, addr)
+    framing = "json"
     try:
         while True:
-            req = recv_json(file)
-            print(req)
+            req = recv_message(file, framing)
             if req is None:
                 break
-            
-            
-            cmd = req.get("cmd", "")
-            req_id = req.get("req_id")
-            if cmd == "player_register":
-                resp = handle_player_register(req)
-            elif cmd == "player_login":
-                resp = handle_player_login(req, sock)
-            elif cmd == "create_room":
-                resp = handle_room_create(req, sock)
-            elif cmd == "join_room":
-                resp = handle_join_room(req, sock)
-            elif cmd == "list_rooms":
-                resp = handle_list_room(req, sock)
-            elif cmd == "leave_room":
-                resp = handle_leave_room(req, sock)
-            elif cmd == "list_games":
-                resp = handle_list_games(req, sock)
-            elif cmd == "room_info":
-                resp = handle_room_info(req, sock)
-            elif cmd == "developer_register":
-                resp = handle_developer_register(req)
-            elif cmd == "developer_login":
-                resp = handle_developer_login(req, sock)
-            elif cmd == "developer_create_version":
-                resp = handle_developer_create_version(req, sock)
-            elif cmd == "developer_list_games":
-                resp = handle_developer_list_games(req, sock)
-            elif cmd == "developer_create_game":
-                resp = handle_developer_create_game(req, sock)
-            elif cmd == "developer_delete_game":
-                resp = handle_developer_delete_game(req, sock)
-            elif cmd == "get_game_detail":
-                resp = handle_get_game_detail(req, sock)
-            elif cmd == "add_rating":
-                resp = handle_add_rating(req, sock)
-            elif cmd == "start_game":
-                resp = handle_start_game(req, sock)
-            elif cmd == "finish_game":
-                resp = handle_finish_game(req, sock)
-
-            else:
-                resp = {
-                    "ok": False,
-                    "cmd": cmd,
-                    "error": "UNKNOWN_CMD",
-                    "message": f"unknown cmd: {cmd}",
-                }
-            if req_id is not None:
-                resp["req_id"] = req_id
-            send_json(sock, resp)
+            resp = process_request(req, session)
+            send_json(session, resp)
+            # the hello reply still goes out in the old framing, everything after in the new one
+            new_framing = hello_framing(resp)
+            if new_framing:
+                framing = new_framing
+                set_framing(session, framing)
     except Exception as e:
         print(f"[!] Error with {addr}: {e}")
     finally:
-        username = sock_usernames.pop(sock, None)
-        if username is not None:
-            if online_players.get(username) is sock:
-                del online_players[username]
-            
-        room_id = user_room.pop(username, None)
-        if room_id is None:
-            return  
-
-        state = room_states.get(room_id)
-        members = room_members.get(room_id, set())
-        host = state.get("host")
-
-
-        if state and host == username:
-            evt = {
-                "cmd": "room_closed",
-                "room_id": room_id,
-                "message": f"host {host} left, room closed",
-            }
-
-            for name in list(members):
-                sock2 = online_players.get(name)
-                if sock2 is not None:
-                    send_json(sock2, evt)
-
-            for m in list(members):
-                user_room.pop(m, None)
-            room_states.pop(room_id, None)
-            room_members.pop(room_id, None)
-
-        sock.close()
-        print(f"[-] Connection closed {addr}")
+        try:
+            cleanup_session(session)
+        finally:
+            file.close()
+            session.close()
+            print(f"[-] Connection closed {addr}")
 
 def handle_shutdown(signum, frame):
     global running
     print("\nShutdown signal received!\n")
     running = False
+    subscriptions.stop()
+    game_pool.shutdown()
+    game_hosts.shutdown()
+    versions.shutdown()
+    supervisor.stop()
     # close all connection
     evt = {"cmd": "server_shutdown", "message": "Server shutting down"}
-    all_socks = list(sock_usernames.keys()) + list(sock_devnames.keys())
+    all_socks = lobby_state.all_sessions()
+    broadcast(all_socks, evt)
     for sock in all_socks:
-        try:
-            send_json(sock, evt)
-        except Exception:
-            pass
         try:
             print(f"sock: {sock} has closed")
             sock.close()
         except Exception:
             pass
     # close all game
-    for proc in game_processes.values():
+    for proc in lobby_state.all_processes():
         try:
             proc.terminate()
         except Exception:
             pass
+def main_async():
+    import asyncio
+    from server.lobby.aio_server import AsyncLobbyServer, raise_fd_limit
+
+    raise_fd_limit()
+    init_db()
+    print("[*] DB initialized")
+    catalog.load()
+    print(f"[*] Catalog loaded (version {catalog.version})")
+    subscriptions.start()
+    game_pool.start()
+    game_hosts.start()
+    supervisor.start()
+    versions.start()
+
+    lobby = AsyncLobbyServer(
+        HOST, PORT, process_request, cleanup_session,
+        workers=ASYNC_WORKERS, backlog=LISTEN_BACKLOG,
+    )
+
+    async def runner():
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGINT, lobby.request_stop)
+        except NotImplementedError:
+            signal.signal(signal.SIGINT, lambda signum, frame: loop.call_soon_threadsafe(lobby.request_stop))
+        await lobby.serve(on_shutdown=lambda: handle_shutdown(signal.SIGINT, None))
+
+    try:
+        asyncio.run(runner())
+    except KeyboardInterrupt:
+        print("\nCtrl+C pressed, shutting down...")
+    finally:
+        print("Server closed.")
+
 def main():
+    load_server_options()
+    if SERVER_MODE == "asyncio":
+        main_async()
+        return
 
     signal.signal(signal.SIGINT, handle_shutdown)
 
     init_db()
     print("[*] DB initialized")
+    catalog.load()
+    print(f"[*] Catalog loaded (version {catalog.version})")
+    subscriptions.start()
+    game_pool.start()
+    game_hosts.start()
+    supervisor.start()
+    versions.start()
 
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -0,0 +1,150 @@
+import collections
+import socket
+import struct
+import threading
+
+from server.common.protocol import send_buffers
+
+# bytes a connection may have queued but not yet sent before it counts as a
+# slow consumer and is disconnected, and how long one send may block (s)
+SEND_BACKLOG = 1024 * 1024
+SEND_TIMEOUT = 10.0
+# queued messages are sent together, up to this many bytes per write
+MAX_BATCH = 256 * 1024
+
+# not on Windows; there every write goes through the queue
+_DONTWAIT = getattr(socket, "MSG_DONTWAIT", 0)
+
+_dropped = 0
+_dropped_lock = threading.Lock()
+
+
+def count_dropped() -> None:
+    global _dropped
+    with _dropped_lock:
+        _dropped += 1
+
+
+def dropped_consumers() -> int:
+    return _dropped
+
+
+class SocketSession:
+    """
+    Stand-in for a client socket in threaded mode, like StreamSession in
+    asyncio mode: handlers call sendall()/close() on it and use it as a dict key.
+
+    sendall() never blocks: when nothing is queued it tries a non-blocking
+    send, and whatever the kernel does not take right away is queued for a
+    writer thread per connection, which batches what piled up into one write
+    (send_buffers). So a handler broadcasting to a room never waits on a slow
+    member, the writer threads only wake for clients that are behind, and a
+    connection's replies and the events pushed to it never interleave. A
+    connection with more than max_backlog bytes queued, or whose send blocks
+    for SEND_TIMEOUT, is disconnected.
+    """
+
+    def __init__(self, sock: socket.socket, addr, max_backlog: int = 0) -> None:
+        self.sock = sock
+        self.addr = addr
+        self.max_backlog = max_backlog or SEND_BACKLOG
+        self._queue = collections.deque()
+        self._queued = 0
+        self._cond = threading.Condition()
+        self._closing = False
+        # the writer has a batch in flight; until it is out, new data queues behind it
+        self._sending = False
+        try:
+            # only sends time out; the reader thread keeps blocking on recv
+            timeval = struct.pack("ll", int(SEND_TIMEOUT), int(SEND_TIMEOUT % 1 * 1e6))
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, timeval)
+        except (OSError, AttributeError, struct.error):
+            pass
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+    def sendall(self, data: bytes) -> None:
+        with self._cond:
+            if self._closing:
+                raise OSError("session closed")
+            if _DONTWAIT and not self._queue and not self._sending:
+                try:
+                    sent = self.sock.send(data, _DONTWAIT)
+                except (BlockingIOError, InterruptedError):
+                    sent = 0
+                except OSError:
+                    self._closing = True
+                    self._cond.notify()
+                    raise
+                if sent == len(data):
+                    return
+                data = memoryview(data)[sent:]
+            if self._queued + len(data) <= self.max_backlog:
+                self._queue.append(data)
+                self._queued += len(data)
+                self._cond.notify()
+                return
+        print(f"[!] {self.addr} is not reading ({self._queued} bytes queued), disconnecting")
+        self._abort()
+        raise OSError("slow consumer disconnected")
+
+    def close(self) -> None:
+        # whatever is queued (a force_logout, the shutdown notice) still goes out first
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+
+    def backlog(self) -> int:
+        return self._queued
+
+    def _abort(self) -> None:
+        with self._cond:
+            if self._closing and not self._queue:
+                return
+            self._closing = True
+            self._queue.clear()
+            self._queued = 0
+            self._cond.notify()
+        count_dropped()
+        # wakes the reader (EOF) and a writer stuck in sendall
+        self._shutdown()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._sending = False
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                self._sending = True
+                batch = []
+                size = 0
+                while self._queue and size < MAX_BATCH:
+                    data = self._queue.popleft()
+                    batch.append(data)
+                    size += len(data)
+                self._queued -= size
+            try:
+                send_buffers(self.sock, batch)
+            except (BlockingIOError, socket.timeout):
+                print(f"[!] send to {self.addr} timed out, disconnecting")
+                self._abort()
+                break
+            except OSError:
+                self._shutdown()
+                break
+        self._shutdown()
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def _shutdown(self) -> None:
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def __repr__(self) -> str:
+        return f"<SocketSession {self.addr}>"
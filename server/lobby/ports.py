@@ -0,0 +1,96 @@
+import collections
+import socket
+import threading
+from typing import Any, Dict, Hashable, Optional
+
+
+class NoFreePort(Exception):
+    pass
+
+
+class PortAllocator:
+    """
+    Hands out game server ports from a fixed range (one the firewall can be
+    opened for) and remembers which room holds which port until it is
+    released, so two rooms starting at the same moment never get the same one.
+
+    Ports are reused round-robin, oldest-freed first, which keeps a just-freed
+    port (possibly still in TIME_WAIT) out of the way for as long as possible.
+    A port something else on the machine is bound to is skipped.
+    """
+
+    def __init__(self, first: int, last: int, probe_host: str = "") -> None:
+        if not 0 < first <= last < 65536:
+            raise ValueError(f"bad port range {first}-{last}")
+        self.first = first
+        self.last = last
+        self.probe_host = probe_host
+        self._lock = threading.Lock()
+        self._free = collections.deque(range(first, last + 1))
+        self._leases: Dict[Hashable, int] = {}
+        self._procs: Dict[Hashable, Any] = {}
+
+    def lease(self, owner: Hashable) -> int:
+        """Reserve a port for owner (a room id). Raises NoFreePort when the range is used up."""
+        with self._lock:
+            if owner in self._leases:
+                return self._leases[owner]
+            port = self._take_free()
+            if port is None:
+                self._reclaim_exited()
+                port = self._take_free()
+            if port is None:
+                raise NoFreePort(f"all ports in {self.first}-{self.last} are leased")
+            self._leases[owner] = port
+            return port
+
+    def attach(self, owner: Hashable, proc) -> None:
+        """Remember the process using owner's port; its lease is reclaimed once it has exited."""
+        with self._lock:
+            if owner in self._leases:
+                self._procs[owner] = proc
+
+    def release(self, owner: Hashable) -> Optional[int]:
+        with self._lock:
+            return self._release(owner)
+
+    def port_of(self, owner: Hashable) -> Optional[int]:
+        return self._leases.get(owner)
+
+    def counts(self) -> dict:
+        with self._lock:
+            return {
+                "ports_leased": len(self._leases),
+                "ports_free": len(self._free),
+            }
+
+    def _release(self, owner: Hashable) -> Optional[int]:
+        port = self._leases.pop(owner, None)
+        self._procs.pop(owner, None)
+        if port is not None:
+            self._free.append(port)
+        return port
+
+    def _take_free(self) -> Optional[int]:
+        for _ in range(len(self._free)):
+            port = self._free.popleft()
+            if self._bindable(port):
+                return port
+            # in use outside the lobby; try it again later
+            self._free.append(port)
+        return None
+
+    def _reclaim_exited(self) -> None:
+        for owner, proc in list(self._procs.items()):
+            if proc.poll() is not None:
+                self._release(owner)
+
+    def _bindable(self, port: int) -> bool:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            # same option the game servers set, so a port in TIME_WAIT still counts as free
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                s.bind((self.probe_host, port))
+            except OSError:
+                return False
+        return True
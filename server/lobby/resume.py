@@ -0,0 +1,72 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+ROLES = ("player", "developer")
+
+
+class ResumeTokens:
+    """
+    Tokens handed out at login that let a client log the same account back in
+    on a new connection (resume_session) without its password, e.g. after a
+    lobby restart. A token is "<role>|<expires>|<username>" plus an HMAC-SHA256
+    of it, so nothing is stored per session. The key is kept in secret_path
+    (created on first use, owner-only), which is what keeps tokens valid across
+    restarts; deleting the file invalidates every token.
+    """
+
+    def __init__(self, secret_path, ttl: float = 86400.0) -> None:
+        self.secret_path = Path(secret_path)
+        self.ttl = ttl
+        self._key: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    def _secret(self) -> bytes:
+        with self._lock:
+            if self._key is None:
+                self._key = self._load_or_create()
+            return self._key
+
+    def _load_or_create(self) -> bytes:
+        try:
+            key = self.secret_path.read_bytes()
+            if len(key) >= 32:
+                return key
+        except FileNotFoundError:
+            pass
+        key = os.urandom(32)
+        tmp = self.secret_path.with_name(f"{self.secret_path.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        os.replace(tmp, self.secret_path)
+        return key
+
+    def _mac(self, payload: bytes) -> str:
+        return hmac.new(self._secret(), payload, hashlib.sha256).hexdigest()
+
+    def issue(self, role: str, username: str) -> str:
+        payload = f"{role}|{int(time.time() + self.ttl)}|{username}".encode("utf-8")
+        return base64.urlsafe_b64encode(payload).decode("ascii") + "." + self._mac(payload)
+
+    def verify(self, token) -> Optional[Tuple[str, str]]:
+        """(role, username) for a valid, unexpired token; None otherwise."""
+        if not isinstance(token, str) or "." not in token:
+            return None
+        encoded, mac = token.rsplit(".", 1)
+        try:
+            payload = base64.urlsafe_b64decode(encoded.encode("ascii"))
+            role, expires, username = payload.decode("utf-8").split("|", 2)
+            expires = int(expires)
+        except (ValueError, UnicodeError):
+            return None
+        if not hmac.compare_digest(mac, self._mac(payload)):
+            return None
+        if role not in ROLES or expires < time.time():
+            return None
+        return role, username
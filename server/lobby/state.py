@@ -0,0 +1,275 @@
+import threading
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def _stripe_of(key: Any, n: int) -> int:
+    if isinstance(key, int):
+        return key % n
+    return zlib.crc32(str(key).encode("utf-8")) % n
+
+
+class LobbyState:
+    """
+    In-memory lobby state: who is online on which connection, which rooms exist
+    and who sits in them, and the game process of each running room.
+
+    Every room transition (create/join/leave/start/finish) runs under the lock
+    stripe of that room, and session bind/unbind runs under the stripe of the
+    username, so unrelated rooms and users never contend on one global lock.
+    Methods return snapshots (lists/dict copies), never the live containers.
+
+    on_room_change, if set, is called with the room_id after any change to a
+    room's listing, outside of the stripe lock.
+    """
+
+    def __init__(self, stripes: int = 64) -> None:
+        self._stripes = stripes
+        self._room_locks = [threading.Lock() for _ in range(stripes)]
+        self._user_locks = [threading.Lock() for _ in range(stripes)]
+
+        self._online_players: Dict[str, Any] = {}
+        self._sock_usernames: Dict[Any, str] = {}
+        self._online_developers: Dict[str, Any] = {}
+        self._sock_devnames: Dict[Any, str] = {}
+
+        self._room_members: Dict[int, set] = {}
+        self._room_states: Dict[int, dict] = {}
+        self._user_room: Dict[str, int] = {}
+        self._game_processes: Dict[int, Any] = {}
+
+        self.on_room_change: Optional[Callable[[int], None]] = None
+
+    def _room_lock(self, room_id: int) -> threading.Lock:
+        return self._room_locks[_stripe_of(room_id, self._stripes)]
+
+    def _user_lock(self, username: str) -> threading.Lock:
+        return self._user_locks[_stripe_of(username, self._stripes)]
+
+    def _room_changed(self, room_id: int) -> None:
+        if self.on_room_change is not None:
+            self.on_room_change(room_id)
+
+    # sessions
+    def bind_player(self, username: str, sock) -> Optional[Any]:
+        """Bind username to sock; returns the previous connection if it was a different one."""
+        with self._user_lock(username):
+            old = self._online_players.get(username)
+            self._online_players[username] = sock
+            self._sock_usernames[sock] = username
+        if old is not None and old is not sock:
+            return old
+        return None
+
+    def bind_developer(self, username: str, sock) -> Optional[Any]:
+        with self._user_lock(username):
+            old = self._online_developers.get(username)
+            self._online_developers[username] = sock
+            self._sock_devnames[sock] = username
+        if old is not None and old is not sock:
+            return old
+        return None
+
+    def unbind_session(self, sock) -> Tuple[Optional[str], Optional[str]]:
+        """Forget a connection; returns (player username, developer username) it was bound to."""
+        username = self._sock_usernames.pop(sock, None)
+        if username is not None:
+            with self._user_lock(username):
+                if self._online_players.get(username) is sock:
+                    del self._online_players[username]
+
+        devname = self._sock_devnames.pop(sock, None)
+        if devname is not None:
+            with self._user_lock(devname):
+                if self._online_developers.get(devname) is sock:
+                    del self._online_developers[devname]
+        return username, devname
+
+    def player_of(self, sock) -> Optional[str]:
+        return self._sock_usernames.get(sock)
+
+    def developer_of(self, sock) -> Optional[str]:
+        return self._sock_devnames.get(sock)
+
+    def player_sock(self, username: str):
+        return self._online_players.get(username)
+
+    def all_sessions(self) -> List[Any]:
+        return list(self._sock_usernames.keys()) + list(self._sock_devnames.keys())
+
+    # rooms
+    def create_room(self, room_id: int, host: str, info: dict) -> Optional[int]:
+        """
+        Register a new room with host as its only member.
+        Returns the room the host was still sitting in, if any, so the caller can leave it first.
+        """
+        with self._room_lock(room_id):
+            state = dict(info)
+            state.update({"room_id": room_id, "host": host, "status": "open"})
+            self._room_states[room_id] = state
+            self._room_members[room_id] = {host}
+            previous = self._user_room.get(host)
+            self._user_room[host] = room_id
+        self._room_changed(room_id)
+        return previous if previous != room_id else None
+
+    def join_room(self, room_id: int, username: str) -> Tuple[Optional[str], List[str]]:
+        """
+        Atomically check status/capacity and add username.
+        Returns (error code or None, players after the join).
+        """
+        with self._room_lock(room_id):
+            state = self._room_states.get(room_id)
+            members = self._room_members.get(room_id)
+            if state is None or members is None:
+                return "NO_SUCH_ROOM", []
+            if username in members:
+                return None, list(members)
+            if state.get("status") != "open":
+                return "ROOM_NOT_OPEN", list(members)
+            max_players = state.get("max_players")
+            if max_players is not None and len(members) >= max_players:
+                return "ROOM_FULL", list(members)
+            members.add(username)
+            self._user_room[username] = room_id
+            players = list(members)
+        self._room_changed(room_id)
+        return None, players
+
+    def room_players(self, room_id: int) -> Optional[List[str]]:
+        with self._room_lock(room_id):
+            members = self._room_members.get(room_id)
+            return list(members) if members is not None else None
+
+    def room_state(self, room_id: int) -> Optional[dict]:
+        with self._room_lock(room_id):
+            state = self._room_states.get(room_id)
+            return dict(state) if state is not None else None
+
+    def room_of(self, username: str) -> Optional[int]:
+        return self._user_room.get(username)
+
+    def _open_room_entry(self, room_id: int) -> Optional[dict]:
+        # caller holds the room's stripe lock
+        state = self._room_states.get(room_id)
+        if state is None or state.get("status") != "open":
+            return None
+        members = self._room_members.get(room_id, ())
+        return {
+            "room_id": room_id,
+            "host": state.get("host"),
+            "game_name": state.get("game_name"),
+            "game_id": state.get("game_id"),
+            "current_players": len(members),
+            "max_players": state.get("max_players"),
+            "status": state.get("status"),
+        }
+
+    def open_room_entry(self, room_id: int) -> Optional[dict]:
+        """The list_rooms entry of room_id, or None if it is not an open room."""
+        with self._room_lock(room_id):
+            return self._open_room_entry(room_id)
+
+    def list_open_rooms(self) -> List[dict]:
+        rooms = []
+        for room_id in list(self._room_states.keys()):
+            with self._room_lock(room_id):
+                entry = self._open_room_entry(room_id)
+            if entry is not None:
+                rooms.append(entry)
+        rooms.sort(key=lambda r: r["room_id"])
+        return rooms
+
+    def leave_room(self, username: str, room_id: Optional[int] = None) -> Optional[dict]:
+        """
+        Remove username from its room. If it was the host, the room is closed and dropped.
+        Returns None when the user was not in a room, otherwise
+        {"room_id", "host", "closed", "players"} where players are the ones still to notify.
+        """
+        if room_id is None:
+            room_id = self._user_room.get(username)
+            if room_id is None:
+                return None
+        left = self._leave_room(username, room_id)
+        self._room_changed(room_id)
+        return left
+
+    def _leave_room(self, username: str, room_id: int) -> dict:
+        with self._room_lock(room_id):
+            if self._user_room.get(username) == room_id:
+                del self._user_room[username]
+            state = self._room_states.get(room_id)
+            members = self._room_members.get(room_id)
+            if state is None or members is None:
+                return {"room_id": room_id, "host": None, "closed": True, "players": []}
+            members.discard(username)
+            host = state.get("host")
+            if username != host:
+                return {"room_id": room_id, "host": host, "closed": False, "players": list(members)}
+
+            state["status"] = "closed"
+            for name in members:
+                if self._user_room.get(name) == room_id:
+                    del self._user_room[name]
+            self._room_states.pop(room_id, None)
+            self._room_members.pop(room_id, None)
+            return {"room_id": room_id, "host": host, "closed": True, "players": list(members)}
+
+    def begin_start(self, room_id: int, username: str, min_players: int = 2) -> Tuple[Optional[str], Optional[dict], List[str]]:
+        """
+        Move an open room to "playing" if username is its host and enough players joined.
+        Returns (error code or None, room snapshot, players).
+        """
+        with self._room_lock(room_id):
+            state = self._room_states.get(room_id)
+            members = self._room_members.get(room_id) or set()
+            if state is None or state.get("host") != username:
+                return "NOT_HOST", None, []
+            if state.get("status") != "open":
+                return "ALREADY_STARTED", dict(state), list(members)
+            if len(members) < min_players:
+                return "NOT_ENOUGH_PLAYERS", dict(state), list(members)
+            state["status"] = "playing"
+            started, players = dict(state), list(members)
+        self._room_changed(room_id)
+        return None, started, players
+
+    def abort_start(self, room_id: int) -> None:
+        with self._room_lock(room_id):
+            state = self._room_states.get(room_id)
+            if state is None or state.get("status") != "playing":
+                return
+            state["status"] = "open"
+        self._room_changed(room_id)
+
+    def finish_room(self, room_id: int) -> Tuple[Optional[dict], List[str], Optional[Any]]:
+        """Drop a room and everything attached to it. Returns (state, players, game process)."""
+        with self._room_lock(room_id):
+            state = self._room_states.pop(room_id, None)
+            members = self._room_members.pop(room_id, set())
+            for name in members:
+                if self._user_room.get(name) == room_id:
+                    del self._user_room[name]
+            proc = self._game_processes.pop(room_id, None)
+        if state is not None:
+            self._room_changed(room_id)
+        return state, list(members), proc
+
+    # game processes
+    def set_process(self, room_id: int, proc) -> None:
+        with self._room_lock(room_id):
+            self._game_processes[room_id] = proc
+
+    def process_of(self, room_id: int):
+        return self._game_processes.get(room_id)
+
+    def all_processes(self) -> List[Any]:
+        return list(self._game_processes.values())
+
+    def counts(self) -> dict:
+        return {
+            "online_players": len(self._online_players),
+            "online_developers": len(self._online_developers),
+            "rooms": len(self._room_states),
+            "game_processes": len(self._game_processes),
+        }
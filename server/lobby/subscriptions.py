@@ -0,0 +1,157 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from server.common.protocol import broadcast
+
+TOPICS = ("rooms", "catalog")
+
+# how long the publisher waits after the first change, so a burst of
+# join/leave/create in different rooms goes out as one round of events
+PUBLISH_INTERVAL = 0.1
+
+
+class SubscriptionHub:
+    """
+    Pushes room-list and catalog changes to the connections subscribed to them.
+
+    Writers only mark what changed (mark_room / mark_catalog). A background
+    thread collects the marks every PUBLISH_INTERVAL, diffs each dirty room
+    against what subscribers last saw, and sends the round's events encoded
+    once, as one write per subscriber. A room that changed five times in one
+    interval costs one event; a room created and closed in one interval costs none.
+
+    Events (all carry "cmd" like the other lobby events):
+      room_added / room_changed  {"room": <list_rooms entry>}
+      room_removed               {"room_id": ...}
+      catalog_delta              {"since": v, <list_games_delta fields>}
+    """
+
+    def __init__(self, room_entry: Callable[[int], Optional[dict]], catalog,
+                 interval: float = PUBLISH_INTERVAL) -> None:
+        self._room_entry = room_entry
+        self._catalog = catalog
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._subs: Dict[str, set] = {t: set() for t in TOPICS}
+        self._dirty_rooms: set = set()
+        self._catalog_dirty = False
+        # what subscribers have been told so far
+        self._published_rooms: Dict[int, dict] = {}
+        self._published_catalog = 0
+
+        self.rounds = 0
+        self.events_sent = 0
+
+    def start(self) -> None:
+        self._published_catalog = self._catalog.version
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake.set()
+
+    # writers
+    def mark_room(self, room_id: int) -> None:
+        with self._lock:
+            self._dirty_rooms.add(room_id)
+        self._wake.set()
+
+    def mark_catalog(self) -> None:
+        with self._lock:
+            self._catalog_dirty = True
+        self._wake.set()
+
+    # subscribers
+    def subscribe(self, sock, topics: Iterable[str]) -> dict:
+        """
+        Add sock to topics. Returns the state the following events apply to:
+        "rooms" (the open rooms) and/or "catalog_version".
+        """
+        snapshot: Dict[str, Any] = {}
+        with self._lock:
+            for topic in topics:
+                self._subs[topic].add(sock)
+                if topic == "rooms":
+                    snapshot["rooms"] = [self._published_rooms[k] for k in sorted(self._published_rooms)]
+                elif topic == "catalog":
+                    snapshot["catalog_version"] = self._published_catalog
+        return snapshot
+
+    def unsubscribe(self, sock, topics: Iterable[str]) -> None:
+        with self._lock:
+            for topic in topics:
+                self._subs[topic].discard(sock)
+
+    def drop(self, sock) -> None:
+        self.unsubscribe(sock, TOPICS)
+
+    def counts(self) -> dict:
+        with self._lock:
+            counts = {f"{t}_subscribers": len(s) for t, s in self._subs.items()}
+        counts["publish_rounds"] = self.rounds
+        counts["events_sent"] = self.events_sent
+        return counts
+
+    # publisher
+    def _run(self) -> None:
+        while self._running:
+            self._wake.wait()
+            if not self._running:
+                break
+            time.sleep(self.interval)
+            self._wake.clear()
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"[!] subscription publish failed: {e}")
+
+    def publish(self) -> None:
+        with self._lock:
+            dirty, self._dirty_rooms = self._dirty_rooms, set()
+            catalog_dirty, self._catalog_dirty = self._catalog_dirty, False
+
+            room_events: List[dict] = []
+            for room_id in sorted(dirty):
+                entry = self._room_entry(room_id)
+                old = self._published_rooms.get(room_id)
+                if entry == old:
+                    continue
+                if entry is None:
+                    del self._published_rooms[room_id]
+                    room_events.append({"cmd": "room_removed", "room_id": room_id})
+                else:
+                    self._published_rooms[room_id] = entry
+                    kind = "room_added" if old is None else "room_changed"
+                    room_events.append({"cmd": kind, "room": entry})
+
+            catalog_events: List[dict] = []
+            if catalog_dirty:
+                delta = self._catalog.delta(self._published_catalog)
+                if delta["full"] or delta["added"] or delta["changed"] or delta["removed"]:
+                    evt = {"cmd": "catalog_delta", "since": self._published_catalog}
+                    evt.update(delta)
+                    catalog_events.append(evt)
+                self._published_catalog = delta["catalog_version"]
+
+            # taken under the same lock as the diff, so a connection that
+            # subscribes now gets the new state in its snapshot, not as an event
+            room_subs = list(self._subs["rooms"]) if room_events else []
+            catalog_subs = list(self._subs["catalog"]) if catalog_events else []
+
+        self.rounds += 1
+        self._fan_out(room_events, room_subs)
+        self._fan_out(catalog_events, catalog_subs)
+
+    def _fan_out(self, events: List[dict], socks: list) -> None:
+        if not events or not socks:
+            return
+        broadcast(socks, *events)
+        self.events_sent += len(events) * len(socks)
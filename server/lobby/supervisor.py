@@ -0,0 +1,165 @@
+import collections
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+# how long a terminated game server gets before it is killed
+KILL_GRACE = 5.0
+
+
+def limit_process(pid: int, as_mb: int, cpu_s: int) -> bool:
+    """
+    Cap address space (MiB) and CPU time (s) of a running child; 0 disables a
+    limit. Done with prlimit from the lobby rather than a preexec_fn, which is
+    not safe to run in a process with threads. Returns False where unsupported.
+    """
+    if resource is None or not hasattr(resource, "prlimit"):
+        return False
+    try:
+        if as_mb > 0:
+            nbytes = as_mb * 1024 * 1024
+            resource.prlimit(pid, resource.RLIMIT_AS, (nbytes, nbytes))
+        if cpu_s > 0:
+            # SIGXCPU at the soft limit, SIGKILL a little later
+            resource.prlimit(pid, resource.RLIMIT_CPU, (cpu_s, cpu_s + 5))
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+class _Match:
+    __slots__ = ("room_id", "proc", "started", "deadline", "terminated_at", "reason")
+
+    def __init__(self, room_id: int, proc, started: float, deadline: Optional[float]) -> None:
+        self.room_id = room_id
+        self.proc = proc
+        self.started = started
+        self.deadline = deadline
+        self.terminated_at: Optional[float] = None
+        self.reason = "exited"
+
+
+class GameSupervisor:
+    """
+    Watches every running game server. Once a second it polls each one (which
+    also reaps the child, so no zombies), terminates matches that ran past
+    match_timeout (and kills them KILL_GRACE seconds later), and reports each
+    exit to on_exit(room_id, proc, returncode, reason), where the lobby cleans
+    up whatever finish_game did not.
+
+    Keeps counters per exit reason and the last `history` exits for lobby_stats.
+    """
+
+    def __init__(self, on_exit: Callable[[int, Any, Any, str], None], match_timeout: float = 3600.0,
+                 as_mb: int = 0, cpu_s: int = 0, interval: float = 1.0, history: int = 100) -> None:
+        self.on_exit = on_exit
+        self.match_timeout = match_timeout
+        self.as_mb = as_mb
+        self.cpu_s = cpu_s
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._matches: Dict[int, _Match] = {}
+        self._running = False
+
+        self.exits: Dict[str, int] = collections.Counter()
+        self.total_duration = 0.0
+        self.recent = collections.deque(maxlen=history)
+
+    def start(self) -> None:
+        self._running = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self) -> None:
+        self._running = False
+
+    def watch(self, room_id: int, proc) -> None:
+        # rlimits are per process; rooms inside a shared game host only get the timeout
+        if isinstance(proc, subprocess.Popen):
+            limit_process(proc.pid, self.as_mb, self.cpu_s)
+        now = time.monotonic()
+        deadline = now + self.match_timeout if self.match_timeout > 0 else None
+        with self._lock:
+            self._matches[id(proc)] = _Match(room_id, proc, now, deadline)
+
+    def finishing(self, proc) -> None:
+        """finish_game is terminating proc; its exit is a normal one, and it gets the kill grace."""
+        with self._lock:
+            match = self._matches.get(id(proc))
+            if match is not None and match.terminated_at is None:
+                match.reason = "finished"
+                match.terminated_at = time.monotonic()
+
+    def running(self) -> int:
+        with self._lock:
+            return len(self._matches)
+
+    def _run(self) -> None:
+        while self._running:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"[!] supervisor check failed: {e}")
+
+    def check(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            matches = list(self._matches.items())
+
+        for key, match in matches:
+            returncode = match.proc.poll()
+            if returncode is not None:
+                with self._lock:
+                    self._matches.pop(key, None)
+                self._record(match, returncode, now)
+                continue
+
+            if match.terminated_at is None:
+                if match.deadline is not None and now > match.deadline:
+                    print(f"[!] room {match.room_id}: game ran past {self.match_timeout:.0f}s, terminating")
+                    match.reason = "timeout"
+                    match.terminated_at = now
+                    self._signal(match.proc.terminate)
+            elif now - match.terminated_at > KILL_GRACE:
+                self._signal(match.proc.kill)
+
+    def _signal(self, fn) -> None:
+        try:
+            fn()
+        except Exception:
+            pass
+
+    def _record(self, match: _Match, returncode, now: float) -> None:
+        reason = match.reason
+        if reason == "exited" and returncode != 0:
+            reason = "crashed"
+        duration = now - match.started
+        with self._lock:
+            self.exits[reason] += 1
+            self.total_duration += duration
+            self.recent.append({
+                "room_id": match.room_id,
+                "returncode": returncode,
+                "reason": reason,
+                "duration_s": round(duration, 1),
+            })
+        try:
+            self.on_exit(match.room_id, match.proc, returncode, reason)
+        except Exception as e:
+            print(f"[!] cleanup of room {match.room_id} failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            finished = sum(self.exits.values())
+            return {
+                "matches_running": len(self._matches),
+                "match_exits": dict(self.exits),
+                "match_avg_duration_s": round(self.total_duration / finished, 1) if finished else 0.0,
+                "recent_match_exits": list(self.recent),
+            }
@@ -0,0 +1,92 @@
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from server.db import gamelog_repo
+
+
+class VersionCollector:
+    """
+    Drops the plain zip and extracted folder of game versions that a newer
+    published version has superseded. The chunk store keeps every version,
+    so a dropped one is rebuilt if anybody asks for it again.
+
+    A version is left alone while it is in use: a room pinned its folder
+    (from start_game until the room is closed), or busy_dirs() reports it
+    (idle pool workers and shared hosts run from the folder).
+    """
+
+    def __init__(self, game_root, store, interval: float = 60.0,
+                 busy_dirs: Optional[Callable[[], set]] = None) -> None:
+        self.game_root = Path(game_root)
+        self.store = store
+        self.interval = interval
+        self.busy_dirs = busy_dirs or set
+
+        self._lock = threading.Lock()
+        # version dir -> rooms starting or running from it
+        self._pins: Dict[str, set] = {}
+        self._running = False
+
+        self.collected = 0
+
+    def start(self) -> None:
+        self._running = True
+        threading.Thread(target=self._collect_loop, daemon=True).start()
+
+    def shutdown(self) -> None:
+        self._running = False
+
+    def pin(self, room_id: int, game_dir: Path) -> None:
+        with self._lock:
+            self._pins.setdefault(str(game_dir), set()).add(room_id)
+
+    def unpin(self, room_id: int) -> None:
+        with self._lock:
+            for key, rooms in list(self._pins.items()):
+                rooms.discard(room_id)
+                if not rooms:
+                    del self._pins[key]
+
+    def _collect_loop(self) -> None:
+        while self._running:
+            time.sleep(self.interval)
+            try:
+                self.collect()
+            except Exception as e:
+                print(f"[!] version collector: {e}")
+
+    def collect(self) -> int:
+        """One pass over the superseded versions; returns how many were dropped."""
+        dropped = 0
+        for row in gamelog_repo.list_superseded_versions():
+            key = row["upload_path"]
+            zip_path = self.game_root / key
+            version_dir = zip_path.with_suffix("")
+            if not zip_path.is_file() and not version_dir.is_dir():
+                continue
+            # only what the store can rebuild, and not while an upload of it is being stored
+            if not self.store.has(key):
+                continue
+            if zip_path.is_file() and self.store.stored_at(key) < zip_path.stat().st_mtime:
+                continue
+            with self._lock:
+                if str(version_dir) in self._pins or str(version_dir) in self.busy_dirs():
+                    continue
+                if zip_path.is_file():
+                    zip_path.unlink()
+                # renamed under the lock, deleted outside it; the dev server clears
+                # leftover .old dirs at start-up
+                trash = None
+                if version_dir.is_dir():
+                    trash = version_dir.with_name(f"{version_dir.name}.{os.getpid()}.{threading.get_ident()}.old")
+                    os.rename(version_dir, trash)
+            if trash is not None:
+                shutil.rmtree(trash, ignore_errors=True)
+            dropped += 1
+            print(f"[*] dropped superseded version {key} (kept in the chunk store)")
+        self.collected += dropped
+        return dropped
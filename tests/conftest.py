@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the tests import the server packages straight from the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,120 @@
+"""Concurrency tests for LobbyState: racing joins, leaves and starts."""
+import itertools
+import random
+import threading
+
+from server.lobby.state import LobbyState
+
+MAX_PLAYERS = 4
+
+
+def run_together(n, fn):
+    """Run fn(i) on n threads released at the same moment; returns the results."""
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        results[i] = fn(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def assert_consistent(state):
+    for room_id, members in state._room_members.items():
+        room = state._room_states.get(room_id)
+        assert room is not None, f"room {room_id} has members but no state"
+        assert len(members) <= room["max_players"], f"room {room_id} overfilled"
+        for name in members:
+            assert state._user_room.get(name) == room_id, f"{name} in room {room_id} points elsewhere"
+    for name, room_id in state._user_room.items():
+        assert name in state._room_members.get(room_id, ()), f"{name} has a dangling seat in {room_id}"
+
+
+def new_room(state, room_id, host="host"):
+    state.create_room(room_id, host, {"game_id": 1, "max_players": MAX_PLAYERS})
+
+
+def test_racing_joins_fill_but_never_overfill():
+    state = LobbyState()
+    new_room(state, 1)
+    results = run_together(32, lambda i: state.join_room(1, f"p{i}")[0])
+    assert results.count(None) == MAX_PLAYERS - 1
+    assert set(results) == {None, "ROOM_FULL"}
+    assert len(state.room_players(1)) == MAX_PLAYERS
+    assert_consistent(state)
+
+
+def test_racing_starts_only_one_wins():
+    state = LobbyState()
+    new_room(state, 1)
+    state.join_room(1, "guest")
+    results = run_together(32, lambda i: state.begin_start(1, "host")[0])
+    assert results.count(None) == 1
+    assert set(results) == {None, "ALREADY_STARTED"}
+    assert state.room_state(1)["status"] == "playing"
+
+
+def test_no_member_is_lost_across_thousands_of_rooms():
+    state = LobbyState()
+    rooms = 3000
+    for room_id in range(rooms):
+        new_room(state, room_id, host=f"host{room_id}")
+
+    def join_many(i):
+        rnd = random.Random(i)
+        joined = []
+        for n in range(400):
+            room_id = rnd.randrange(rooms)
+            if state.join_room(room_id, f"t{i}-{n}")[0] is None:
+                joined.append((room_id, f"t{i}-{n}"))
+        return joined
+
+    joined = [j for per_thread in run_together(16, join_many) for j in per_thread]
+    for room_id, name in joined:
+        assert name in state.room_players(room_id)
+    assert sum(len(state.room_players(r)) for r in range(rooms)) == rooms + len(joined)
+    assert_consistent(state)
+
+
+def test_random_join_leave_start_finish_stays_consistent():
+    state = LobbyState()
+    room_ids = itertools.count(1)
+    newest = [0]
+    lock = threading.Lock()
+
+    def player(i):
+        rnd = random.Random(i)
+        name = f"p{i}"
+        for _ in range(3000):
+            room_id = rnd.randint(max(1, newest[0] - 64), max(1, newest[0]))
+            op = rnd.random()
+            if op < 0.10:
+                # room ids come from the rooms table in the lobby, never reused
+                with lock:
+                    room_id = next(room_ids)
+                    newest[0] = room_id
+                previous = state.create_room(room_id, name, {"game_id": 1, "max_players": MAX_PLAYERS})
+                if previous is not None:
+                    state.leave_room(name, previous)
+            elif op < 0.55:
+                current = state.room_of(name)
+                if current is not None and current != room_id:
+                    state.leave_room(name, current)
+                state.join_room(room_id, name)
+            elif op < 0.85:
+                state.leave_room(name)
+            elif op < 0.95:
+                if state.begin_start(room_id, name)[0] is None and rnd.random() < 0.5:
+                    state.abort_start(room_id)
+            else:
+                state.finish_room(room_id)
+
+    run_together(16, player)
+    assert newest[0] > 1000
+    assert_consistent(state)
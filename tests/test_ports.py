@@ -0,0 +1,99 @@
+"""PortAllocator under bursty start_game traffic."""
+import socket
+import threading
+import time
+
+import pytest
+
+from server.lobby.ports import NoFreePort, PortAllocator
+
+FIRST, LAST = 21000, 21599
+ROOMS = 500
+
+
+class Exited:
+    def poll(self):
+        return 0
+
+
+class Running:
+    def poll(self):
+        return None
+
+
+def start_rooms_together(allocator, rooms):
+    """Lease and bind a port per room from `rooms` threads released at once, like 500 start_game calls."""
+    barrier = threading.Barrier(rooms)
+    ports, bind_errors, listeners = {}, [], []
+    lock = threading.Lock()
+
+    def room(room_id):
+        barrier.wait()
+        port = allocator.lease(room_id)
+        # the game server binds a moment later, once its process is up
+        time.sleep(0.05)
+        s = socket.socket()
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind(("127.0.0.1", port))
+            s.listen()
+        except OSError as e:
+            bind_errors.append((port, e))
+        with lock:
+            ports[room_id] = port
+            listeners.append(s)
+
+    threads = [threading.Thread(target=room, args=(i,)) for i in range(rooms)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for s in listeners:
+        s.close()
+    return ports, bind_errors
+
+
+def test_500_concurrent_rooms_get_distinct_bindable_ports():
+    allocator = PortAllocator(FIRST, LAST)
+    ports, bind_errors = start_rooms_together(allocator, ROOMS)
+    assert len(ports) == ROOMS
+    assert len(set(ports.values())) == ROOMS, "a port was leased to two rooms"
+    assert bind_errors == []
+    assert all(FIRST <= p <= LAST for p in ports.values())
+    assert allocator.counts()["ports_leased"] == ROOMS
+
+
+def test_port_held_outside_the_lobby_is_skipped():
+    squatter = socket.socket()
+    squatter.bind(("", FIRST))
+    squatter.listen()
+    try:
+        allocator = PortAllocator(FIRST, FIRST + 9)
+        leased = [allocator.lease(room_id) for room_id in range(9)]
+    finally:
+        squatter.close()
+    assert FIRST not in leased
+    assert len(set(leased)) == 9
+
+
+def test_lease_is_per_room_and_released_ports_come_back_last():
+    allocator = PortAllocator(FIRST, FIRST + 2)
+    a = allocator.lease("a")
+    assert allocator.lease("a") == a
+    b = allocator.lease("b")
+    assert allocator.release("a") == a
+    assert allocator.lease("c") not in (a, b)
+    assert allocator.lease("d") == a
+
+
+def test_exited_rooms_are_reclaimed_when_the_range_runs_out():
+    allocator = PortAllocator(FIRST, FIRST + 3)
+    for room_id in range(4):
+        allocator.lease(room_id)
+    allocator.attach(0, Running())
+    allocator.attach(1, Exited())
+    allocator.lease("new")
+    assert allocator.port_of(1) is None
+    assert allocator.port_of(0) is not None
+    with pytest.raises(NoFreePort):
+        allocator.lease("one too many")
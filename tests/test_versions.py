@@ -0,0 +1,80 @@
+"""VersionCollector only drops superseded, published-over versions nobody is using."""
+import zipfile
+
+import pytest
+
+import server.db
+from server.db import accounts_repo, gamelog_repo, games_repo, init_db
+from server.dev.chunk_store import ChunkStore
+from server.lobby.versions import VersionCollector
+
+
+@pytest.fixture
+def game_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(server.db, "DB_PATH", tmp_path / "store.db")
+    server.db.close_connection()
+    init_db()
+    yield tmp_path / "game"
+    server.db.close_connection()
+
+
+def upload(root, store, game_id, version, published=True):
+    """What create_version + the file server's upload + publish leave behind."""
+    key = f"game_store/dev/{game_id}_g/v{version}.zip"
+    zip_path = root / key
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("server/server.py", f"VERSION = {version!r}\n")
+    with zipfile.ZipFile(zip_path) as zf:
+        zf.extractall(zip_path.with_suffix(""))
+    store.put_file(key, zip_path)
+    version_id = gamelog_repo.create_gamelog(game_id, version, "", key, is_active=0, published=0)
+    if published:
+        gamelog_repo.publish_gamelog(version_id, game_id)
+    return zip_path, zip_path.with_suffix("")
+
+
+def test_only_superseded_unused_versions_are_dropped(game_root):
+    store = ChunkStore(game_root / "chunk_store")
+    busy = set()
+    collector = VersionCollector(game_root, store, busy_dirs=lambda: set(busy))
+    accounts_repo.create_developer("dev", "pw", "dev")
+    dev_id = accounts_repo.get_developer_by_username("dev")["id"]
+    game_id = games_repo.create_game(dev_id, "g", "", 2)
+
+    v1 = upload(game_root, store, game_id, "1.0.0")
+    v2 = upload(game_root, store, game_id, "1.0.1")
+    v3 = upload(game_root, store, game_id, "1.0.2")
+    pending = upload(game_root, store, game_id, "1.0.3", published=False)
+
+    # a room still runs 1.0.0, a warm worker holds 1.0.1
+    collector.pin(7, v1[1])
+    busy.add(str(v2[1]))
+    assert collector.collect() == 0
+
+    collector.unpin(7)
+    assert collector.collect() == 1
+    assert not v1[0].exists() and not v1[1].exists()
+    assert store.has(f"game_store/dev/{game_id}_g/v1.0.0.zip")
+
+    busy.clear()
+    assert collector.collect() == 1
+    # the latest published version and the newer, unpublished upload stay
+    for zip_path, version_dir in (v3, pending):
+        assert zip_path.is_file() and version_dir.is_dir()
+    assert not list(game_root.rglob("*.old"))
+
+
+def test_version_not_in_the_store_is_kept(game_root):
+    store = ChunkStore(game_root / "chunk_store")
+    collector = VersionCollector(game_root, store)
+    accounts_repo.create_developer("dev", "pw", "dev")
+    dev_id = accounts_repo.get_developer_by_username("dev")["id"]
+    game_id = games_repo.create_game(dev_id, "g", "", 2)
+
+    old = upload(game_root, store, game_id, "1.0.0")
+    upload(game_root, store, game_id, "1.0.1")
+    # its processing failed before the recipe was written
+    (store.recipe_dir / f"game_store/dev/{game_id}_g/v1.0.0.zip.json").unlink()
+    assert collector.collect() == 0
+    assert old[0].is_file() and old[1].is_dir()